@@ -0,0 +1,17 @@
+from rest_framework import filters
+
+from core import search
+
+
+class WorkerIndexSearchFilter(filters.SearchFilter):
+    """SearchFilter that answers ?search= from the worker search index instead of icontains scans"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        matched = search.match_workers(' '.join(terms))
+        if matched is None:
+            return queryset
+        return queryset.filter(pk__in=matched)
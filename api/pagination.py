@@ -0,0 +1,229 @@
+import base64
+import binascii
+import bisect
+import json
+import math
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class WorkerSearchPagination:
+    """
+    Keyset (cursor) pagination for the worker search API.
+
+    Pages continue from the last row's (sort value, id) instead of an
+    offset, so page 50 costs the same index seek as page 1 and results do
+    not shift when workers are added between requests.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    # Counting stops here, larger result sets report an estimate
+    count_cap = 1000
+
+    # sort -> (model field, descending), id is always the tie-breaker
+    orderings = {
+        'rating': ('rating', True),
+        'price_low': ('hourly_rate', False),
+        'price_high': ('hourly_rate', True),
+        'jobs': ('total_jobs', True),
+    }
+    default_sort = 'rating'
+
+    # Set when the full result size is already known (paginate_ids)
+    _known_count = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, value, pk):
+        raw = json.dumps({'v': value, 'id': pk}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def cursor_value(self, value, sort_by):
+        """
+        A cursor's sort value as field_value() records it for `sort_by`.
+        Externally ranked sorts (distance, relevance) record numbers.
+        """
+        if isinstance(value, (bool, list, dict)) or value is None:
+            raise TypeError(value)
+        field = self.orderings[sort_by][0] if sort_by in self.orderings else None
+        if field == 'hourly_rate':
+            number = Decimal(str(value))
+            if not number.is_finite():
+                raise ValueError(value)
+            return str(number)
+        if field == 'total_jobs':
+            return int(value)
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(value)
+        return number
+
+    def decode_cursor(self, request, sort_by=None):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded))
+            return self.cursor_value(position['v'], sort_by), int(position['id'])
+        except (binascii.Error, ValueError, KeyError, TypeError, InvalidOperation, OverflowError):
+            raise NotFound('Invalid cursor.')
+
+    def paginate_queryset(self, queryset, request, sort_by):
+        """Return one page of `queryset` ordered by `sort_by` then id"""
+        self.request = request
+        field, descending = self.orderings.get(sort_by, self.orderings[self.default_sort])
+        self.page_size_value = self.get_page_size(request)
+        self._count_queryset = queryset
+
+        position = self.decode_cursor(request, sort_by)
+        if position is not None:
+            value, pk = position
+            # The leading bound lets the database seek straight into the index
+            if descending:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lte': value}), Q(**{f'{field}__lt': value}) | Q(pk__lt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gte': value}), Q(**{f'{field}__gt': value}) | Q(pk__gt=pk)
+                )
+
+        prefix = '-' if descending else ''
+        rows = list(queryset.order_by(f'{prefix}{field}', f'{prefix}pk')[:self.page_size_value + 1])
+
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if self.has_next:
+            self.next_cursor = self.encode_cursor(self.field_value(rows[-1], sort_by), rows[-1].pk)
+        return rows
+
+    def field_value(self, obj, sort_by):
+        """Value of the sort field as recorded in cursors"""
+        field, _ = self.orderings.get(sort_by, self.orderings[self.default_sort])
+        value = getattr(obj, field)
+        return str(value) if field == 'hourly_rate' else value
+
+    def paginate_ranked(self, queryset, request, ranking):
+        """
+        Return one page of `queryset` ordered by an externally computed
+        ranking {pk: sort value}, ascending, ties broken by id.
+        """
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self._count_queryset = queryset
+
+        eligible = set(queryset.values_list('pk', flat=True))
+        ordered = sorted((value, pk) for pk, value in ranking.items() if pk in eligible)
+
+        start = 0
+        position = self.decode_cursor(request)
+        if position is not None:
+            start = bisect.bisect_right(ordered, (position[0], position[1]))
+
+        window = ordered[start:start + self.page_size_value + 1]
+        self.has_next = len(window) > self.page_size_value
+        window = window[:self.page_size_value]
+        if self.has_next:
+            self.next_cursor = self.encode_cursor(*window[-1])
+
+        objects = queryset.in_bulk([pk for _, pk in window])
+        return [objects[pk] for _, pk in window]
+
+    def ordered_ids(self, queryset, sort_by, ranking=None):
+        """
+        Ids of the first count_cap results in page order, and whether that
+        is all of them. With a ranking {pk: value} the order is by value then id.
+        """
+        if ranking is not None:
+            eligible = set(queryset.values_list('pk', flat=True))
+            ordered = [pk for _, pk in sorted((value, pk) for pk, value in ranking.items() if pk in eligible)]
+        else:
+            field, descending = self.orderings.get(sort_by, self.orderings[self.default_sort])
+            prefix = '-' if descending else ''
+            ordered = list(
+                queryset.order_by(f'{prefix}{field}', f'{prefix}pk').values_list('pk', flat=True)[:self.count_cap + 1]
+            )
+        return ordered[:self.count_cap], len(ordered) <= self.count_cap
+
+    def paginate_ids(self, queryset, request, sort_by, ids, complete, sort_value=None):
+        """
+        Return one page of a precomputed order (see ordered_ids), loading
+        the rows from `queryset`. `sort_value(obj)` gives the cursor value of
+        a row, by default its sort field.
+
+        Returns None when the page cannot be served from `ids`: it reaches
+        past an incomplete list, or the cursor row is gone or has moved.
+        Fall back to paginate_queryset / paginate_ranked then.
+        """
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        # Custom sort values are an external ranking, recorded as numbers
+        cursor_sort = sort_by if sort_value is None else None
+        sort_value = sort_value or (lambda obj: self.field_value(obj, sort_by))
+
+        start = 0
+        position = self.decode_cursor(request, cursor_sort)
+        if position is not None:
+            try:
+                start = ids.index(position[1])
+            except ValueError:
+                return None
+
+        # The cursor row comes first so its current value can be checked
+        window = ids[start:start + self.page_size_value + 1 + (position is not None)]
+        objects = queryset.in_bulk(window)
+        if position is not None:
+            anchor = objects.get(window[0])
+            if anchor is None or sort_value(anchor) != position[0]:
+                return None
+            window = window[1:]
+
+        if len(window) <= self.page_size_value and not complete:
+            return None
+        self.has_next = len(window) > self.page_size_value
+        rows = [objects[pk] for pk in window[:self.page_size_value] if pk in objects]
+        if self.has_next:
+            if not rows:
+                return None
+            self.next_cursor = self.encode_cursor(sort_value(rows[-1]), rows[-1].pk)
+
+        self._known_count = (len(ids), True) if complete else (self.count_cap, False)
+        return rows
+
+    def get_count(self):
+        """Exact count up to count_cap, beyond that (count_cap, False)"""
+        if self._known_count is not None:
+            return self._known_count
+        counted = self._count_queryset.values('pk')[:self.count_cap + 1].count()
+        if counted > self.count_cap:
+            return self.count_cap, False
+        return counted, True
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'page_size': self.page_size_value,
+            'results': data,
+        }
+        if self.request.query_params.get('count') in ('1', 'true'):
+            payload['count'], payload['count_is_exact'] = self.get_count()
+        return Response(payload)
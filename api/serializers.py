@@ -3,8 +3,9 @@ from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from core.models import (
     Category, Skill, UserProfile, Worker, Service,
-    WorkPortfolio, Booking, Review, Message, Notification
+    WorkPortfolio, Booking, Review, Message, Notification, SavedSearch
 )
+from core import saved_searches
 
 
 # ============ User & Auth Serializers ============
@@ -138,29 +139,46 @@ class WorkerListSerializer(serializers.ModelSerializer):
     """Lightweight worker serializer for lists"""
     name = serializers.SerializerMethodField()
     photo = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
     categories = CategoryListSerializer(many=True, read_only=True)
     
     class Meta:
         model = Worker
         fields = [
             'id', 'name', 'role', 'location', 'rating', 'total_reviews', 
-            'total_jobs', 'hourly_rate', 'is_verified', 'is_available', 'photo', 'categories'
+            'total_jobs', 'hourly_rate', 'is_verified', 'is_available', 'photo', 'categories',
+            'distance_km'
         ]
     
     def get_name(self, obj):
-        return obj.user.get_full_name() or obj.user.username
+        return obj.display_name
+    
+    def get_distance_km(self, obj):
+        return self.context.get('distances', {}).get(obj.pk)
     
     def get_photo(self, obj):
         request = self.context.get('request')
-        if obj.profile_photo and hasattr(obj.profile_photo, 'url'):
-            if request:
-                return request.build_absolute_uri(obj.profile_photo.url)
-            return obj.profile_photo.url
-        return None
+        # photo_url is the placeholder until the upload is processed (see core.media_queue)
+        url = obj.photo_url
+        if url and request:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class WorkerServicesSerializer(WorkerListSerializer):
+    """Worker list entry with the services that matched a service search"""
+    services = serializers.SerializerMethodField()
+    
+    class Meta(WorkerListSerializer.Meta):
+        fields = WorkerListSerializer.Meta.fields + ['services']
+    
+    def get_services(self, obj):
+        services = self.context.get('services', {}).get(obj.pk, [])
+        return ServiceSerializer(services, many=True, context=self.context).data
 
 
 class WorkerDetailSerializer(serializers.ModelSerializer):
-    """Full worker detail serializer"""
+    """Full worker detail serializer, reads the relations prefetched by core.profiles"""
     user = UserSerializer(read_only=True)
     name = serializers.SerializerMethodField()
     photo = serializers.SerializerMethodField()
@@ -173,7 +191,7 @@ class WorkerDetailSerializer(serializers.ModelSerializer):
         model = Worker
         fields = [
             'id', 'user', 'name', 'role', 'bio', 'experience_years', 'hourly_rate',
-            'location', 'service_areas', 'rating', 'total_reviews', 'total_jobs',
+            'location', 'service_areas', 'latitude', 'longitude', 'rating', 'total_reviews', 'total_jobs',
             'response_time', 'is_verified', 'is_available', 'photo',
             'categories', 'skills', 'services', 'portfolio', 'created_at'
         ]
@@ -183,11 +201,11 @@ class WorkerDetailSerializer(serializers.ModelSerializer):
     
     def get_photo(self, obj):
         request = self.context.get('request')
-        if obj.profile_photo and hasattr(obj.profile_photo, 'url'):
-            if request:
-                return request.build_absolute_uri(obj.profile_photo.url)
-            return obj.profile_photo.url
-        return None
+        # photo_url is the placeholder until the upload is processed (see core.media_queue)
+        url = obj.photo_url
+        if url and request:
+            return request.build_absolute_uri(url)
+        return url
 
 
 class WorkerCreateUpdateSerializer(serializers.ModelSerializer):
@@ -203,7 +221,7 @@ class WorkerCreateUpdateSerializer(serializers.ModelSerializer):
         model = Worker
         fields = [
             'role', 'bio', 'experience_years', 'hourly_rate', 
-            'location', 'service_areas', 'response_time', 
+            'location', 'service_areas', 'latitude', 'longitude', 'response_time', 
             'is_available', 'profile_photo', 'categories', 'skills'
         ]
 
@@ -239,7 +257,7 @@ class BookingDetailSerializer(serializers.ModelSerializer):
         model = Booking
         fields = [
             'id', 'client', 'worker', 'service', 'title', 'description',
-            'location', 'scheduled_date', 'scheduled_time', 'estimated_price',
+            'location', 'latitude', 'longitude', 'scheduled_date', 'scheduled_time', 'estimated_price',
             'final_price', 'status', 'created_at', 'updated_at', 'completed_at'
         ]
 
@@ -253,7 +271,7 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         model = Booking
         fields = [
             'worker_id', 'service_id', 'title', 'description',
-            'location', 'scheduled_date', 'scheduled_time', 'estimated_price'
+            'location', 'latitude', 'longitude', 'scheduled_date', 'scheduled_time', 'estimated_price'
         ]
     
     def create(self, validated_data):
@@ -362,3 +380,34 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = ['id', 'notification_type', 'title', 'message', 'is_read', 'link', 'created_at']
         read_only_fields = ['id', 'notification_type', 'title', 'message', 'link', 'created_at']
+
+
+# ============ Saved Search Serializers ============
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    """Saved search, `params` takes the search API's query parameters"""
+    params = serializers.DictField(child=serializers.CharField(allow_blank=True))
+    
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'params', 'is_active', 'created_at']
+        read_only_fields = ['id', 'created_at']
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['params'] = instance.params
+        return data
+    
+    def create(self, validated_data):
+        saved = saved_searches.save_search(
+            self.context['request'].user, validated_data['params'], validated_data.get('name', '')
+        )
+        if validated_data.get('is_active') is False:
+            saved.is_active = False
+            saved.save(update_fields=['is_active'])
+        return saved
+    
+    def update(self, instance, validated_data):
+        # The predicates are fixed once saved, save a new search to change them
+        validated_data.pop('params', None)
+        return super().update(instance, validated_data)
@@ -12,6 +12,7 @@ router.register(r'bookings', views.BookingViewSet, basename='booking')
 router.register(r'reviews', views.ReviewViewSet, basename='review')
 router.register(r'messages', views.MessageViewSet, basename='message')
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
+router.register(r'saved-searches', views.SavedSearchViewSet, basename='saved-search')
 
 urlpatterns = [
     # Auth endpoints
@@ -27,6 +28,16 @@ urlpatterns = [
     # Worker reviews (public)
     path('workers/<int:worker_id>/reviews/', views.WorkerReviewsView.as_view(), name='worker-reviews'),
     
+    # Search suggestions
+    path('suggest/', views.suggest, name='suggest'),
+    
+    # Top workers
+    path('leaderboard/', views.top_workers, name='leaderboard'),
+    
+    # Geocoding proxy
+    path('geo/autocomplete/', views.geo_autocomplete, name='geo-autocomplete'),
+    path('geo/reverse/', views.geo_reverse, name='geo-reverse'),
+    
     # Dashboard
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
     
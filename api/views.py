@@ -7,6 +7,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.db.models import Q, Avg
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
 
 from core.models import (
@@ -17,14 +19,17 @@ from .serializers import (
     UserSerializer, UserProfileSerializer, RegisterSerializer, LoginSerializer,
     ChangePasswordSerializer, UserUpdateSerializer,
     CategorySerializer, CategoryListSerializer, SkillSerializer,
-    WorkerListSerializer, WorkerDetailSerializer, WorkerCreateUpdateSerializer,
+    WorkerListSerializer, WorkerServicesSerializer, WorkerDetailSerializer, WorkerCreateUpdateSerializer,
     ServiceSerializer, WorkPortfolioSerializer,
     BookingListSerializer, BookingDetailSerializer, BookingCreateSerializer, BookingUpdateSerializer,
     ReviewSerializer, ReviewCreateSerializer,
     MessageSerializer, MessageCreateSerializer,
-    NotificationSerializer
+    NotificationSerializer, SavedSearchSerializer
 )
+from core import search, search_cache, service_search, spelling, suggestions, geo, geocoding, facets, ranking, leaderboard, profiles, etags
 from .permissions import IsOwnerOrReadOnly, IsWorkerOwner, IsBookingParticipant
+from .filters import WorkerIndexSearchFilter
+from .pagination import WorkerSearchPagination
 
 
 # ============ Auth Views ============
@@ -150,6 +155,8 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 # ============ Category Views ============
 
+@method_decorator(condition(etag_func=etags.category_list_etag), name='list')
+@method_decorator(condition(etag_func=etags.category_etag), name='retrieve')
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """Category list and detail endpoints"""
     queryset = Category.objects.filter(is_active=True)
@@ -175,8 +182,7 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 class WorkerViewSet(viewsets.ModelViewSet):
     """Worker CRUD endpoints"""
     queryset = Worker.objects.filter(is_available=True)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['user__first_name', 'user__last_name', 'role', 'location', 'bio']
+    filter_backends = [DjangoFilterBackend, WorkerIndexSearchFilter, filters.OrderingFilter]
     ordering_fields = ['rating', 'hourly_rate', 'total_jobs', 'created_at']
     filterset_fields = ['categories', 'location', 'is_verified']
     
@@ -194,6 +200,12 @@ class WorkerViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated()]
         return [IsAuthenticated(), IsWorkerOwner()]
     
+    @method_decorator(condition(etag_func=etags.worker_etag))
+    def retrieve(self, request, *args, **kwargs):
+        # Served from the cached profile snapshot (see core.profiles)
+        worker = profiles.get_profile(self.get_object().pk)
+        return Response(self.get_serializer(worker).data)
+    
     def perform_create(self, serializer):
         # Check if user already has a worker profile
         if hasattr(self.request.user, 'worker_profile'):
@@ -224,51 +236,80 @@ class WorkerViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def search(self, request):
         """Search workers with filters"""
-        queryset = self.get_queryset()
-        
-        # Category filter
-        category = request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(
-                Q(categories__slug=category) | Q(categories__name__icontains=category)
-            )
+        paginator = WorkerSearchPagination()
+        
+        # Normalized parameters key the search result cache
+        params = search_cache.normalize_params(request.query_params)
+        near = params['near']
+        sort_by = params['sort'] or ('distance' if near else 'rating')
+        if sort_by not in paginator.orderings and sort_by != 'relevance' and not (near and sort_by == 'distance'):
+            sort_by = paginator.default_sort
+        params['sort'] = sort_by
+        
+        # Misspelled words are searched as the nearest known word
+        did_you_mean = {
+            name: spelling.apply(request.query_params.get(name, ''), corrections)
+            for name, corrections in spelling.rewrite_params(params).items()
+        }
+        
+        def filtered():
+            # Free text, availability (date=YYYY-MM-DD&time=HH:MM), distance
+            # (near=lat,lng&radius_km=) and the facet filters: category,
+            # location, price range and rating
+            return search.filter_workers(self.get_queryset(), params)
+        
+        def distance_of(worker):
+            return round(geo.haversine_km(near[0], near[1], worker.latitude, worker.longitude), 2)
+        
+        def ranked(queryset, distances):
+            # Externally ordered sorts as {pk: sort value}, None for field sorts
+            if sort_by == 'relevance':
+                return {pk: position for position, pk in enumerate(ranking.rank(queryset, params['q'], distances))}
+            return distances if sort_by == 'distance' else None
+        
+        def run_search():
+            queryset, search_filters, distances = filtered()
+            queryset = facets.apply_filters(queryset, search_filters)
+            ids, complete = paginator.ordered_ids(queryset, sort_by, ranked(queryset, distances))
+            return {'ids': ids, 'complete': complete}
+        
+        # Keyset pagination (id breaks ties so cursors are stable), served from the
+        # cached result order while it covers the page
+        result = search_cache.cached_search('api', params, run_search)
+        rows = self.get_queryset().prefetch_related('categories')
+        sort_value = None
+        if sort_by == 'distance':
+            sort_value = distance_of
+        elif sort_by == 'relevance':
+            # Relevance cursors record the position in the ranking
+            positions = {pk: position for position, pk in enumerate(result['ids'])}
+            sort_value = lambda worker: positions.get(worker.pk)
+        page = paginator.paginate_ids(
+            rows, request, sort_by, result['ids'], result['complete'], sort_value=sort_value,
+        )
+        if page is None:
+            queryset, search_filters, distances = filtered()
+            queryset = facets.apply_filters(queryset, search_filters)
+            order = ranked(queryset, distances)
+            queryset = queryset.prefetch_related('categories')
+            if order is not None:
+                page = paginator.paginate_ranked(queryset, request, order)
+            else:
+                page = paginator.paginate_queryset(queryset, request, sort_by)
         
-        # Location filter
-        location = request.query_params.get('location')
-        if location:
-            queryset = queryset.filter(
-                Q(location__icontains=location) | Q(service_areas__icontains=location)
+        distances = {worker.pk: distance_of(worker) for worker in page} if near else {}
+        serializer = WorkerListSerializer(
+            page, many=True, context={'request': request, 'distances': distances}
+        )
+        response = paginator.get_paginated_response(serializer.data)
+        if did_you_mean:
+            response.data['did_you_mean'] = did_you_mean
+        if request.query_params.get('facets') in ('1', 'true'):
+            response.data['facets'] = search_cache.cached_search(
+                'facets', dict(params, sort=''), lambda: facets.facet_counts(*filtered()[:2]),
+                tags=search_cache.facet_tags(params),
             )
-        
-        # Price range filter
-        min_price = request.query_params.get('min_price')
-        max_price = request.query_params.get('max_price')
-        if min_price:
-            queryset = queryset.filter(hourly_rate__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(hourly_rate__lte=max_price)
-        
-        # Rating filter
-        min_rating = request.query_params.get('rating')
-        if min_rating:
-            queryset = queryset.filter(rating__gte=min_rating)
-        
-        # Sorting
-        sort_by = request.query_params.get('sort', 'rating')
-        if sort_by == 'price_low':
-            queryset = queryset.order_by('hourly_rate')
-        elif sort_by == 'price_high':
-            queryset = queryset.order_by('-hourly_rate')
-        elif sort_by == 'rating':
-            queryset = queryset.order_by('-rating')
-        elif sort_by == 'jobs':
-            queryset = queryset.order_by('-total_jobs')
-        
-        serializer = WorkerListSerializer(queryset.distinct(), many=True, context={'request': request})
-        return Response({
-            'count': queryset.count(),
-            'results': serializer.data
-        })
+        return response
 
 
 class MyWorkerProfileView(generics.RetrieveUpdateAPIView):
@@ -282,6 +323,11 @@ class MyWorkerProfileView(generics.RetrieveUpdateAPIView):
     
     def get_object(self):
         return self.request.user.worker_profile
+    
+    @method_decorator(condition(etag_func=etags.own_worker_etag))
+    def retrieve(self, request, *args, **kwargs):
+        worker = profiles.get_profile(self.get_object().pk)
+        return Response(self.get_serializer(worker).data)
 
 
 # ============ Service Views ============
@@ -298,6 +344,35 @@ class ServiceViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         serializer.save(worker=self.request.user.worker_profile)
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def search(self, request):
+        """Search services by name and description, grouped by worker"""
+        paginator = WorkerSearchPagination()
+        params = search_cache.normalize_params(request.query_params)
+        sort_by = params['sort'] if params['sort'] in ('price_low', 'price_high', 'rating') else 'price_low'
+        
+        # q, min_price and max_price match services, the workers offering them are paged
+        groups = service_search.group_by_worker(service_search.search_services(params))
+        if sort_by == 'price_low':
+            order = {pk: float(group[0][0]) for pk, group in groups.items()}
+        elif sort_by == 'price_high':
+            order = {pk: -float(group[-1][0]) for pk, group in groups.items()}
+        else:
+            order = {pk: -rating for pk, rating in Worker.objects.filter(pk__in=groups).values_list('pk', 'rating')}
+        
+        rows = Worker.objects.prefetch_related('categories')
+        ids = [pk for _, pk in sorted((value, pk) for pk, value in order.items())]
+        page = paginator.paginate_ids(rows, request, sort_by, ids, True, sort_value=lambda worker: order.get(worker.pk))
+        if page is None:
+            page = paginator.paginate_ranked(rows.filter(pk__in=order), request, order)
+        
+        matched = Service.objects.in_bulk([pk for worker in page for _, pk in groups[worker.pk]])
+        services = {worker.pk: [matched[pk] for _, pk in groups[worker.pk]] for worker in page}
+        serializer = WorkerServicesSerializer(
+            page, many=True, context={'request': request, 'services': services}
+        )
+        return paginator.get_paginated_response(serializer.data)
 
 
 # ============ Portfolio Views ============
@@ -420,6 +495,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return ReviewSerializer
 
 
+@method_decorator(condition(etag_func=etags.worker_reviews_etag), name='get')
 class WorkerReviewsView(generics.ListAPIView):
     """Get reviews for a specific worker"""
     serializer_class = ReviewSerializer
@@ -519,6 +595,93 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({'unread_count': count})
 
 
+# ============ Saved Search Views ============
+
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    """Saved searches of the current user, new matches arrive as notifications"""
+    serializer_class = SavedSearchSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return self.request.user.saved_searches.all()
+
+
+# ============ Geocoding Views ============
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def geo_autocomplete(request):
+    """Location autocomplete from the offline gazetteer, cache and upstream geocoder"""
+    query = request.query_params.get('q', '')
+    try:
+        limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    
+    results, source = geocoding.autocomplete(query, limit)
+    return Response({'results': results, 'source': source})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def geo_reverse(request):
+    """Reverse geocode a coordinate (?lat=&lng=)"""
+    coordinates = geo.parse_near(
+        f"{request.query_params.get('lat', '')},{request.query_params.get('lng', '')}"
+    )
+    if not coordinates:
+        return Response({'error': 'Valid lat and lng required.'}, status=400)
+    
+    result, source = geocoding.reverse(*coordinates)
+    return Response({'result': result, 'source': source})
+
+
+# ============ Suggestion Views ============
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def suggest(request):
+    """Typeahead for categories, skills, roles and areas (?q=&types=category,area&limit=)"""
+    query = request.query_params.get('q', '')
+    try:
+        limit = min(max(int(request.query_params.get('limit', suggestions.DEFAULT_LIMIT)), 1),
+                    suggestions.MAX_LIMIT)
+    except ValueError:
+        limit = suggestions.DEFAULT_LIMIT
+    types = [
+        kind for kind in request.query_params.get('types', '').split(',')
+        if kind in suggestions.SUGGESTION_TYPES
+    ] or suggestions.SUGGESTION_TYPES
+    
+    return Response({'query': query, 'results': suggestions.suggest(query, limit, types)})
+
+
+# ============ Leaderboard Views ============
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def top_workers(request):
+    """Best rated available workers overall, of a category or of a city (?category=slug | ?city=&limit=)"""
+    category = request.query_params.get('category', '').strip()
+    city = request.query_params.get('city', '').strip()
+    if category:
+        board = leaderboard.board_name('category', category.lower())
+    elif city:
+        board = leaderboard.board_name('city', facets.normalize(city))
+    else:
+        board = leaderboard.ALL_BOARD
+    try:
+        limit = min(max(int(request.query_params.get('limit', leaderboard.LEADERBOARD_SIZE)), 1),
+                    leaderboard.LEADERBOARD_SIZE)
+    except ValueError:
+        limit = leaderboard.LEADERBOARD_SIZE
+    
+    ids = leaderboard.top(board, limit)
+    workers = Worker.objects.prefetch_related('categories').in_bulk(ids)
+    serializer = WorkerListSerializer([workers[pk] for pk in ids if pk in workers], many=True, context={'request': request})
+    return Response({'board': board, 'results': serializer.data})
+
+
 # ============ Dashboard Views ============
 
 @api_view(['GET'])
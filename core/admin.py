@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Category, Skill, UserProfile, Worker, Service, 
-    WorkPortfolio, Booking, Review, Message, Notification
+    WorkPortfolio, Booking, Review, Message, Notification, SavedSearch
 )
 
 
@@ -86,3 +86,10 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ['user', 'notification_type', 'title', 'is_read', 'created_at']
     list_filter = ['notification_type', 'is_read', 'created_at']
     search_fields = ['user__username', 'title']
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ['user', 'name', 'is_active', 'created_at']
+    list_filter = ['is_active', 'created_at']
+    search_fields = ['user__username', 'name']
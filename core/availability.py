@@ -0,0 +1,118 @@
+"""
+Worker Availability
+
+Keeps one occupancy bitmap per worker and day (WorkerOccupancy): bit i of
+`slots` is set when a non-cancelled booking covers the i-th half hour of the
+day. Bookings only record a start time, so each is taken to last
+BOOKING_HOURS, the same default the booking form prices with. A booking
+late in the evening is cut off at midnight.
+
+Searching for a date (and time) then drops the busy workers with a single
+indexed bitmask test over that day's rows instead of checking every
+candidate's bookings. The bitmaps are maintained by the signals in
+core.signals whenever a booking is saved or deleted.
+"""
+import datetime
+
+from django.db.models import F
+from django.utils import dateparse, timezone
+
+from .models import Booking, WorkerOccupancy
+
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+BOOKING_HOURS = 2
+
+# A search for a date without a time looks for workers not booked solid in these hours
+WORKING_HOURS = (8, 20)
+
+
+def slot_mask(start, hours=BOOKING_HOURS):
+    """Bitmask of the half hour slots from `start` (a time) for `hours`, up to midnight"""
+    first = (start.hour * 60 + start.minute) // SLOT_MINUTES
+    last = min(first + hours * 60 // SLOT_MINUTES, SLOTS_PER_DAY)
+    return ((1 << (last - first)) - 1) << first
+
+
+def working_hours_mask():
+    start, end = WORKING_HOURS
+    return slot_mask(datetime.time(start), end - start)
+
+
+def parse_date(value):
+    """A date from YYYY-MM-DD, or None"""
+    try:
+        return dateparse.parse_date(str(value or '').strip())
+    except ValueError:
+        return None
+
+
+def parse_time(value):
+    """A time from HH:MM[:SS], or None"""
+    try:
+        return dateparse.parse_time(str(value or '').strip())
+    except ValueError:
+        return None
+
+
+# ============ Maintenance ============
+
+def day_slots(worker_id, day):
+    """Occupancy bitmap of a worker's day, computed from its bookings"""
+    slots = 0
+    bookings = Booking.objects.filter(worker=worker_id, scheduled_date=day).exclude(status='cancelled')
+    for start in bookings.values_list('scheduled_time', flat=True):
+        slots |= slot_mask(start if isinstance(start, datetime.time) else parse_time(start))
+    return slots
+
+
+def refresh_day(worker_id, day):
+    """Recompute the stored bitmap of one worker's day from its bookings"""
+    if isinstance(day, str):
+        day = parse_date(day)
+    slots = day_slots(worker_id, day)
+    if slots:
+        WorkerOccupancy.objects.update_or_create(worker_id=worker_id, date=day, defaults={'slots': slots})
+    else:
+        WorkerOccupancy.objects.filter(worker=worker_id, date=day).delete()
+
+
+def rebuild():
+    """Recompute every bitmap from the bookings, returns the number of worker-days stored"""
+    days = Booking.objects.exclude(status='cancelled').order_by().values_list('worker', 'scheduled_date').distinct()
+    WorkerOccupancy.objects.all().delete()
+    WorkerOccupancy.objects.bulk_create([
+        WorkerOccupancy(worker_id=worker_id, date=day, slots=day_slots(worker_id, day))
+        for worker_id, day in days
+    ], batch_size=1000)
+    return WorkerOccupancy.objects.count()
+
+
+# ============ Filtering ============
+
+def busy_worker_ids(day, at=None):
+    """
+    Subquery of workers booked during a BOOKING_HOURS visit starting at `at`
+    on `day`, or booked through all working hours when no time is given.
+    """
+    rows = WorkerOccupancy.objects.filter(date=day)
+    if at is not None:
+        rows = rows.alias(overlap=F('slots').bitand(slot_mask(at))).exclude(overlap=0)
+    else:
+        mask = working_hours_mask()
+        rows = rows.alias(overlap=F('slots').bitand(mask)).filter(overlap=mask)
+    return rows.values('worker')
+
+
+def filter_free(queryset, day=None, at=None):
+    """
+    Narrow a worker queryset to those free on `day` (at time `at`).
+    A time without a date means today.
+    """
+    if day is None and at is not None:
+        day = timezone.localdate()
+    if day is None:
+        return queryset
+    return queryset.exclude(pk__in=busy_worker_ids(day, at))
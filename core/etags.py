@@ -0,0 +1,69 @@
+"""
+Conditional GET Validators
+
+ETag functions for django.views.decorators.http.condition, so unchanged
+public pages and read-only API responses are answered with 304 Not
+Modified before anything is loaded, serialized or rendered.
+
+Worker ETags come from the worker's cache tag version (core.search_cache),
+which every change to the worker, its services, portfolio, reviews or
+skills bumps, so they cost a cache lookup and no queries. Category and
+review ETags come from max(updated_at) and the row count of one indexed
+aggregate query.
+"""
+from django.contrib import messages
+from django.db.models import Count, Max
+
+from . import search_cache
+from .models import Category, Review
+
+
+def _aggregate_etag(prefix, queryset):
+    stats = queryset.aggregate(count=Count('pk'), last=Max('updated_at'))
+    last = stats['last'].timestamp() if stats['last'] else 0
+    return f'{prefix}-{stats["count"]}-{last}'
+
+
+def worker_version(worker_id):
+    version, = search_cache.tag_versions(search_cache.worker_tags([worker_id]))
+    return f'w{worker_id}-{version}'
+
+
+def page_etag(request, etag):
+    """
+    ETag of an HTML page: pages differ per user, and a page with flash
+    messages waiting must be rendered to show them.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    return f'{etag}-u{user}'
+
+
+# ============ ETag functions ============
+
+def worker_etag(request, pk=None, **kwargs):
+    return worker_version(pk)
+
+
+def own_worker_etag(request, **kwargs):
+    worker = getattr(request.user, 'worker_profile', None) if request.user.is_authenticated else None
+    return worker_version(worker.pk) if worker else None
+
+
+def profile_page_etag(request, worker_id, **kwargs):
+    return page_etag(request, worker_version(worker_id))
+
+
+def category_list_etag(request, **kwargs):
+    return _aggregate_etag('c', Category.objects.filter(is_active=True))
+
+
+def category_etag(request, slug=None, **kwargs):
+    """Category detail also shows skills and worker counts, which any worker change can move"""
+    version, = search_cache.tag_versions([search_cache.ANY_CATEGORY])
+    return f'{category_list_etag(request)}-{version}'
+
+
+def worker_reviews_etag(request, worker_id=None, **kwargs):
+    return _aggregate_etag(f'r{worker_id}', Review.objects.filter(worker_id=worker_id))
@@ -0,0 +1,234 @@
+"""
+Search Facets
+
+Keeps one WorkerFacet row per (worker, facet value), such as a category,
+a price bucket, a rating bucket, a city or a service area. Facet counts for a
+search are then a GROUP BY over that table restricted to the matching
+workers, instead of one COUNT query per filter option.
+
+Each facet is counted with every active filter except its own. For example,
+choosing a category still shows how many workers the other categories
+would have. Facets that share the same effective filters share one query.
+
+Facet rows are written by core.search.index_worker, so the search index
+signals and `python manage.py rebuild_search_index` keep them current.
+"""
+from django.db.models import Count, Max, Q
+
+from .models import WorkerFacet
+
+
+# (min, max) hourly rate in BDT, both inclusive, None means open ended
+PRICE_BUCKETS = [
+    (None, 299),
+    (300, 499),
+    (500, 799),
+    (800, 1199),
+    (1200, None),
+]
+
+# Minimum ratings offered by the rating filter, highest first
+RATING_THRESHOLDS = ['4.5', '4.0', '3.5', '3.0']
+
+# Facets with open ended values only report their most common ones
+MAX_VALUES = 10
+
+# Which search filter narrows each facet (and is ignored when counting it)
+FACET_FILTERS = {
+    'category': 'category',
+    'price': 'price',
+    'rating': 'rating',
+    'city': 'location',
+    'area': 'location',
+}
+
+
+def normalize(text):
+    """Facet value key for a free text place name"""
+    return ' '.join(str(text).lower().split())[:64]
+
+
+def price_bucket(rate):
+    """Facet value of an hourly rate, e.g. '300-499' or '1200+'"""
+    # Views assign the rate straight from the form, before the model converts it
+    rate = float(rate)
+    for low, high in PRICE_BUCKETS:
+        if high is None or rate <= high:
+            return f'{low or 0}-{high}' if high is not None else f'{low}+'
+    return ''
+
+
+def rating_bucket(rating):
+    """Highest rating threshold a worker meets, or '0'"""
+    for threshold in RATING_THRESHOLDS:
+        if rating >= float(threshold):
+            return threshold
+    return '0'
+
+
+def build_facets(worker):
+    """Collect the facet values of a worker as {(facet, value): label}"""
+    facets = {
+        ('price', price_bucket(worker.hourly_rate)): '',
+        ('rating', rating_bucket(worker.rating)): '',
+    }
+
+    for category in worker.categories.all():
+        facets[('category', category.slug.lower())] = category.name
+
+    city = worker.location.strip()
+    if city:
+        facets[('city', normalize(city))] = city
+
+    for area in worker.service_areas.split(','):
+        area = area.strip()
+        if area:
+            facets.setdefault(('area', normalize(area)), area)
+
+    return facets
+
+
+def index_worker(worker):
+    """Bring the facet rows of one worker up to date, writing only what changed"""
+    new_facets = build_facets(worker)
+    old_facets = {
+        (row.facet, row.value): row for row in WorkerFacet.objects.filter(worker=worker)
+    }
+
+    removed = [row.pk for key, row in old_facets.items() if key not in new_facets]
+    if removed:
+        WorkerFacet.objects.filter(pk__in=removed).delete()
+
+    for key, label in new_facets.items():
+        row = old_facets.get(key)
+        if row is not None and row.label != label:
+            row.label = label
+            row.save(update_fields=['label'])
+
+    WorkerFacet.objects.bulk_create([
+        WorkerFacet(worker=worker, facet=facet, value=value, label=label)
+        for (facet, value), label in new_facets.items()
+        if (facet, value) not in old_facets
+    ], ignore_conflicts=True)
+
+
+# ============ Filters ============
+
+def _facet_workers(condition):
+    """Subquery of the ids of workers with a facet row meeting `condition`"""
+    return WorkerFacet.objects.filter(condition).values('worker_id')
+
+
+def search_filters(category_slugs=None, location='', min_price='', max_price='', rating=''):
+    """
+    Build the facet-aware search filters as {name: Q or None}, category and
+    location as subqueries on the facet rows. `category_slugs` are the
+    categories a category filter matches, every token of `location` starts
+    a word of the city or a service area. Unparseable numbers are ignored.
+    """
+    filters = {name: None for name in ('category', 'location', 'price', 'rating')}
+
+    if category_slugs is not None:
+        filters['category'] = Q(pk__in=_facet_workers(Q(facet='category', value__in=category_slugs)))
+
+    places = Q()
+    for token in location.split():
+        word = Q(value__startswith=token) | Q(value__contains=f' {token}')
+        places &= Q(pk__in=_facet_workers(Q(facet__in=('city', 'area')) & word))
+    if places:
+        filters['location'] = places
+
+    price = Q()
+    for lookup, value in (('hourly_rate__gte', min_price), ('hourly_rate__lte', max_price)):
+        try:
+            price &= Q(**{lookup: float(value)})
+        except (TypeError, ValueError):
+            pass
+    if price:
+        filters['price'] = price
+
+    try:
+        filters['rating'] = Q(rating__gte=float(rating))
+    except (TypeError, ValueError):
+        pass
+
+    return filters
+
+
+def apply_filters(queryset, filters, exclude=None):
+    """Narrow `queryset` by every active filter except `exclude`"""
+    for name, condition in filters.items():
+        if condition is not None and name != exclude:
+            queryset = queryset.filter(condition)
+    return queryset
+
+
+# ============ Counting ============
+
+def _count_values(queryset, facet_names):
+    """{facet: {value: (label, count)}} for workers in `queryset`"""
+    rows = WorkerFacet.objects.filter(
+        facet__in=facet_names, worker__in=queryset.values('pk')
+    ).values('facet', 'value').annotate(count=Count('worker'), label=Max('label'))
+
+    counts = {name: {} for name in facet_names}
+    for row in rows:
+        counts[row['facet']][row['value']] = (row['label'], row['count'])
+    return counts
+
+
+def facet_counts(queryset, filters):
+    """
+    Facet counts for a search as {facet: [{'value', 'label', 'count', ...}]}.
+    `queryset` holds the workers before the facet filters are applied.
+    """
+    # Facets whose own filter is inactive all count the fully filtered set
+    groups = {}
+    for facet, filter_name in FACET_FILTERS.items():
+        key = filter_name if filters.get(filter_name) is not None else None
+        groups.setdefault(key, []).append(facet)
+
+    counts = {}
+    for exclude, facet_names in groups.items():
+        counts.update(_count_values(apply_filters(queryset, filters, exclude), facet_names))
+
+    return {
+        'category': _top_values(counts['category']),
+        'price': _price_values(counts['price']),
+        'rating': _rating_values(counts['rating']),
+        'city': _top_values(counts['city']),
+        'area': _top_values(counts['area']),
+    }
+
+
+def _top_values(values):
+    ranked = sorted(values.items(), key=lambda item: (-item[1][1], item[1][0]))
+    return [
+        {'value': value, 'label': label, 'count': count}
+        for value, (label, count) in ranked[:MAX_VALUES]
+    ]
+
+
+def _price_values(values):
+    result = []
+    for low, high in PRICE_BUCKETS:
+        value = price_bucket(high if high is not None else low)
+        if high is None:
+            label = f'৳{low}+'
+        else:
+            label = f'Up to ৳{high}' if low is None else f'৳{low} - ৳{high}'
+        result.append({
+            'value': value, 'label': label, 'count': values.get(value, ('', 0))[1],
+            'min_price': low, 'max_price': high,
+        })
+    return result
+
+
+def _rating_values(values):
+    # Buckets are exclusive, the filter is a minimum, so counts accumulate
+    result = []
+    total = 0
+    for threshold in RATING_THRESHOLDS:
+        total += values.get(threshold, ('', 0))[1]
+        result.append({'value': threshold, 'label': f'{threshold}+', 'count': total})
+    return result
@@ -0,0 +1,186 @@
+"""
+Fuzzy Term Matching
+
+Lets misspelled, Banglish and Bengali script queries find the indexed
+terms they mean: "plamber" finds "plumber", "ilektrik" finds "electric",
+and "প্লাম্বার" finds "plumber" and the other way round.
+
+Every term is reduced to a phonetic key: Bengali script is transliterated
+to Latin, then the key keeps a leading vowel marker and the consonant
+skeleton, with sound-alike spellings merged (ph/f, v/bh/b, c/k/s, z/j, ...).
+The keys of the terms in category, skill, role and area names are split into
+character trigrams (SearchTrigram), so the terms closest to a query word
+are found with one indexed lookup and ranked by trigram similarity.
+
+core.search adds the terms of every indexed worker and falls back to
+similar_terms() for query words that match no term directly.
+"""
+import unicodedata
+
+from django.db.models import Count
+
+from .models import SearchTrigram
+
+
+# Fields whose terms are names worth matching fuzzily
+NAME_FIELDS = ('category', 'skill', 'role', 'area')
+
+# Minimum trigram similarity (Jaccard) of a fuzzy match, and the share of
+# the best match's similarity the other matches need ("klining" should
+# find "cleaning", not also "khulna")
+MIN_SIMILARITY = 0.4
+RELATIVE_SIMILARITY = 0.7
+
+# Keys shorter than this match too much to be looked up fuzzily
+MIN_KEY_LENGTH = 3
+
+MAX_ALTERNATIVES = 10
+
+# Terms sharing the most trigrams with the query are scored exactly
+CANDIDATE_LIMIT = 50
+
+
+# ============ Transliteration ============
+
+BENGALI_VOWELS = {
+    'অ': 'o', 'আ': 'a', 'ই': 'i', 'ঈ': 'i', 'উ': 'u', 'ঊ': 'u', 'ঋ': 'ri',
+    'এ': 'e', 'ঐ': 'oi', 'ও': 'o', 'ঔ': 'ou',
+}
+
+BENGALI_VOWEL_SIGNS = {
+    'া': 'a', 'ি': 'i', 'ী': 'i', 'ু': 'u', 'ূ': 'u', 'ৃ': 'ri',
+    'ে': 'e', 'ৈ': 'oi', 'ো': 'o', 'ৌ': 'ou',
+}
+
+BENGALI_CONSONANTS = {
+    'ক': 'k', 'খ': 'kh', 'গ': 'g', 'ঘ': 'gh', 'ঙ': 'ng',
+    'চ': 'ch', 'ছ': 'chh', 'জ': 'j', 'ঝ': 'jh', 'ঞ': 'n',
+    'ট': 't', 'ঠ': 'th', 'ড': 'd', 'ঢ': 'dh', 'ণ': 'n',
+    'ত': 't', 'থ': 'th', 'দ': 'd', 'ধ': 'dh', 'ন': 'n',
+    'প': 'p', 'ফ': 'ph', 'ব': 'b', 'ভ': 'bh', 'ম': 'm',
+    'য': 'j', 'র': 'r', 'ল': 'l', 'শ': 'sh', 'ষ': 'sh', 'স': 's', 'হ': 'h',
+    '\u09dc': 'r', '\u09dd': 'rh', '\u09df': 'y', 'ৎ': 't',  # ড় ঢ় য়
+}
+
+BENGALI_SIGNS = {'ং': 'ng', 'ঃ': 'h', 'ঁ': '', 'ৗ': ''}
+
+VIRAMA = '্'
+
+# NFC splits these into letter + nukta, they read as one letter
+NUKTA_LETTERS = {'\u09a1\u09bc': '\u09dc', '\u09a2\u09bc': '\u09dd', '\u09af\u09bc': '\u09df'}
+
+
+def transliterate(text):
+    """Romanize Bengali script phonetically, leaving other characters as they are"""
+    text = unicodedata.normalize('NFC', text)
+    for split, letter in NUKTA_LETTERS.items():
+        text = text.replace(split, letter)
+
+    out = []
+    for i, char in enumerate(text):
+        if char == 'য' and i and text[i - 1] == VIRAMA:
+            out.append('y')  # ya-phala only glides the consonant before it
+        elif char in BENGALI_CONSONANTS:
+            out.append(BENGALI_CONSONANTS[char])
+            following = text[i + 1] if i + 1 < len(text) else ''
+            # The inherent vowel, unless a sign, virama or the word end silences it
+            if following in BENGALI_CONSONANTS:
+                out.append('o')
+        elif char in BENGALI_VOWELS:
+            out.append(BENGALI_VOWELS[char])
+        elif char in BENGALI_VOWEL_SIGNS:
+            out.append(BENGALI_VOWEL_SIGNS[char])
+        elif char in BENGALI_SIGNS:
+            out.append(BENGALI_SIGNS[char])
+        elif char == VIRAMA:
+            continue
+        elif '০' <= char <= '৯':
+            out.append(str(ord(char) - ord('০')))
+        else:
+            out.append(char)
+    return ''.join(out)
+
+
+# ============ Phonetic keys ============
+
+DIGRAPHS = [
+    ('chh', 'c'), ('ch', 'c'), ('sh', 's'), ('kh', 'k'), ('gh', 'g'), ('th', 't'),
+    ('dh', 'd'), ('bh', 'b'), ('ph', 'f'), ('jh', 'j'), ('rh', 'r'), ('ck', 'k'), ('qu', 'k'),
+]
+
+# Letters merged with the one that sounds alike to Bengali speakers
+SOUND_ALIKE = {'q': 'k', 'x': 'ks', 'z': 'j', 'v': 'b'}
+
+VOWELS = set('aeiouyw')
+
+
+def phonetic_key(word):
+    """
+    Spelling-insensitive key of a word: "a" for a leading vowel, then the
+    consonants with sound-alike letters merged and repeats collapsed.
+    "plumber", "plamber" and "প্লাম্বার" all become "plmbr".
+    """
+    word = transliterate(word.lower())
+    for digraph, letter in DIGRAPHS:
+        word = word.replace(digraph, letter)
+
+    key = []
+    for i, char in enumerate(word):
+        if char == 'c':
+            # Soft before e, i and y ("service"), hard otherwise ("cleaner")
+            char = 's' if word[i + 1:i + 2] in ('e', 'i', 'y') else 'k'
+        char = SOUND_ALIKE.get(char, char)
+        if char in VOWELS or (char == 'h' and i):
+            if not i:
+                key.append('a')
+            continue
+        if not key or key[-1] != char:
+            key.append(char)
+    return ''.join(key)
+
+
+def trigrams(key):
+    """Character trigrams of a key, padded so short keys and word starts count"""
+    padded = f'$${key}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(first, second):
+    """Trigram similarity of two keys, 0..1"""
+    a, b = trigrams(first), trigrams(second)
+    return len(a & b) / len(a | b)
+
+
+# ============ Index ============
+
+def add_terms(terms):
+    """Index the trigrams of terms that are not indexed yet"""
+    terms = set(terms)
+    if not terms:
+        return
+    known = set(SearchTrigram.objects.filter(term__in=terms).values_list('term', flat=True))
+    SearchTrigram.objects.bulk_create([
+        SearchTrigram(term=term, trigram=trigram)
+        for term in terms - known
+        for trigram in trigrams(phonetic_key(term))
+    ], ignore_conflicts=True)
+
+
+def similar_terms(word, limit=MAX_ALTERNATIVES):
+    """Indexed name terms that sound like `word`, most similar first"""
+    key = phonetic_key(word)
+    if len(key) < MIN_KEY_LENGTH:
+        return []
+
+    candidates = SearchTrigram.objects.filter(trigram__in=trigrams(key)).values('term').annotate(
+        shared=Count('pk')
+    ).order_by('-shared', 'term')[:CANDIDATE_LIMIT]
+
+    scored = sorted(
+        ((similarity(key, phonetic_key(row['term'])), row['term']) for row in candidates),
+        key=lambda item: (-item[0], item[1]),
+    )
+    if not scored:
+        return []
+    cutoff = max(MIN_SIMILARITY, scored[0][0] * RELATIVE_SIMILARITY)
+    return [term for score, term in scored[:limit] if score >= cutoff]
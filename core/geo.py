@@ -0,0 +1,180 @@
+"""
+Geohash helpers for location based worker search
+
+Workers and bookings store latitude/longitude plus a geohash of the point.
+Radius queries first collect candidates by geohash cell (indexed range
+lookups), then rank them by exact great-circle distance.
+"""
+import math
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precision stored on the models (~5m x 5m cells)
+GEOHASH_PRECISION = 9
+
+# Upper bound on the number of cells a radius query may fan out to
+# (adjacent cells are merged into one range scan, see cell_ranges)
+MAX_QUERY_CELLS = 128
+
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 100.0
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    """Encode a coordinate into a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        value_range, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits = bits << 1
+            value_range[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(geohash)
+
+
+def cell_size_degrees(precision):
+    """Return (lat_degrees, lng_degrees) covered by one cell at a precision"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return (min_lat, min_lng, max_lat, max_lng) around a point"""
+    d_lat = radius_km / KM_PER_DEGREE_LAT
+    d_lng = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return (
+        max(lat - d_lat, -90.0), max(lng - d_lng, -180.0),
+        min(lat + d_lat, 90.0), min(lng + d_lng, 180.0),
+    )
+
+
+def covering_cells(lat, lng, radius_km):
+    """
+    Geohash cells covering the circle's bounding box, using the finest
+    precision that keeps the cell count within MAX_QUERY_CELLS.
+    """
+    min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius_km)
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lng = cell_size_degrees(precision)
+        rows = math.floor(max_lat / cell_lat) - math.floor(min_lat / cell_lat) + 1
+        cols = math.floor(max_lng / cell_lng) - math.floor(min_lng / cell_lng) + 1
+        if rows * cols <= MAX_QUERY_CELLS:
+            break
+
+    cells = set()
+    for row in range(rows):
+        point_lat = min(min_lat + row * cell_lat, max_lat)
+        for col in range(cols):
+            point_lng = min(min_lng + col * cell_lng, max_lng)
+            cells.add(encode_geohash(point_lat, point_lng, precision))
+    return cells
+
+
+def next_cell(cell):
+    """The cell following `cell` in geohash sort order, or None on overflow"""
+    digits = [GEOHASH_ALPHABET.index(char) for char in cell]
+    for position in range(len(digits) - 1, -1, -1):
+        if digits[position] < len(GEOHASH_ALPHABET) - 1:
+            digits[position] += 1
+            return ''.join(GEOHASH_ALPHABET[digit] for digit in digits[:position + 1]) + \
+                GEOHASH_ALPHABET[0] * (len(digits) - position - 1)
+        digits[position] = 0
+    return None
+
+
+def cell_ranges(cells):
+    """Collapse cells that are contiguous in sort order into (first, last) ranges"""
+    ranges = []
+    for cell in sorted(cells):
+        if ranges and next_cell(ranges[-1][1]) == cell:
+            ranges[-1][1] = cell
+        else:
+            ranges.append([cell, cell])
+    return ranges
+
+
+def cells_q(cells, field='geohash'):
+    """Q object matching any geohash inside the given cells (index-friendly range scans)"""
+    return reduce(or_, (
+        Q(**{f'{field}__gte': first, f'{field}__lt': last + '~'}) for first, last in cell_ranges(cells)
+    ))
+
+
+def parse_near(value):
+    """Parse a 'lat,lng' string, returns (lat, lng) or None"""
+    try:
+        lat, lng = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if not (math.isfinite(lat) and math.isfinite(lng)):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def parse_radius(value):
+    """Parse a radius in km, clamped to MAX_RADIUS_KM"""
+    try:
+        radius_km = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RADIUS_KM
+    # nan and inf would reach math.floor in covering_cells
+    if not (math.isfinite(radius_km) and radius_km > 0):
+        return DEFAULT_RADIUS_KM
+    return min(radius_km, MAX_RADIUS_KM)
+
+
+def nearby_distances(queryset, lat, lng, radius_km):
+    """
+    Return {pk: distance_km} for rows of `queryset` within `radius_km`,
+    ordered nearest first. The queryset's model needs latitude, longitude
+    and geohash fields.
+    """
+    candidates = queryset.filter(cells_q(covering_cells(lat, lng, radius_km))).values_list(
+        'pk', 'latitude', 'longitude'
+    )
+
+    distances = []
+    for pk, row_lat, row_lng in candidates:
+        distance = haversine_km(lat, lng, row_lat, row_lng)
+        if distance <= radius_km:
+            distances.append((distance, pk))
+    distances.sort()
+    return {pk: round(distance, 2) for distance, pk in distances}
@@ -0,0 +1,286 @@
+"""
+Geocoding Proxy
+
+Answers location autocomplete and reverse geocoding for the frontend in
+three layers:
+
+1. A bundled offline gazetteer of Bangladesh divisions, districts,
+   upazilas and Dhaka areas, held in an in-memory prefix tree.
+2. A persistent LRU cache (GeocodeCache) of past upstream lookups.
+3. A pluggable upstream (Nominatim by default), configured with the
+   GEOCODER_UPSTREAM setting so tests can swap in a local stub.
+"""
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .geo import haversine_km
+from .models import GeocodeCache
+from .search import tokenize
+from .trie import Trie
+
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'bd_gazetteer.json'
+
+# Ranking weight per gazetteer level, and how far a reverse lookup may snap to it
+KIND_WEIGHTS = {'division': 40, 'district': 30, 'area': 20, 'upazila': 10}
+REVERSE_MAX_KM = {'area': 2.5, 'upazila': 8.0, 'district': 25.0}
+
+# Rough bounding box of Bangladesh, outside it the gazetteer is skipped
+BD_BOUNDS = (20.5, 88.0, 26.7, 92.7)
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 8
+
+
+def normalize(text):
+    """Normalize a place name or query for prefix matching"""
+    return ' '.join(tokenize(text))
+
+
+def place_result(name, display_name, lat, lng, kind, source):
+    """Result dict in the shape the frontend already reads from Nominatim"""
+    return {
+        'name': name,
+        'display_name': display_name,
+        'lat': str(lat),
+        'lon': str(lng),
+        'type': kind,
+        'source': source,
+    }
+
+
+# ============ Layer 1: Offline Gazetteer ============
+
+class Gazetteer:
+    """Bundled Bangladesh place names with prefix search and nearest-place lookup"""
+
+    def __init__(self, places):
+        self.places = places
+        self.trie = Trie()
+
+        divisions = {p['name']: p for p in places if p['kind'] == 'division'}
+        districts = {p['name']: p for p in places if p['kind'] == 'district'}
+
+        for place_id, place in enumerate(places):
+            place['display_name'] = self._display_name(place, districts, divisions)
+            weight = KIND_WEIGHTS.get(place['kind'], 0)
+            names = [place['name'], place.get('name_bn', '')] + place.get('aliases', [])
+            for name in filter(None, names):
+                key = normalize(name)
+                self.trie.insert(key, place_id, place, weight + 5)
+                # Also match on later words, e.g. "bazar" -> "Cox's Bazar"
+                words = key.split(' ')
+                for i in range(1, len(words)):
+                    self.trie.insert(' '.join(words[i:]), place_id, place, weight)
+
+    @classmethod
+    def load(cls, path=GAZETTEER_PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _display_name(place, districts, divisions):
+        parts = [place['name']]
+        if place['kind'] in ('area', 'upazila'):
+            district = districts.get(place['parent'])
+            if district:
+                parts.append(district['name'])
+                place = district
+        if place['kind'] == 'district':
+            parts.append(f"{place['parent']} Division")
+        elif place['kind'] == 'division':
+            parts[0] = f"{place['name']} Division"
+        parts.append('Bangladesh')
+        return ', '.join(parts)
+
+    def _result(self, place):
+        return place_result(
+            place['name'], place['display_name'], place['lat'], place['lng'], place['kind'], 'gazetteer'
+        )
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        key = normalize(query)
+        if not key:
+            return []
+        return [self._result(place) for place in self.trie.search(key, limit)]
+
+    def reverse(self, lat, lng):
+        """Nearest area/upazila/district close enough to the point, or None"""
+        min_lat, min_lng, max_lat, max_lng = BD_BOUNDS
+        if not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+            return None
+
+        nearest = {}
+        for place in self.places:
+            if place['kind'] not in REVERSE_MAX_KM:
+                continue
+            distance = haversine_km(lat, lng, place['lat'], place['lng'])
+            current = nearest.get(place['kind'])
+            if current is None or distance < current[0]:
+                nearest[place['kind']] = (distance, place)
+
+        for kind, max_km in REVERSE_MAX_KM.items():
+            if kind in nearest and nearest[kind][0] <= max_km:
+                return self._result(nearest[kind][1])
+        return None
+
+
+_gazetteer = None
+
+
+def get_gazetteer():
+    """Process-wide gazetteer, loaded on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer.load()
+    return _gazetteer
+
+
+# ============ Layer 2: Persistent LRU Cache ============
+
+def cache_get(kind, key):
+    """Return cached results and mark the entry as recently used, or None"""
+    entry = GeocodeCache.objects.filter(kind=kind, key=key).only('pk', 'results').first()
+    if entry is None:
+        return None
+    GeocodeCache.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    return entry.results
+
+
+def cache_set(kind, key, results):
+    """Store results and evict the least recently used entries over GEOCODER_CACHE_SIZE"""
+    try:
+        GeocodeCache.objects.update_or_create(
+            kind=kind, key=key, defaults={'results': results, 'last_used_at': timezone.now()}
+        )
+    except IntegrityError:
+        # A concurrent request stored the same lookup first
+        return
+
+    max_size = getattr(settings, 'GEOCODER_CACHE_SIZE', 10000)
+    stale = GeocodeCache.objects.order_by('-last_used_at').values_list('pk', flat=True)[max_size:]
+    stale_ids = list(stale)
+    if stale_ids:
+        GeocodeCache.objects.filter(pk__in=stale_ids).delete()
+
+
+# ============ Layer 3: Upstream Geocoders ============
+
+class BaseUpstream:
+    """Interface of an upstream geocoder"""
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return a list of place results for a free text query"""
+        raise NotImplementedError
+
+    def reverse(self, lat, lng):
+        """Return one place result for a coordinate, or None"""
+        raise NotImplementedError
+
+
+class NullUpstream(BaseUpstream):
+    """Offline upstream - never finds anything. Use in tests or air-gapped setups."""
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        return []
+
+    def reverse(self, lat, lng):
+        return None
+
+
+class NominatimUpstream(BaseUpstream):
+    """OpenStreetMap Nominatim, restricted to Bangladesh"""
+    base_url = 'https://nominatim.openstreetmap.org'
+
+    def _get(self, path, params):
+        import requests
+
+        response = requests.get(
+            f"{self.base_url}/{path}",
+            params={'format': 'json', **params},
+            headers={'User-Agent': getattr(settings, 'GEOCODER_USER_AGENT', 'SkillHat')},
+            timeout=5,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _result(self, item):
+        display_name = item.get('display_name', '')
+        return place_result(
+            item.get('name') or display_name.split(',')[0], display_name,
+            item.get('lat'), item.get('lon'), item.get('type', ''), 'upstream'
+        )
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        data = self._get('search', {'q': query, 'countrycodes': 'bd', 'limit': limit})
+        return [self._result(item) for item in data]
+
+    def reverse(self, lat, lng):
+        data = self._get('reverse', {'lat': lat, 'lon': lng})
+        if not data or 'display_name' not in data:
+            return None
+        return self._result(data)
+
+
+def get_upstream():
+    """Instantiate the upstream configured in settings.GEOCODER_UPSTREAM"""
+    path = getattr(settings, 'GEOCODER_UPSTREAM', 'core.geocoding.NominatimUpstream')
+    return import_string(path)()
+
+
+# ============ Public API ============
+
+def autocomplete(query, limit=DEFAULT_LIMIT, upstream=None):
+    """
+    Suggest places for a partial query.
+    Returns (results, source) where source is gazetteer, cache or upstream.
+    """
+    key = normalize(query)
+    if len(key) < MIN_QUERY_LENGTH:
+        return [], 'gazetteer'
+
+    results = get_gazetteer().search(key, limit)
+    if results:
+        return results, 'gazetteer'
+
+    cached = cache_get('search', key)
+    if cached is not None:
+        return cached[:limit], 'cache'
+
+    upstream = upstream or get_upstream()
+    try:
+        results = upstream.search(query, limit)
+    except Exception:
+        return [], 'upstream'
+    cache_set('search', key, results)
+    return results, 'upstream'
+
+
+def reverse(lat, lng, upstream=None):
+    """
+    Describe the place at a coordinate.
+    Returns (result or None, source).
+    """
+    result = get_gazetteer().reverse(lat, lng)
+    if result:
+        return result, 'gazetteer'
+
+    # ~11m grid so nearby map clicks share one cache entry
+    key = f"{lat:.4f},{lng:.4f}"
+    cached = cache_get('reverse', key)
+    if cached is not None:
+        return (cached[0] if cached else None), 'cache'
+
+    upstream = upstream or get_upstream()
+    try:
+        result = upstream.reverse(lat, lng)
+    except Exception:
+        return None, 'upstream'
+    cache_set('reverse', key, [result] if result else [])
+    return result, 'upstream'
@@ -0,0 +1,180 @@
+"""
+Responsive Image Derivatives
+
+Worker photos, portfolio, service and category images are kept as uploaded
+and resized with Pillow into a few fixed widths (DERIVATIVE_WIDTHS), each
+in WebP and JPEG. The storage names and dimensions of the derivatives are
+stored on the row in a JSON field next to the image (IMAGE_FIELDS), so
+pages build `srcset` attributes without touching storage:
+
+    {'card': {'width': 480, 'height': 320, 'sha256': '<hash of the original>',
+              'webp': 'content/1f/0c/1f0c...webp', 'jpeg': 'content/9a/d2/9ad2...jpg'}, ...}
+
+Uploads are processed in the background by core.media_queue, which also
+strips their EXIF metadata. Files are written to the content-addressed
+storage (core.storage), which keeps the derivatives with their original.
+"""
+import hashlib
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .storage import is_content_name
+
+
+# Derivative name -> width in pixels, images are never upscaled
+DERIVATIVE_WIDTHS = {'thumb': 160, 'card': 480, 'full': 1200}
+
+# Format -> (file extension, Pillow save options)
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Model label -> (image field, JSON field holding its derivatives, processing status field)
+IMAGE_FIELDS = {
+    'core.Worker': ('profile_photo', 'profile_photo_derivatives', 'profile_photo_status'),
+    'core.WorkPortfolio': ('image', 'image_derivatives', 'image_status'),
+    'core.Service': ('image', 'image_derivatives', 'image_status'),
+    'core.Category': ('image', 'image_derivatives', 'image_status'),
+}
+
+# Upload backgrounds are flattened on white for JPEG
+BACKGROUND = (255, 255, 255)
+
+# Shown instead of an image that is not processed yet (see core.media_queue)
+PLACEHOLDER = 'images/default-avatar.png'
+
+# Processing state of an uploaded image
+STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('ready', 'Ready'),
+    ('failed', 'Failed'),
+]
+
+# Originals are re-encoded without their metadata in these formats
+STRIP_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+
+
+def _read(name, storage):
+    with storage.open(name, 'rb') as f:
+        return f.read()
+
+
+def _decode(data):
+    """The image in `data`, or None when it cannot be decoded"""
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return image
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def derivatives_digest(derivatives):
+    """Content hash of the original the derivatives were made from, or None"""
+    return next(iter((derivatives or {}).values()), {}).get('sha256')
+
+
+def _rgb(image):
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        flat = Image.new('RGB', image.size, BACKGROUND)
+        flat.paste(image, mask=image.getchannel('A'))
+        return flat
+    return image.convert('RGB')
+
+
+def strip_metadata(image):
+    """
+    Re-encode an original carrying EXIF data (orientation, camera, location)
+    upright and without it. Returns the upright image and the new file
+    content, None when the original can be kept as is.
+    """
+    upright = ImageOps.exif_transpose(image)
+    if not image.getexif() or image.format not in STRIP_OPTIONS:
+        return upright, None
+    buffer = io.BytesIO()
+    upright.save(
+        buffer, format=image.format, icc_profile=image.info.get('icc_profile'), **STRIP_OPTIONS[image.format]
+    )
+    return upright, buffer.getvalue()
+
+
+def generate(image, name, sha256, storage=default_storage):
+    """
+    Write the derivatives of `image`, stored as `name` with content hash
+    `sha256`, and return their description
+    """
+    image = _rgb(image)
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    derivatives, by_width = {}, {}
+    for size, width in sorted(DERIVATIVE_WIDTHS.items(), key=lambda item: item[1]):
+        width = min(width, image.width)
+        if width not in by_width:
+            # Small originals give the same width for several sizes, written once
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            entry = {'width': width, 'height': height, 'sha256': sha256}
+            for fmt, (extension, options) in FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, **options)
+                entry[fmt] = storage.write(f'{stem}-{width}w.{extension}', ContentFile(buffer.getvalue()))
+            by_width[width] = entry
+        derivatives[size] = by_width[width]
+    return derivatives
+
+
+def process(name, derivatives=None):
+    """
+    Decode a stored upload, strip its metadata and write its derivatives.
+    Returns {'name': original, 'derivatives': {...}}, None when the file is
+    not an image. The original gets a new name when it was rewritten, or
+    moved from a name that is not content-addressed. Current `derivatives`,
+    made from the same content, are returned as they are.
+    Runs in a process pool, so it only writes to storage (see core.storage).
+    """
+    data = _read(name, default_storage)
+    if derivatives and is_content_name(name) and derivatives_digest(derivatives) == digest(data):
+        return {'name': name, 'derivatives': derivatives}
+    image = _decode(data)
+    if image is None:
+        return None
+    upright, stripped = strip_metadata(image)
+    if stripped is not None or not is_content_name(name):
+        name = default_storage.write(name, ContentFile(stripped or data))
+    return {'name': name, 'derivatives': generate(upright, name, digest(stripped or data))}
+
+
+def files(derivatives):
+    """Storage names of the files of some derivatives"""
+    names = {entry.get(fmt) for entry in (derivatives or {}).values() for fmt in FORMATS}
+    return names - {None}
+
+
+# ============ Accessors ============
+
+def url(derivatives, size, fmt='jpeg'):
+    """URL of one derivative, or None"""
+    name = (derivatives or {}).get(size, {}).get(fmt)
+    return default_storage.url(name) if name else None
+
+
+def srcset(derivatives, fmt='jpeg'):
+    """`srcset` attribute value over the derivatives in one format, '' without any"""
+    entries = {entry['width']: entry for entry in (derivatives or {}).values()}
+    entries = [entries[width] for width in sorted(entries)]
+    return ', '.join(
+        f'{default_storage.url(entry[fmt])} {entry["width"]}w' for entry in entries if entry.get(fmt)
+    )
@@ -0,0 +1,131 @@
+"""
+Top Worker Leaderboards
+
+Keeps the LEADERBOARD_SIZE best available workers (highest rating, then
+most jobs) of every leaderboard in LeaderboardEntry: one over all workers,
+one per category and one per city. Reading a leaderboard is a single index
+range of at most LEADERBOARD_SIZE rows instead of sorting the worker table.
+
+The boards of a worker are its category and city facet values (see
+core.facets), named like the facets: 'category:plumbing', 'city:dhaka'.
+When a worker's rating, jobs, availability, categories or city change, the
+signals in core.signals call worker_changed(), which only touches that
+worker's boards. A board is recomputed from the workers only when one of its
+members drops out and the next best is unknown.
+"""
+from django.db import transaction
+
+from .models import LeaderboardEntry, Worker, WorkerFacet
+
+
+LEADERBOARD_SIZE = 20
+
+ALL_BOARD = 'all'
+
+# Facets that have a leaderboard per value
+BOARD_FACETS = ('category', 'city')
+
+
+def board_name(facet, value):
+    return f'{facet}:{value}'
+
+
+def _rank(rating, total_jobs, worker_id):
+    """Sort key, best first"""
+    return (-rating, -total_jobs, worker_id)
+
+
+def top(board=ALL_BOARD, limit=LEADERBOARD_SIZE):
+    """Ids of the best workers of a board, best first"""
+    return list(LeaderboardEntry.objects.filter(board=board).order_by(
+        '-rating', '-total_jobs', 'worker'
+    ).values_list('worker', flat=True)[:min(limit, LEADERBOARD_SIZE)])
+
+
+def worker_boards(worker):
+    """Boards an available worker competes on"""
+    if not worker.is_available:
+        return set()
+    facets = WorkerFacet.objects.filter(worker=worker, facet__in=BOARD_FACETS).values_list('facet', 'value')
+    return {ALL_BOARD} | {board_name(facet, value) for facet, value in facets}
+
+
+# ============ Maintenance ============
+
+def _candidates(board):
+    """Available workers of a board, best first"""
+    workers = Worker.objects.filter(is_available=True)
+    if board != ALL_BOARD:
+        facet, value = board.split(':', 1)
+        workers = workers.filter(facets__facet=facet, facets__value=value)
+    return workers.order_by('-rating', '-total_jobs', 'pk')
+
+
+def rebuild_board(board):
+    """Recompute one board from the workers"""
+    rows = _candidates(board).values_list('pk', 'rating', 'total_jobs')[:LEADERBOARD_SIZE]
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(board=board).delete()
+        LeaderboardEntry.objects.bulk_create([
+            LeaderboardEntry(board=board, worker_id=pk, rating=rating, total_jobs=jobs)
+            for pk, rating, jobs in rows
+        ])
+
+
+def rebuild():
+    """Recompute every board, returns the number of boards"""
+    boards = {ALL_BOARD} | {
+        board_name(facet, value)
+        for facet, value in WorkerFacet.objects.filter(facet__in=BOARD_FACETS).values_list('facet', 'value').distinct()
+    }
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        for board in sorted(boards):
+            rebuild_board(board)
+    return len(boards)
+
+
+def worker_changed(worker):
+    """Move a worker up, down, into or out of its boards after a change"""
+    current = worker_boards(worker)
+    member_of = set(LeaderboardEntry.objects.filter(worker=worker).values_list('board', flat=True))
+    boards = current | member_of
+    if not boards:
+        return
+
+    entries = {}
+    for board, worker_id, rating, jobs in LeaderboardEntry.objects.filter(board__in=boards).values_list(
+        'board', 'worker', 'rating', 'total_jobs'
+    ):
+        if worker_id != worker.pk:
+            entries.setdefault(board, []).append(_rank(rating, jobs, worker_id))
+
+    rank = _rank(worker.rating, worker.total_jobs, worker.pk)
+    with transaction.atomic():
+        for board in boards:
+            others = sorted(entries.get(board, []))
+            if board in member_of and len(others) + 1 >= LEADERBOARD_SIZE:
+                # On a full board the worker only keeps its place ahead of the
+                # last other member, below that the next best outsider is unknown
+                if board in current and rank < others[-1]:
+                    _save_entry(board, worker)
+                else:
+                    rebuild_board(board)
+            elif board in current and (len(others) < LEADERBOARD_SIZE or rank < others[-1]):
+                _save_entry(board, worker)
+                if len(others) >= LEADERBOARD_SIZE:
+                    # Pushes the last worker off the board
+                    LeaderboardEntry.objects.filter(board=board, worker=others[-1][2]).delete()
+            elif board in member_of:
+                LeaderboardEntry.objects.filter(board=board, worker=worker).delete()
+
+
+def _save_entry(board, worker):
+    LeaderboardEntry.objects.update_or_create(
+        board=board, worker=worker, defaults={'rating': worker.rating, 'total_jobs': worker.total_jobs},
+    )
+
+
+def board_removed(board):
+    """Drop a board whose category or city is gone"""
+    LeaderboardEntry.objects.filter(board=board).delete()
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from core.models import Category, Worker, display_name_for
+
+
+class Command(BaseCommand):
+    help = 'Fills the denormalized worker card fields (display name, primary category) for existing workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        workers = Worker.objects.order_by('pk').select_related('user').prefetch_related(
+            Prefetch('categories', queryset=Category.objects.only('slug', 'name'))
+        )
+
+        self.stdout.write('Backfilling worker card fields...')
+        changed = []
+        count = 0
+        for worker in workers.iterator(chunk_size=batch_size):
+            categories = list(worker.categories.all())
+            display_name = display_name_for(worker.user)
+            primary_category_slug = categories[0].slug if categories else ''
+            if (worker.display_name, worker.primary_category_slug) != (display_name, primary_category_slug):
+                worker.display_name = display_name
+                worker.primary_category_slug = primary_category_slug
+                changed.append(worker)
+            if len(changed) >= batch_size:
+                count += Worker.objects.bulk_update(changed, ['display_name', 'primary_category_slug'])
+                changed = []
+        if changed:
+            count += Worker.objects.bulk_update(changed, ['display_name', 'primary_category_slug'])
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {count} workers.'))
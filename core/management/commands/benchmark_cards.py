@@ -0,0 +1,69 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test.utils import override_settings
+
+from core.models import Worker
+from skill_hat.views import CARD_FIELDS, card_versions, worker_card
+
+
+# One result set rendered through each card component, like the homepage and search pages do
+PAGES = {
+    'usercard': "{% for worker in workers %}{% include 'components/usercard.html' with worker=worker %}{% endfor %}",
+    'resultcard': "{% for worker in workers %}{% include 'components/resultcard.html' with worker=worker %}{% endfor %}",
+}
+
+FRAGMENT_CACHES = {
+    'uncached': 'django.core.cache.backends.dummy.DummyCache',
+    'cached': 'django.core.cache.backends.locmem.LocMemCache',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures rendering of the worker card components for a result set, '
+        'without the fragment cache, with a cold cache and with a warm one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1000, help='Result set size (default 1000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed renders per case, the best is kept (default 5)')
+
+    def handle(self, *args, **options):
+        ids = list(Worker.objects.order_by('pk').values_list('pk', flat=True)[:options['workers']])
+        if not ids:
+            raise CommandError('No workers to render, seed the database first.')
+        if len(ids) < options['workers']:
+            self.stdout.write(self.style.WARNING(f'Only {len(ids)} workers in the database.'))
+
+        versions = card_versions(ids)
+        workers = Worker.objects.only(*CARD_FIELDS).in_bulk(ids)
+        cards = [dict(worker_card(workers[pk], versions[pk]), distance=None) for pk in ids]
+        context = {'workers': cards, 'user': AnonymousUser()}
+
+        self.stdout.write(f'{len(cards)} cards, best of {options["repeat"]} renders (ms)')
+        self.stdout.write(f'{"component":<12}{"uncached":>10}{"cold":>10}{"warm":>10}')
+        for name, source in PAGES.items():
+            template = engines['django'].from_string(source)
+            uncached = self.best(template, context, 'uncached', options['repeat'], warm=False)
+            cold = self.best(template, context, 'cached', options['repeat'], warm=False)
+            warm = self.best(template, context, 'cached', options['repeat'], warm=True)
+            self.stdout.write(f'{name:<12}{uncached:>10.1f}{cold:>10.1f}{warm:>10.1f}')
+
+    def best(self, template, context, backend, repeat, warm):
+        """Fastest render, each against a fresh fragment cache unless `warm`"""
+        timings = []
+        for run in range(repeat):
+            # A distinct location per run starts from an empty cache
+            location = f'card-benchmark-{backend}-{warm}-{run}-{time.time_ns()}'
+            with override_settings(CACHES={'default': {
+                'BACKEND': FRAGMENT_CACHES[backend], 'LOCATION': location, 'OPTIONS': {'MAX_ENTRIES': 100000},
+            }}):
+                if warm:
+                    template.render(context)
+                started = time.perf_counter()
+                template.render(context)
+                timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
@@ -0,0 +1,97 @@
+import json
+import math
+
+from django.core.management.base import BaseCommand, CommandError
+from core import facets, ranking, search, search_cache
+from core.models import Worker
+
+
+def dcg(grades):
+    return sum((2 ** grade - 1) / math.log2(position + 2) for position, grade in enumerate(grades))
+
+
+def ndcg(ranked, judged, k):
+    """Normalized discounted cumulative gain of the first k results"""
+    ideal = dcg(sorted(judged.values(), reverse=True)[:k])
+    if not ideal:
+        return 0.0
+    return dcg([judged.get(pk, 0) for pk in ranked[:k]]) / ideal
+
+
+def reciprocal_rank(ranked, judged):
+    """1 / position of the first relevant result, 0 when none is found"""
+    for position, pk in enumerate(ranked, 1):
+        if judged.get(pk, 0) > 0:
+            return 1 / position
+    return 0.0
+
+
+def parse_weights(value):
+    """'text=3,distance=1' -> {'text': 3.0, 'distance': 1.0}"""
+    weights = {}
+    for pair in filter(None, value.split(',')):
+        name, _, number = pair.partition('=')
+        try:
+            weights[name.strip()] = float(number)
+        except ValueError:
+            raise CommandError(f'Invalid weight "{pair}", expected name=number.')
+    return weights
+
+
+class Command(BaseCommand):
+    help = (
+        'Evaluates relevance ranking against graded judgments (NDCG@k, MRR). '
+        'The judgments file is a JSON list of {"params": {search parameters}, '
+        '"relevant": {"<worker id>": grade}} with grades from 0 (irrelevant) to 3.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('judgments', help='Path to the judgments JSON file')
+        parser.add_argument(
+            '--weights', action='append', default=[],
+            help='Weighting to compare against the configured one, e.g. "text=3,distance=1". Repeatable.',
+        )
+        parser.add_argument('--k', type=int, default=10, help='Cutoff for NDCG (default 10)')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['judgments'], encoding='utf-8') as f:
+                judgments = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read judgments: {e}')
+
+        try:
+            weightings = [('configured', ranking.get_weights())] + [
+                (value, ranking.get_weights(parse_weights(value))) for value in options['weights']
+            ]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        k = options['k']
+        totals = {label: [0.0, 0.0] for label, _ in weightings}
+        for case in judgments:
+            params = search_cache.normalize_params(case.get('params', {}))
+            judged = {int(pk): grade for pk, grade in case.get('relevant', {}).items()}
+
+            queryset, search_filters, distances = search.filter_workers(
+                Worker.objects.filter(is_available=True), params
+            )
+            queryset = facets.apply_filters(queryset, search_filters)
+            ids, columns = ranking.candidate_signals(queryset, params['q'], distances)
+
+            self.stdout.write(f'{json.dumps(case.get("params", {}), ensure_ascii=False)} ({len(ids)} candidates)')
+            for label, weights in weightings:
+                scores = ranking.combine(ids, columns, weights)
+                ranked = ranking.order(scores)
+                case_ndcg, case_rr = ndcg(ranked, judged, k), reciprocal_rank(ranked, judged)
+                totals[label][0] += case_ndcg
+                totals[label][1] += case_rr
+                self.stdout.write(f'  {label}: NDCG@{k} {case_ndcg:.3f}  RR {case_rr:.3f}')
+
+        count = max(len(judgments), 1)
+        self.stdout.write('')
+        for label, weights in weightings:
+            mean_ndcg, mean_rr = (total / count for total in totals[label])
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: mean NDCG@{k} {mean_ndcg:.3f}  MRR {mean_rr:.3f}  {weights}'
+            ))
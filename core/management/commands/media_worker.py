@@ -0,0 +1,30 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from core import media_queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Processes queued image uploads (EXIF orientation and stripping, derivatives) '
+        'in a process pool. Runs until stopped, or until the queue is empty with --once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Pool size (default: CPU count)')
+        parser.add_argument('--batch', type=int, default=20, help='Jobs claimed at a time (default 20)')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between polls of an empty queue (default 2)')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        with media_queue.pool(options['processes']) as executor:
+            while True:
+                jobs = media_queue.claim(options['batch'])
+                if jobs:
+                    failed = media_queue.run(jobs, executor)
+                    self.stdout.write(f'Processed {len(jobs) - failed} images, {failed} failed.')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll'])
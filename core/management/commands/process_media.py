@@ -0,0 +1,123 @@
+import json
+import os
+import time
+from concurrent.futures import as_completed
+from itertools import islice
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core import images, media_queue
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Processes the existing worker, portfolio, service and category images '
+        '(EXIF orientation and stripping, derivatives) in a process pool, moving them to '
+        'content-addressed names. Images whose derivatives were made from their current '
+        'content are skipped, and progress is '
+        'checkpointed so an interrupted run resumes where it stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Pool size (default: CPU count)')
+        parser.add_argument('--chunk', type=int, default=200, help='Rows read and checkpointed at a time (default 200)')
+        parser.add_argument(
+            '--checkpoint', default=str(Path(settings.MEDIA_ROOT) / '.process_media.json'),
+            help='Checkpoint file (default: .process_media.json in MEDIA_ROOT)',
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
+
+    def handle(self, *args, **options):
+        checkpoint_path = Path(options['checkpoint'])
+        checkpoint = {} if options['restart'] else self.load_checkpoint(checkpoint_path)
+        if checkpoint:
+            self.stdout.write(f'Resuming after {checkpoint}')
+
+        totals = {'processed': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+        started = time.perf_counter()
+        with media_queue.pool(options['processes']) as executor:
+            for label, (image_field, json_field, _) in images.IMAGE_FIELDS.items():
+                rows = apps.get_model(label).objects.filter(
+                    pk__gt=checkpoint.get(label, 0)
+                ).exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True}).order_by('pk')
+
+                rows = rows.values_list('pk', image_field, json_field).iterator(chunk_size=options['chunk'])
+                for chunk in chunked(rows, options['chunk']):
+                    self.run_chunk(executor, label, chunk, totals)
+                    checkpoint[label] = chunk[-1][0]
+                    self.save_checkpoint(checkpoint_path, checkpoint)
+                    self.report(totals, started)
+
+        # A finished run starts over next time
+        checkpoint_path.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def run_chunk(self, executor, label, chunk, totals):
+        futures = {}
+        for pk, name, derivatives in chunk:
+            # An image processed under another row takes its recorded derivatives
+            known = media_queue.recorded(name)
+            if known is None:
+                futures[executor.submit(images.process, name, derivatives)] = (pk, name, derivatives)
+            elif known['derivatives'] == derivatives:
+                totals['skipped'] += 1
+            else:
+                self.store(label, pk, name, known)
+                totals['processed'] += 1
+
+        for future in as_completed(futures):
+            pk, name, derivatives = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                totals['failed'] += 1
+                self.stderr.write(f'{label} #{pk} ({name}): {type(e).__name__}: {e}')
+                continue
+
+            if result is not None and result == {'name': name, 'derivatives': derivatives}:
+                totals['skipped'] += 1
+                continue
+            self.store(label, pk, name, result)
+            if result is None:
+                totals['failed'] += 1
+                self.stderr.write(f'{label} #{pk} ({name}): not an image')
+            else:
+                totals['processed'] += 1
+                totals['bytes'] += default_storage.size(result['name'])
+
+    def store(self, label, pk, name, result):
+        with transaction.atomic():
+            media_queue.store_result(label, pk, name, result)
+
+    def report(self, totals, started):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(
+            f'{totals["processed"]} processed, {totals["skipped"]} skipped, {totals["failed"]} failed '
+            f'in {elapsed:.1f}s ({totals["processed"] / elapsed:.1f} images/s, '
+            f'{totals["bytes"] / elapsed / 1e6:.1f} MB/s)'
+        )
+
+    def load_checkpoint(self, path):
+        try:
+            return json.loads(path.read_text())
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            raise CommandError(f'Unreadable checkpoint {path}, remove it or pass --restart.')
+
+    def save_checkpoint(self, path, checkpoint):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so an interruption never leaves half a checkpoint
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(checkpoint))
+        os.replace(temporary, path)
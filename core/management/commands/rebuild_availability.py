@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from core import availability
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the worker occupancy bitmaps used by availability search from the bookings'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding worker occupancy...')
+        count = availability.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} worker-days.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from core import leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the top worker leaderboards (all workers, per category and per city)'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding leaderboards...')
+        count = leaderboard.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} leaderboards.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core import search, service_search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the worker search index (documents, posting lists and facets) and the service index from scratch'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding worker search index...')
+        count = search.rebuild_index()
+        services = service_search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} workers and {services} services.'))
@@ -0,0 +1,165 @@
+"""
+Media File Serving
+
+skill_hat.views.media_view serves MEDIA_ROOT in every environment. A file
+first passes the access rule of its top-level directory (ACCESS_RULES),
+then its transfer is handed to the front proxy named by MEDIA_ACCEL:
+
+    nginx   X-Accel-Redirect to MEDIA_ACCEL_PREFIX + name, an `internal`
+            location aliasing MEDIA_ROOT
+    apache  X-Sendfile with the absolute path (mod_xsendfile)
+
+Without a proxy the file goes out in a FileResponse, which gunicorn sends
+with sendfile(2) through wsgi.file_wrapper, a single byte range of it for
+Range requests. ETags of content-addressed files (core.storage) are their
+content hash and they are cacheable forever; other files are validated
+by size and modification time.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse
+from django.utils._os import safe_join
+
+from .models import Booking
+from .storage import CONTENT_DIR, is_content_name
+
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Files that may be replaced under the same name
+REVALIDATE = 'public, max-age=3600'
+
+# Files behind an access rule, never kept by shared caches
+PRIVATE = 'private, max-age=3600'
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def booking_participant(request, name):
+    """bookings/<id>/...: only the booking's client and worker"""
+    booking_id = name.split('/')[1]
+    if not booking_id.isdigit() or not request.user.is_authenticated:
+        return False
+    return Booking.objects.filter(Q(client=request.user) | Q(worker__user=request.user), pk=booking_id).exists()
+
+
+# Top-level media directory -> rule(request, name) deciding who may read its files, the rest is public
+ACCESS_RULES = {
+    'bookings': booking_participant,
+}
+
+
+def resolve(name):
+    """Absolute path of a servable media file, None for anything else"""
+    if any(part.startswith('.') for part in name.split('/')) or name.startswith(f'{CONTENT_DIR}/tmp/'):
+        return None
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def is_protected(name):
+    return name.split('/', 1)[0] in ACCESS_RULES
+
+
+def allowed(request, name):
+    rule = ACCESS_RULES.get(name.split('/', 1)[0])
+    return rule is None or rule(request, name)
+
+
+def etag(name, stat):
+    if is_content_name(name):
+        return f'"{posixpath.splitext(posixpath.basename(name))[0]}"'
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def cache_control(name):
+    if is_protected(name):
+        return PRIVATE
+    return IMMUTABLE if is_content_name(name) else REVALIDATE
+
+
+def byte_range(header, size):
+    """
+    (first, last) byte of a single-range Range header, None to send the
+    whole file (no header, several ranges, bad syntax). Raises ValueError
+    when the range is unsatisfiable.
+    """
+    match = RANGE.match(header or '')
+    if match is None or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N, the last N bytes
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first, last = int(first), min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        raise ValueError(header)
+    return first, last
+
+
+class FileSpan:
+    """
+    `length` bytes of an open file from its current position. It keeps
+    fileno(), so gunicorn still sends the span with sendfile(2).
+    """
+
+    def __init__(self, file, length):
+        self.file, self.remaining = file, length
+
+    def read(self, size=-1):
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def response(request, name, path, stat, etag):
+    """The response transferring a file, without its caching headers"""
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    accel = getattr(settings, 'MEDIA_ACCEL', '')
+    if accel == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+        return response
+    if accel == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    # A range of a changed file would be mixed with the copy the client has
+    if request.headers.get('If-Range', etag) != etag:
+        span = None
+    else:
+        try:
+            span = byte_range(request.headers.get('Range'), stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    file = open(path, 'rb')
+    if span is None:
+        return FileResponse(file, content_type=content_type)
+    first, last = span
+    file.seek(first)
+    response = FileResponse(FileSpan(file, last - first + 1), status=206, content_type=content_type)
+    response['Content-Length'] = last - first + 1
+    response['Content-Range'] = f'bytes {first}-{last}/{stat.st_size}'
+    return response
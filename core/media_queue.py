@@ -0,0 +1,191 @@
+"""
+Background Media Processing
+
+Uploaded images are written to storage as sent and marked pending. The
+slow part (decoding, EXIF orientation and stripping, derivatives, see
+core.images) runs later in `manage.py media_worker`, in a process pool,
+outside the request and its transaction. Pages show images.PLACEHOLDER
+until the image is ready.
+
+The signals in core.signals queue a MediaJob whenever a stored image
+changes. With the MEDIA_QUEUE_EAGER setting (on with DEBUG) the job runs
+in the request process right after the commit instead, so development
+needs no worker.
+
+An image already processed under another row (the same content, see
+core.storage) takes the recorded derivatives without being processed.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import images, page_cache, search_cache
+from .models import MediaJob
+
+
+MAX_ATTEMPTS = 3
+
+# A running job not finished by then is assumed lost with its worker and claimed again
+STALE_AFTER = timedelta(minutes=10)
+
+
+def store_upload(model, field_name, upload):
+    """Write an upload to storage ahead of any transaction, returns the name to assign to the field"""
+    field = model._meta.get_field(field_name)
+    return field.storage.save(field.generate_filename(None, upload.name), upload, max_length=field.max_length)
+
+
+def invalidate(instance):
+    """Orphan the cached searches, pages and cards showing an instance's image"""
+    label = instance._meta.label
+    if label == 'core.Worker':
+        # The photo shows on cards and the profile, not in what searches find
+        search_cache.invalidate_tags(search_cache.worker_tags([instance.pk]))
+    elif label == 'core.Category':
+        search_cache.invalidate_categories([instance.slug])
+        search_cache.invalidate_tags([page_cache.CATEGORY_LIST_TAG])
+    else:
+        search_cache.invalidate_tags(search_cache.worker_tags([instance.worker_id]))
+
+
+def _update(instance, values):
+    type(instance).objects.filter(pk=instance.pk).update(**values)
+    for name, value in values.items():
+        setattr(instance, name, value)
+    invalidate(instance)
+
+
+def enqueue(instance):
+    """Mark an instance's changed image pending and queue its processing, returns the job"""
+    label = instance._meta.label
+    image_field, json_field, status_field = images.IMAGE_FIELDS[label]
+    name = getattr(instance, image_field).name
+
+    if not name:
+        _update(instance, {json_field: {}, status_field: 'ready'})
+        return None
+
+    _update(instance, {json_field: {}, status_field: 'pending'})
+    if getattr(settings, 'MEDIA_QUEUE_EAGER', False):
+        job = MediaJob.objects.create(model=label, object_id=instance.pk, name=name, status='running', attempts=1)
+        transaction.on_commit(lambda: run([job]))
+    else:
+        job = MediaJob.objects.create(model=label, object_id=instance.pk, name=name)
+    return job
+
+
+# ============ Worker ============
+
+def pool(processes=None):
+    """Process pool for images.process(), its processes set Django up to reach storage"""
+    return ProcessPoolExecutor(max_workers=processes, initializer=django.setup)
+
+
+def claim(limit):
+    """Mark up to `limit` of the oldest waiting jobs running and return them"""
+    now = timezone.now()
+    waiting = Q(status='pending') | Q(status='running', updated_at__lt=now - STALE_AFTER)
+    ids = list(MediaJob.objects.filter(waiting).order_by('created_at').values_list('pk', flat=True)[:limit])
+    MediaJob.objects.filter(waiting, pk__in=ids).update(status='running', attempts=F('attempts') + 1, updated_at=now)
+    return list(MediaJob.objects.filter(pk__in=ids, status='running', updated_at=now).order_by('created_at'))
+
+
+def run(jobs, executor=None):
+    """
+    Process claimed jobs, in `executor` when given, else in this process.
+    Returns the number of jobs that failed.
+    """
+    outcomes = []
+    for job in jobs:
+        known = recorded(job.name)
+        if known is not None:
+            outcomes.append(lambda known=known: known)
+        elif executor is not None:
+            outcomes.append(executor.submit(images.process, job.name).result)
+        else:
+            outcomes.append(lambda job=job: images.process(job.name))
+
+    failed = 0
+    for job, outcome in zip(jobs, outcomes):
+        try:
+            result = outcome()
+        except Exception as e:
+            failed += 1
+            fail(job, f'{type(e).__name__}: {e}')
+        else:
+            finish(job, result)
+    return failed
+
+
+def recorded(name):
+    """The images.process() result for an image whose derivatives storage already has, else None"""
+    derivatives = default_storage.derivatives(name)
+    return {'name': name, 'derivatives': derivatives} if derivatives else None
+
+
+def _apply(label, object_id, name, values):
+    """Store values on a row if it still has the image `name`, returns the row or None"""
+    image_field = images.IMAGE_FIELDS[label][0]
+    row = apps.get_model(label).objects.filter(pk=object_id, **{image_field: name}).first()
+    if row is not None:
+        _update(row, values)
+    return row
+
+
+def store_result(label, object_id, name, result):
+    """
+    Mark a row's image `name` ready with what images.process() returned, or
+    failed when it was not an image. A rewritten original replaces `name`
+    on the row, and the derivatives are recorded on it in storage.
+    """
+    image_field, json_field, status_field = images.IMAGE_FIELDS[label]
+    if result is None:
+        _apply(label, object_id, name, {status_field: 'failed'})
+        return
+
+    stored, derivatives = result['name'], result['derivatives']
+    values = {json_field: derivatives, status_field: 'ready'}
+    if stored != name:
+        # The row's reference moves to the rewritten original
+        default_storage.retain(stored)
+        values[image_field] = stored
+    old = apps.get_model(label).objects.filter(pk=object_id).values_list(json_field, flat=True).first() or {}
+    # When the image was replaced or deleted meanwhile, a newer job covers it
+    if _apply(label, object_id, name, values) is not None:
+        released, unused = name, images.files(old) - images.files(derivatives)
+    else:
+        released, unused = stored, set()
+    if not default_storage.record_derivatives(stored, derivatives):
+        unused |= images.files(derivatives)
+    if stored != name:
+        transaction.on_commit(lambda: default_storage.delete(released))
+    # Derivatives written before content addressing, or for a file gone meanwhile, have no reference
+    transaction.on_commit(lambda: [default_storage.discard(file) for file in unused])
+
+
+def finish(job, result):
+    """Store the outcome of a job"""
+    with transaction.atomic():
+        store_result(job.model, job.object_id, job.name, result)
+        job.status, job.error = 'done', ''
+        job.save(update_fields=['status', 'error', 'updated_at'])
+
+
+def fail(job, error):
+    """Retry a job that raised, up to MAX_ATTEMPTS, then give the image up"""
+    _, _, status_field = images.IMAGE_FIELDS[job.model]
+    with transaction.atomic():
+        if job.attempts >= MAX_ATTEMPTS:
+            _apply(job.model, job.object_id, job.name, {status_field: 'failed'})
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+        job.error = error
+        job.save(update_fields=['status', 'error', 'updated_at'])
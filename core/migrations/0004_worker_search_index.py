@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_booking_payment_status_booking_phone_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('terms', models.JSONField(blank=True, default=dict, help_text='Indexed terms grouped by field')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('worker', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='core.worker')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('name', 'Name'), ('role', 'Role'), ('bio', 'Bio'), ('category', 'Category'), ('skill', 'Skill'), ('area', 'Area')], max_length=20)),
+                ('term', models.CharField(max_length=64)),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='core.worker')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'field'], name='core_search_term_afbfdf_idx')],
+                'unique_together': {('worker', 'field', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_worker_booking_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('search', 'Search'), ('reverse', 'Reverse')], max_length=10)),
+                ('key', models.CharField(max_length=255)),
+                ('results', models.JSONField(blank=True, default=list)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_geocode_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='worker',
+            index=models.Index(fields=['rating', 'id'], name='core_worker_rating_6090f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='worker',
+            index=models.Index(fields=['hourly_rate', 'id'], name='core_worker_hourly__1b6022_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='worker',
+            index=models.Index(fields=['total_jobs', 'id'], name='core_worker_total_j_2150b4_idx'),
+        ),
+    ]
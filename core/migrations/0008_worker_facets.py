@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_worker_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('category', 'Category'), ('price', 'Price'), ('rating', 'Rating'), ('city', 'City'), ('area', 'Area')], max_length=20)),
+                ('value', models.CharField(max_length=64)),
+                ('label', models.CharField(blank=True, max_length=200)),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='core.worker')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['facet', 'value', 'worker', 'label'], name='core_worker_facet_ce7576_idx')],
+                'unique_together': {('worker', 'facet', 'value')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_worker_facets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worker',
+            name='display_name',
+            field=models.CharField(blank=True, editable=False, max_length=301),
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='primary_category_slug',
+            field=models.SlugField(blank=True, editable=False, help_text='Slug of the first category by name'),
+        ),
+    ]
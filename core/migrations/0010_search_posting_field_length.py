@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def fill_field_lengths(apps, schema_editor):
+    SearchPosting = apps.get_model('core', 'SearchPosting')
+    lengths = SearchPosting.objects.filter(
+        worker=OuterRef('worker'), field=OuterRef('field')
+    ).order_by().values('worker').annotate(length=Count('pk')).values('length')
+    SearchPosting.objects.update(field_length=Subquery(lengths))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_worker_card_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchposting',
+            name='field_length',
+            field=models.PositiveIntegerField(default=0, help_text="Terms in this field of the worker's document"),
+        ),
+        migrations.RunPython(fill_field_lengths, migrations.RunPython.noop),
+    ]
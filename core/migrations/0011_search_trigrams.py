@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:41
+
+from django.db import migrations, models
+
+from core.fuzzy import NAME_FIELDS, phonetic_key, trigrams
+
+
+def index_existing_terms(apps, schema_editor):
+    SearchPosting = apps.get_model('core', 'SearchPosting')
+    SearchTrigram = apps.get_model('core', 'SearchTrigram')
+    terms = SearchPosting.objects.filter(field__in=NAME_FIELDS).values_list('term', flat=True).distinct()
+    SearchTrigram.objects.bulk_create([
+        SearchTrigram(term=term, trigram=trigram)
+        for term in terms.iterator()
+        for trigram in trigrams(phonetic_key(term))
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_search_posting_field_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('trigram', models.CharField(max_length=3)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'term'], name='core_search_trigram_9a086c_idx')],
+                'unique_together': {('term', 'trigram')},
+            },
+        ),
+        migrations.RunPython(index_existing_terms, migrations.RunPython.noop),
+    ]
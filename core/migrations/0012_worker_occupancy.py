@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.availability import slot_mask
+
+
+def fill_occupancy(apps, schema_editor):
+    Booking = apps.get_model('core', 'Booking')
+    WorkerOccupancy = apps.get_model('core', 'WorkerOccupancy')
+    days = {}
+    bookings = Booking.objects.exclude(status='cancelled').values_list('worker_id', 'scheduled_date', 'scheduled_time')
+    for worker_id, day, start in bookings.iterator():
+        days[(worker_id, day)] = days.get((worker_id, day), 0) | slot_mask(start)
+    WorkerOccupancy.objects.bulk_create([
+        WorkerOccupancy(worker_id=worker_id, date=day, slots=slots)
+        for (worker_id, day), slots in days.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_search_trigrams'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slots', models.BigIntegerField(default=0, help_text='Bit i set when the i-th half hour is booked')),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='core.worker')),
+            ],
+            options={
+                'verbose_name_plural': 'Worker occupancy',
+                'indexes': [models.Index(fields=['date', 'slots', 'worker'], name='core_worker_date_bceb03_idx')],
+                'unique_together': {('worker', 'date')},
+            },
+        ),
+        migrations.RunPython(fill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.search import tokenize
+
+
+def index_existing_services(apps, schema_editor):
+    Service = apps.get_model('core', 'Service')
+    ServicePosting = apps.get_model('core', 'ServicePosting')
+    ServicePosting.objects.bulk_create([
+        ServicePosting(service_id=pk, field=field, term=term)
+        for pk, name, description in Service.objects.filter(is_active=True).values_list('pk', 'name', 'description')
+        for field, text in (('name', name), ('description', description))
+        for term in set(tokenize(text))
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_worker_occupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServicePosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('name', 'Name'), ('description', 'Description')], max_length=20)),
+                ('term', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['is_active', 'price'], name='core_servic_is_acti_b9f478_idx'),
+        ),
+        migrations.AddField(
+            model_name='serviceposting',
+            name='service',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='core.service'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceposting',
+            index=models.Index(fields=['term', 'field', 'service'], name='core_servic_term_99e9b6_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='serviceposting',
+            unique_together={('service', 'field', 'term')},
+        ),
+        migrations.RunPython(index_existing_services, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.leaderboard import ALL_BOARD, BOARD_FACETS, LEADERBOARD_SIZE
+
+
+def fill_leaderboards(apps, schema_editor):
+    Worker = apps.get_model('core', 'Worker')
+    WorkerFacet = apps.get_model('core', 'WorkerFacet')
+    LeaderboardEntry = apps.get_model('core', 'LeaderboardEntry')
+    boards = {ALL_BOARD: Worker.objects.filter(is_available=True)}
+    for facet, value in WorkerFacet.objects.filter(facet__in=BOARD_FACETS).values_list('facet', 'value').distinct():
+        boards[f'{facet}:{value}'] = Worker.objects.filter(is_available=True, facets__facet=facet, facets__value=value)
+    for board, workers in boards.items():
+        rows = workers.order_by('-rating', '-total_jobs', 'pk').values_list('pk', 'rating', 'total_jobs')
+        LeaderboardEntry.objects.bulk_create([
+            LeaderboardEntry(board=board, worker_id=pk, rating=rating, total_jobs=jobs)
+            for pk, rating, jobs in rows[:LEADERBOARD_SIZE]
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_saved_searches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(help_text="'all', or facet:value such as category:plumbing", max_length=100)),
+                ('rating', models.FloatField()),
+                ('total_jobs', models.PositiveIntegerField()),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='core.worker')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['board', '-rating', '-total_jobs', 'worker'], name='core_leader_board_9d156d_idx')],
+                'unique_together': {('board', 'worker')},
+            },
+        ),
+        migrations.RunPython(fill_leaderboards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of the image (see core.images)'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of the image (see core.images)'),
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='profile_photo_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of the photo (see core.images)'),
+        ),
+        migrations.AddField(
+            model_name='workportfolio',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of the image (see core.images)'),
+        ),
+    ]
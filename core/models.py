@@ -1,6 +1,21 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.templatetags.static import static
+from . import images
+from .geo import encode_geohash
+
+
+def geohash_for(latitude, longitude):
+    """Geohash of a stored coordinate, or '' when the coordinate is unknown"""
+    if latitude is None or longitude is None:
+        return ''
+    return encode_geohash(latitude, longitude)
+
+
+def display_name_for(user):
+    """Name shown on worker cards: the user's full name, else the username"""
+    return user.get_full_name() or user.username
 
 
 class Category(models.Model):
@@ -10,6 +25,8 @@ class Category(models.Model):
     slug = models.SlugField(unique=True)
     icon = models.CharField(max_length=50, blank=True, help_text="Font Awesome icon class")
     image = models.ImageField(upload_to='categories/', blank=True, null=True, help_text="Category image for carousel")
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the image (see core.images)")
+    image_status = models.CharField(max_length=10, choices=images.STATUS_CHOICES, default='ready', editable=False)
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -22,6 +39,19 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def image_url(self):
+        """The image once processed, else None"""
+        return self.image.url if self.image and self.image_status == 'ready' else None
+
+    @property
+    def image_srcset(self):
+        return images.srcset(self.image_derivatives) if self.image_status == 'ready' else ''
+
+    @property
+    def image_webp_srcset(self):
+        return images.srcset(self.image_derivatives, 'webp') if self.image_status == 'ready' else ''
+
 
 class Skill(models.Model):
     """Skills that workers can have"""
@@ -67,6 +97,9 @@ class Worker(models.Model):
     # Location
     location = models.CharField(max_length=200)
     service_areas = models.TextField(blank=True, help_text="Areas where worker provides service")
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     
     # Stats
     rating = models.FloatField(default=0.0, validators=[MinValueValidator(0), MaxValueValidator(5)])
@@ -80,21 +113,55 @@ class Worker(models.Model):
     
     # Media
     profile_photo = models.ImageField(upload_to='workers/', blank=True, null=True)
+    profile_photo_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the photo (see core.images)")
+    profile_photo_status = models.CharField(max_length=10, choices=images.STATUS_CHOICES, default='ready', editable=False)
+
+    # Card fields, copied from the user and categories by core.signals
+    display_name = models.CharField(max_length=301, blank=True, editable=False)
+    primary_category_slug = models.SlugField(blank=True, editable=False, help_text="Slug of the first category by name")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-rating', '-total_jobs']
+        indexes = [
+            # Keyset pagination orders for the search API (see api.pagination)
+            models.Index(fields=['rating', 'id']),
+            models.Index(fields=['hourly_rate', 'id']),
+            models.Index(fields=['total_jobs', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.username} - {self.role}"
+
+    def save(self, *args, **kwargs):
+        self.geohash = geohash_for(self.latitude, self.longitude)
+        if not self.display_name and self.user_id:
+            self.display_name = display_name_for(self.user)
+        super().save(*args, **kwargs)
+
+    def refresh_primary_category(self):
+        """Recompute primary_category_slug from the categories, without sending save signals"""
+        self.primary_category_slug = self.categories.values_list('slug', flat=True).first() or ''
+        Worker.objects.filter(pk=self.pk).update(primary_category_slug=self.primary_category_slug)
     
     @property
     def photo_url(self):
-        if self.profile_photo:
-            return self.profile_photo.url
-        return None
+        """The photo, the placeholder while it is being processed, or None"""
+        if not self.profile_photo or self.profile_photo_status == 'failed':
+            return None
+        if self.profile_photo_status == 'pending':
+            return static(images.PLACEHOLDER)
+        return self.profile_photo.url
+
+    @property
+    def photo_srcset(self):
+        return images.srcset(self.profile_photo_derivatives) if self.profile_photo_status == 'ready' else ''
+
+    @property
+    def photo_webp_srcset(self):
+        return images.srcset(self.profile_photo_derivatives, 'webp') if self.profile_photo_status == 'ready' else ''
 
 
 class Service(models.Model):
@@ -105,13 +172,34 @@ class Service(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     duration = models.CharField(max_length=50, blank=True, help_text="e.g., 2-3 hours")
     image = models.ImageField(upload_to='services/', blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the image (see core.images)")
+    image_status = models.CharField(max_length=10, choices=images.STATUS_CHOICES, default='ready', editable=False)
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Price range filter of the service search (see core.service_search)
+            models.Index(fields=['is_active', 'price']),
+        ]
+
     def __str__(self):
         return f"{self.name} by {self.worker}"
 
+    @property
+    def image_url(self):
+        """The image once processed, else None"""
+        return self.image.url if self.image and self.image_status == 'ready' else None
+
+    @property
+    def image_srcset(self):
+        return images.srcset(self.image_derivatives) if self.image_status == 'ready' else ''
+
+    @property
+    def image_webp_srcset(self):
+        return images.srcset(self.image_derivatives, 'webp') if self.image_status == 'ready' else ''
+
 
 class WorkPortfolio(models.Model):
     """Portfolio/Recent works of workers"""
@@ -119,6 +207,8 @@ class WorkPortfolio(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='portfolio/')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the image (see core.images)")
+    image_status = models.CharField(max_length=10, choices=images.STATUS_CHOICES, default='ready', editable=False)
     completed_date = models.DateField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -128,6 +218,19 @@ class WorkPortfolio(models.Model):
     def __str__(self):
         return f"{self.title} - {self.worker}"
 
+    @property
+    def image_url(self):
+        """The image once processed, else None"""
+        return self.image.url if self.image and self.image_status == 'ready' else None
+
+    @property
+    def image_srcset(self):
+        return images.srcset(self.image_derivatives) if self.image_status == 'ready' else ''
+
+    @property
+    def image_webp_srcset(self):
+        return images.srcset(self.image_derivatives, 'webp') if self.image_status == 'ready' else ''
+
 
 class Booking(models.Model):
     """Booking/Order between client and worker"""
@@ -156,6 +259,9 @@ class Booking(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     location = models.CharField(max_length=300)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     phone = models.CharField(max_length=20, blank=True)
     scheduled_date = models.DateField()
     scheduled_time = models.TimeField()
@@ -179,6 +285,27 @@ class Booking(models.Model):
     def __str__(self):
         return f"Booking #{self.id} - {self.client.username} → {self.worker}"
 
+    def save(self, *args, **kwargs):
+        self.geohash = geohash_for(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
+
+class WorkerOccupancy(models.Model):
+    """Half hour slots of one worker's day taken by bookings, maintained by core.availability"""
+    worker = models.ForeignKey(Worker, on_delete=models.CASCADE, related_name='occupancy')
+    date = models.DateField()
+    slots = models.BigIntegerField(default=0, help_text="Bit i set when the i-th half hour is booked")
+
+    class Meta:
+        verbose_name_plural = "Worker occupancy"
+        unique_together = ['worker', 'date']
+        indexes = [
+            models.Index(fields=['date', 'slots', 'worker']),
+        ]
+
+    def __str__(self):
+        return f"{self.worker} on {self.date}"
+
 
 class Payment(models.Model):
     """Payment records for bookings - SSLCommerz integration"""
@@ -288,6 +415,7 @@ class Notification(models.Model):
         ('booking', 'Booking'),
         ('message', 'Message'),
         ('review', 'Review'),
+        ('saved_search', 'Saved Search'),
         ('system', 'System'),
     ]
     
@@ -305,3 +433,221 @@ class Notification(models.Model):
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
+
+
+class SavedSearch(models.Model):
+    """A search a user saved to be alerted about new matching workers (see core.saved_searches)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=200, blank=True)
+    params = models.JSONField(default=dict, help_text="Normalized search parameters")
+    is_active = models.BooleanField(default=True, help_text="Send alerts for new matches")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name or 'Saved search'} - {self.user.username}"
+
+
+class SavedSearchKey(models.Model):
+    """Inverted index entry - a predicate term (or '*') a saved search is looked up by"""
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='keys')
+    key = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ['saved_search', 'key']
+        indexes = [
+            models.Index(fields=['key', 'saved_search']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} → {self.saved_search_id}"
+
+
+class SavedSearchMatch(models.Model):
+    """A worker a saved search has matched, so each worker is announced once"""
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    worker = models.ForeignKey(Worker, on_delete=models.CASCADE, related_name='saved_search_matches')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['saved_search', 'worker']
+
+    def __str__(self):
+        return f"{self.saved_search_id} matched {self.worker_id}"
+
+
+class WorkerSearchDocument(models.Model):
+    """Denormalized search document for a worker, maintained by core.search"""
+    worker = models.OneToOneField(Worker, on_delete=models.CASCADE, related_name='search_document')
+    terms = models.JSONField(default=dict, blank=True, help_text="Indexed terms grouped by field")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search document for {self.worker}"
+
+
+class SearchPosting(models.Model):
+    """Posting list entry - one term in one field of a worker's search document"""
+    FIELD_CHOICES = [
+        ('name', 'Name'),
+        ('role', 'Role'),
+        ('bio', 'Bio'),
+        ('category', 'Category'),
+        ('skill', 'Skill'),
+        ('area', 'Area'),
+    ]
+
+    worker = models.ForeignKey(Worker, on_delete=models.CASCADE, related_name='search_postings')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    term = models.CharField(max_length=64)
+    field_length = models.PositiveIntegerField(default=0, help_text="Terms in this field of the worker's document")
+
+    class Meta:
+        unique_together = ['worker', 'field', 'term']
+        indexes = [
+            models.Index(fields=['term', 'field']),
+        ]
+
+    def __str__(self):
+        return f"{self.field}:{self.term} → {self.worker_id}"
+
+
+class SearchTrigram(models.Model):
+    """Character trigram of an indexed name term's phonetic key, maintained by core.fuzzy"""
+    term = models.CharField(max_length=64)
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        unique_together = ['term', 'trigram']
+        indexes = [
+            models.Index(fields=['trigram', 'term']),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram} → {self.term}"
+
+
+class ServicePosting(models.Model):
+    """Posting list entry - one term in the name or description of an active service, maintained by core.service_search"""
+    FIELD_CHOICES = [
+        ('name', 'Name'),
+        ('description', 'Description'),
+    ]
+
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='search_postings')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ['service', 'field', 'term']
+        indexes = [
+            models.Index(fields=['term', 'field', 'service']),
+        ]
+
+    def __str__(self):
+        return f"{self.field}:{self.term} → service {self.service_id}"
+
+
+class WorkerFacet(models.Model):
+    """One facet value of a worker (category, price/rating bucket, city, area), maintained by core.facets"""
+    FACET_CHOICES = [
+        ('category', 'Category'),
+        ('price', 'Price'),
+        ('rating', 'Rating'),
+        ('city', 'City'),
+        ('area', 'Area'),
+    ]
+
+    worker = models.ForeignKey(Worker, on_delete=models.CASCADE, related_name='facets')
+    facet = models.CharField(max_length=20, choices=FACET_CHOICES)
+    value = models.CharField(max_length=64)
+    label = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        unique_together = ['worker', 'facet', 'value']
+        indexes = [
+            # Covers the facet count GROUP BY without touching the table
+            models.Index(fields=['facet', 'value', 'worker', 'label']),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}:{self.value} → {self.worker_id}"
+
+
+class LeaderboardEntry(models.Model):
+    """One of the top workers of a leaderboard (all workers, a category or a city), maintained by core.leaderboard"""
+    board = models.CharField(max_length=100, help_text="'all', or facet:value such as category:plumbing")
+    worker = models.ForeignKey(Worker, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    rating = models.FloatField()
+    total_jobs = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ['board', 'worker']
+        indexes = [
+            models.Index(fields=['board', '-rating', '-total_jobs', 'worker']),
+        ]
+
+    def __str__(self):
+        return f"{self.board}: {self.worker_id}"
+
+
+class GeocodeCache(models.Model):
+    """Persistent LRU cache of upstream geocoding lookups (see core.geocoding)"""
+    KIND_CHOICES = [
+        ('search', 'Search'),
+        ('reverse', 'Reverse'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=255)
+    results = models.JSONField(default=list, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ['kind', 'key']
+
+    def __str__(self):
+        return f"{self.kind}: {self.key}"
+
+
+class MediaJob(models.Model):
+    """Queued processing of an uploaded image (see core.media_queue)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    model = models.CharField(max_length=50, help_text="Model label, e.g. core.Worker")
+    object_id = models.PositiveIntegerField()
+    name = models.CharField(max_length=255, help_text="Stored image name the job processes")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}: {self.name} ({self.status})"
+
+
+class StoredFile(models.Model):
+    """A file of the content-addressed media storage and the references to it (see core.storage)"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    references = models.PositiveIntegerField(default=0)
+    derivatives = models.JSONField(default=dict, blank=True, help_text="Derivatives made from this file (see core.images)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
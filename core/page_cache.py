@@ -0,0 +1,127 @@
+"""
+Anonymous Page Cache
+
+Serves the public pages (home, search results, worker profiles) to
+logged-out visitors from the cache instead of querying and rendering them
+again. Entries vary on the path, the normalized query string and the
+language.
+
+Only responses to visitors without a session cookie or pending flash
+messages are cached, and never responses that set cookies or used the
+CSRF token. Views opt in by calling tag() with what the page shows; the
+entry keeps the tags' versions (core.search_cache) and is ignored once
+any of them has been bumped, so a worker or category change drops exactly
+the pages that show it. Pages listing workers carry the tags of their
+search (core.search_cache.facet_tags) and of each worker shown, so an edit
+that moves no search result only drops the pages with that worker's card.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+
+from . import search_cache
+
+
+KEY_PREFIX = 'page'
+
+# URL names served from the page cache
+CACHED_VIEWS = {'home', 'search_results', 'profile'}
+
+# Pages listing every category (the search filter) also carry this tag,
+# bumped when any category changes
+CATEGORY_LIST_TAG = 'categories'
+
+# Headers a cached response is replayed with
+KEPT_HEADERS = ('Content-Type', 'Content-Language', 'X-Frame-Options', 'Vary', 'ETag', 'Last-Modified')
+
+
+def tag(request, tags):
+    """
+    Mark the response to `request` as cacheable, versioned by `tags`. Call
+    it before loading the page's data, so a change committed while the page
+    renders leaves the entry already outdated.
+    """
+    known = request.__dict__.setdefault('page_cache_tags', {})
+    new = [name for name in dict.fromkeys(tags) if name not in known]
+    known.update(zip(new, search_cache.tag_versions(new)))
+
+
+def normalized_query(query):
+    """Query string with parameters sorted and blank values dropped"""
+    return sorted((key, value) for key, values in query.lists() for value in values if value.strip())
+
+
+def entry_key(request):
+    raw = json.dumps([request.path, normalized_query(request.GET), translation.get_language()])
+    return f'{KEY_PREFIX}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def is_anonymous(request):
+    """A logged-out visitor with no session and no flash messages waiting"""
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+        and not request.user.is_authenticated
+    )
+
+
+def _messages_added(request):
+    # Messages waiting from an earlier request come in a cookie or the session, see is_anonymous()
+    return bool(getattr(getattr(request, '_messages', None), '_queued_messages', None))
+
+
+class PageCacheMiddleware:
+    """Full-page cache of anonymous GET requests to CACHED_VIEWS"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, 'page_cache_key', None) and self.cacheable(request, response):
+            tags = sorted(request.page_cache_tags)
+            cache.set(request.page_cache_key, {
+                'tags': tags,
+                'versions': [request.page_cache_tags[tag] for tag in tags],
+                'status': response.status_code,
+                'headers': {name: response[name] for name in KEPT_HEADERS if response.has_header(name)},
+                'content': response.content,
+            }, getattr(settings, 'PAGE_CACHE_TIMEOUT', 300))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.resolver_match.url_name not in CACHED_VIEWS or not is_anonymous(request):
+            return None
+
+        key = entry_key(request)
+        entry = cache.get(key)
+        if entry is not None and search_cache.tag_versions(entry['tags']) == entry['versions']:
+            response = HttpResponse(entry['content'], status=entry['status'])
+            for name, value in entry['headers'].items():
+                response[name] = value
+            response['X-Page-Cache'] = 'hit'
+            # Validators were stored with the page, so revalidation is answered from the entry too
+            return get_conditional_response(
+                request, etag=response.get('ETag'), last_modified=None, response=response,
+            )
+
+        request.page_cache_key = key
+        return None
+
+    def cacheable(self, request, response):
+        """Only tagged, cookie-free, successful responses are shared between visitors"""
+        return (
+            request.method == 'GET'
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and getattr(request, 'page_cache_tags', None)
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            and not _messages_added(request)
+        )
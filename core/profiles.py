@@ -0,0 +1,73 @@
+"""
+Worker Profile Assembly
+
+Loads a worker with everything its public profile shows (user, categories
+and their skills, skills, services, portfolio and the latest reviews with
+their clients) in a fixed number of queries, and caches the assembled
+instance as a snapshot. The profile page and WorkerDetailSerializer both
+read the snapshot's prefetched relations, so a cached profile costs no
+queries at all.
+
+Snapshot keys embed the worker's cache tag version (core.search_cache), which
+the signals in core.signals bump on any change to the worker, its user,
+skills, categories, services, portfolio or reviews.
+"""
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from . import search_cache
+from .models import Review, Worker
+
+
+# Bump when the shape of the snapshot changes, old entries are then never read
+SNAPSHOT_VERSION = 3
+
+SNAPSHOT_TIMEOUT = 3600
+
+RECENT_REVIEWS = 10
+
+
+def load_worker(worker_id):
+    """A worker with the profile relations prefetched (7 queries), or None"""
+    return Worker.objects.select_related('user').prefetch_related(
+        'categories__skills',
+        'skills',
+        'services',
+        'portfolio',
+        Prefetch(
+            'reviews',
+            queryset=Review.objects.select_related('client')[:RECENT_REVIEWS],
+            to_attr='recent_reviews',
+        ),
+    ).filter(pk=worker_id).first()
+
+
+def snapshot_key(worker_id):
+    version, = search_cache.tag_versions(search_cache.worker_tags([worker_id]))
+    return f'profile:{SNAPSHOT_VERSION}:{worker_id}:{version}'
+
+
+def get_profile(worker_id):
+    """The assembled worker from the snapshot cache, or None when it does not exist"""
+    key = snapshot_key(worker_id)
+    worker = cache.get(key)
+    if worker is None:
+        worker = load_worker(worker_id)
+        if worker is None:
+            return None
+        cache.set(key, worker, SNAPSHOT_TIMEOUT)
+    return worker
+
+
+def profile_skills(worker, limit=7):
+    """Skill names, falling back to the first skills of its categories"""
+    skills = [skill.name for skill in worker.skills.all()]
+    if not skills:
+        for category in worker.categories.all():
+            skills.extend(skill.name for skill in list(category.skills.all())[:5])
+    return skills[:limit]
+
+
+def fallback_worker_ids(skill):
+    """Ids of the workers without skills of their own, who show the skills of `skill`'s category"""
+    return list(Worker.objects.filter(categories=skill.category_id, skills__isnull=True).values_list('pk', flat=True))
@@ -0,0 +1,221 @@
+"""
+Search Ranking
+
+Orders search results for sort=relevance by one score that combines:
+
+- text: BM25 over the role, skill, category, name and bio postings of the
+  query terms, with each field weighted (a role match counts more than a
+  bio match)
+- rating: Bayesian average, so 5.0 from one review does not beat 4.8 from fifty
+- jobs: completed jobs, log scaled
+- verified: verified workers get a fixed boost
+- recency: recently updated profiles, halving every RECENCY_HALF_LIFE_DAYS
+- distance: closeness to the searched point, when searching near one
+
+Each signal is scaled to 0..1 over the candidate set and the score is their
+weighted sum. Override the weights with the SEARCH_RANKING_WEIGHTS setting
+and compare weightings offline with `python manage.py evaluate_ranking`.
+"""
+import math
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import SearchPosting, Worker
+from .search import tokenize
+
+
+DEFAULT_WEIGHTS = {
+    'text': 4.0,
+    'rating': 2.0,
+    'jobs': 1.0,
+    'verified': 0.5,
+    'recency': 0.5,
+    'distance': 2.0,
+}
+
+# How much a term in each field counts towards the text signal
+FIELD_WEIGHTS = {
+    'role': 3.0,
+    'skill': 2.5,
+    'category': 2.0,
+    'name': 1.5,
+    'bio': 1.0,
+}
+
+# BM25 parameters. Postings record whether a term occurs, not how often,
+# so k1 only shapes the length normalization.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Share of the score a prefix match earns compared to the whole word
+PREFIX_MATCH = 0.7
+
+# Reviews the Bayesian rating assumes at the mean rating of the candidates
+RATING_PRIOR_REVIEWS = 5
+
+RECENCY_HALF_LIFE_DAYS = 90
+
+# Distance at which the distance signal drops to half
+DISTANCE_HALF_KM = 5.0
+
+# Corpus statistics change slowly, so they are recomputed at most this often
+AVERAGE_LENGTHS_KEY = 'ranking:average_lengths'
+AVERAGE_LENGTHS_TIMEOUT = 3600
+
+
+def get_weights(overrides=None):
+    """Signal weights: the defaults, then SEARCH_RANKING_WEIGHTS, then `overrides`"""
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update(getattr(settings, 'SEARCH_RANKING_WEIGHTS', {}))
+    weights.update(overrides or {})
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown ranking signals: {', '.join(sorted(unknown))}")
+    return weights
+
+
+# ============ Signals ============
+
+def _scaled(values):
+    """Scale a column to 0..1 by its maximum"""
+    top = max(values, default=0)
+    if top <= 0:
+        return [0.0] * len(values)
+    return [value / top for value in values]
+
+
+def average_lengths():
+    """Average number of terms per worker in each ranked field, over the whole index"""
+    def compute():
+        workers = max(Worker.objects.count(), 1)
+        rows = SearchPosting.objects.filter(field__in=FIELD_WEIGHTS).values_list('field').annotate(Count('pk'))
+        return {field: count / workers for field, count in rows}
+    return cache.get_or_set(AVERAGE_LENGTHS_KEY, compute, AVERAGE_LENGTHS_TIMEOUT)
+
+
+def text_scores(candidate_ids, query):
+    """BM25 score of the candidate workers (a set of ids) for the query, as {pk: score}"""
+    tokens = set(tokenize(query))
+    if not tokens:
+        return {}
+
+    worker_count = Worker.objects.count()
+    average = average_lengths()
+
+    scores = defaultdict(float)
+    for token in tokens:
+        postings = SearchPosting.objects.filter(
+            term__gte=token, term__lt=token + '\uffff', field__in=FIELD_WEIGHTS
+        ).values_list('worker_id', 'field', 'term', 'field_length')
+
+        # Best match per (worker, field), the whole word beats a prefix.
+        # Document frequency counts every worker, candidate or not.
+        matches = {}
+        frequency = defaultdict(set)
+        for worker_id, field, term, length in postings:
+            frequency[field].add(worker_id)
+            if worker_id in candidate_ids:
+                strength = 1.0 if term == token else PREFIX_MATCH
+                if strength > matches.get((worker_id, field), (0,))[0]:
+                    matches[(worker_id, field)] = (strength, length)
+
+        idf = {
+            field: math.log(1 + (worker_count - len(workers) + 0.5) / (len(workers) + 0.5))
+            for field, workers in frequency.items()
+        }
+
+        # A token counts once per worker, in its strongest field
+        best = {}
+        for (worker_id, field), (strength, length) in matches.items():
+            ratio = length / average[field] if length and average.get(field) else 1
+            norm = (BM25_K1 + 1) / (1 + BM25_K1 * (1 - BM25_B + BM25_B * ratio))
+            value = FIELD_WEIGHTS[field] * idf[field] * norm * strength
+            if value > best.get(worker_id, 0):
+                best[worker_id] = value
+
+        for worker_id, value in best.items():
+            scores[worker_id] += value
+    return scores
+
+
+@lru_cache(maxsize=1)
+def _recency_table():
+    # Past ten half-lives the signal is taken as 0
+    return [0.5 ** (day / RECENCY_HALF_LIFE_DAYS) for day in range(10 * RECENCY_HALF_LIFE_DAYS)]
+
+
+def signals(rows, text=None, distances=None, now=None):
+    """
+    Signal columns for candidate rows of (pk, rating, total_reviews,
+    total_jobs, is_verified, updated_at), each scaled to 0..1.
+    """
+    text = text or {}
+    distances = distances or {}
+    now = now or timezone.now()
+    ids, ratings, reviews, jobs, verified, updated = zip(*rows) if rows else ((),) * 6
+
+    reviewed = [rating for rating, count in zip(ratings, reviews) if count]
+    prior = sum(reviewed) / len(reviewed) if reviewed else 0.0
+    bayesian = [
+        (RATING_PRIOR_REVIEWS * prior + rating * count) / (RATING_PRIOR_REVIEWS + count)
+        for rating, count in zip(ratings, reviews)
+    ]
+
+    # Recency by whole days from a lookup table, far cheaper per row than exact decay
+    recency = _recency_table()
+    ages = [(now - when).days for when in updated]
+    return ids, {
+        'text': _scaled([text.get(pk, 0.0) for pk in ids]),
+        'rating': [value / 5 for value in bayesian],
+        'jobs': _scaled(list(map(math.log1p, jobs))),
+        'verified': [1.0 if flag else 0.0 for flag in verified],
+        'recency': [recency[age] if 0 <= age < len(recency) else float(age < 0) for age in ages],
+        'distance': [
+            DISTANCE_HALF_KM / (DISTANCE_HALF_KM + distances[pk]) if pk in distances else 0.0
+            for pk in ids
+        ],
+    }
+
+
+# ============ Ranking ============
+
+def combine(ids, columns, weights):
+    """Weighted sum of the signal columns as {pk: score}"""
+    totals = [0.0] * len(ids)
+    for name, weight in weights.items():
+        if weight:
+            totals = [total + weight * value for total, value in zip(totals, columns[name])]
+    return dict(zip(ids, totals))
+
+
+def candidate_signals(queryset, query='', distances=None):
+    """Load the workers in `queryset` and compute their signal columns"""
+    rows = list(queryset.order_by('pk').values_list(
+        'pk', 'rating', 'total_reviews', 'total_jobs', 'is_verified', 'updated_at'
+    ))
+    text = text_scores({row[0] for row in rows}, query)
+    return signals(rows, text, distances)
+
+
+def score(queryset, query='', distances=None, weights=None):
+    """Relevance score of every worker in `queryset` as {pk: score}"""
+    ids, columns = candidate_signals(queryset, query, distances)
+    return combine(ids, columns, get_weights(weights))
+
+
+def rank(queryset, query='', distances=None, weights=None):
+    """Ids of the workers in `queryset`, most relevant first (ties by id)"""
+    return order(score(queryset, query, distances, weights))
+
+
+def order(scores):
+    """Ids by descending score, ties by id"""
+    ranked = sorted(scores)
+    # Stable, so equal scores keep the id order
+    ranked.sort(key=scores.__getitem__, reverse=True)
+    return ranked
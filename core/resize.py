@@ -0,0 +1,198 @@
+"""
+On-the-fly Image Resizing
+
+skill_hat.views.resized_image_view answers /img/<w>x<h>/<path> with a
+media (MEDIA_ROOT) or static image resized by Pillow: cropped to fill
+w x h, or scaled to the width or height alone when the other is 0.
+Images are never upscaled. Only the boxes in RESIZE_SIZES are served.
+
+Variants are written on first request to a disk cache (RESIZE_CACHE_DIR)
+keyed by the source file, its size and modification time and the box, so
+a changed source gets new variants. The cache is kept under
+RESIZE_CACHE_MAX_BYTES by dropping the least recently used variants,
+served variants being touched. Concurrent first requests for a variant,
+from any process, wait on a file lock so the source is decoded once.
+
+Variants of content-addressed media (core.storage) never change and are
+cached by clients forever.
+"""
+import fcntl
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from PIL import Image, ImageOps
+
+from . import images, media_files
+
+
+# Source format -> (variant format, Pillow save options), other formats become PNG
+OUTPUT = {
+    'JPEG': ('JPEG', images.FORMATS['jpeg'][1]),
+    'WEBP': ('WEBP', images.FORMATS['webp'][1]),
+    'PNG': ('PNG', {'format': 'PNG', 'optimize': True}),
+}
+
+CONTENT_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'PNG': 'image/png'}
+
+# Bumped when variants are encoded differently, so old ones are not served
+VARIANT_VERSION = 1
+
+# Running total of the cache size in this process, None until measured
+_cache_bytes = None
+
+
+class NotAnImage(Exception):
+    pass
+
+
+def valid_size(width, height):
+    return (width, height) in settings.RESIZE_SIZES
+
+
+def source(request, name):
+    """(path, Cache-Control) of the image to resize, None when there is none the request may read"""
+    path = media_files.resolve(name)
+    if path is not None:
+        # Files behind an access rule are not resized, their variants would be public
+        if media_files.is_protected(name):
+            return None
+        return path, media_files.cache_control(name)
+    try:
+        path = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(path):
+        path = finders.find(name)
+    return (path, media_files.REVALIDATE) if path else None
+
+
+def variant_key(path, stat, width, height):
+    origin = f'{VARIANT_VERSION}:{path}:{stat.st_size}:{stat.st_mtime_ns}:{width}x{height}'
+    return hashlib.sha256(origin.encode()).hexdigest()
+
+
+def _box(image, width, height):
+    """The variant size of `image` for a w x h request, never larger than the image"""
+    if not width:
+        width = image.width * height / image.height
+    elif not height:
+        height = image.height * width / image.width
+    scale = min(1, image.width / width, image.height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def render(path, width, height):
+    """Resize the image at `path`, returns (variant bytes, format)"""
+    try:
+        image = Image.open(path)
+        # JPEGs decode straight at a fraction of their size when that still covers
+        # the box, either way round as EXIF orientation is applied afterwards
+        side = max(_box(image, width, height))
+        image.draft('RGB', (side, side))
+        image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise NotAnImage(path)
+    fmt, options = OUTPUT.get(image.format, OUTPUT['PNG'])
+    image = ImageOps.exif_transpose(image)
+    image = ImageOps.fit(image, _box(image, width, height), Image.LANCZOS)
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue(), fmt
+
+
+def variant(path, stat, width, height):
+    """Path and format of the cached variant, made first if missing"""
+    key = variant_key(path, stat, width, height)
+    directory = os.path.join(settings.RESIZE_CACHE_DIR, key[:2])
+    for fmt in CONTENT_TYPES:
+        cached = os.path.join(directory, f'{key}.{fmt.lower()}')
+        if os.path.exists(cached):
+            _touch(cached)
+            return cached, fmt
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f'{key}.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # Made meanwhile by whoever held the lock
+            for fmt in CONTENT_TYPES:
+                cached = os.path.join(directory, f'{key}.{fmt.lower()}')
+                if os.path.exists(cached):
+                    return cached, fmt
+            data, fmt = render(path, width, height)
+            cached = os.path.join(directory, f'{key}.{fmt.lower()}')
+            temporary = f'{cached}.{os.getpid()}.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, cached)
+        finally:
+            _unlink_lock(lock)
+    _grow(len(data))
+    return cached, fmt
+
+
+def _unlink_lock(lock):
+    # Waiters still hold the unlinked file, newcomers find the variant made
+    try:
+        if os.stat(lock.name).st_ino == os.fstat(lock.fileno()).st_ino:
+            os.unlink(lock.name)
+    except FileNotFoundError:
+        pass
+    fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+# ============ Cache Size ============
+
+def _touch(path):
+    # Modification times order the variants for eviction, access times are often not kept
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def _entries():
+    for root, _, files in os.walk(settings.RESIZE_CACHE_DIR):
+        for filename in files:
+            if filename.endswith(('.lock', '.tmp')):
+                continue
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+
+def _grow(size):
+    global _cache_bytes
+    if _cache_bytes is None:
+        _cache_bytes = sum(entry[1] for entry in _entries())
+    else:
+        _cache_bytes += size
+    if _cache_bytes > settings.RESIZE_CACHE_MAX_BYTES:
+        evict()
+
+
+def evict():
+    """Drop the least recently used variants until the cache is at 90% of its limit"""
+    global _cache_bytes
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    target = settings.RESIZE_CACHE_MAX_BYTES * 0.9
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    _cache_bytes = total
@@ -0,0 +1,178 @@
+"""
+Saved Searches
+
+Users save a search (category, area, price range, ...) and get a
+Notification when a worker starts matching it, instead of re-running it.
+
+Each saved search is indexed (SavedSearchKey) under one predicate term: the
+longest token of its category, else its location, else its free text, or
+'*' when it has none. When workers change, their indexed terms expand to
+the keys of every prefix, so one lookup finds the few saved searches that
+can match them. Only those are evaluated in full, and workers they had not
+matched before are announced and recorded (SavedSearchMatch).
+
+Tokens match indexed terms by prefix, like the search index; the fuzzy
+fallback of core.search is not applied to alerts. The signals in
+core.signals run match_workers() after the changes commit.
+"""
+from django.db import transaction
+
+from . import facets, geo, search, search_cache
+from .models import Notification, SavedSearch, SavedSearchKey, SavedSearchMatch, Worker, WorkerSearchDocument
+
+
+ANY_KEY = '*'
+
+# Parameters a saved search keeps, dates and sorting do not apply to alerts
+SAVED_PARAMS = ('q', 'category', 'location', 'min_price', 'max_price', 'rating', 'near', 'radius_km')
+
+# Saved search token -> the search document fields it matches
+PREDICATE_FIELDS = {
+    'category': ('category',),
+    'location': ('area',),
+    'q': search.ALL_FIELDS,
+}
+
+KEY_PREFIXES = {'category': 'category', 'location': 'area', 'q': 'any'}
+
+
+def saved_params(params):
+    """The saved part of search parameters (a QueryDict or dict)"""
+    normalized = search_cache.normalize_params(params)
+    return {name: normalized[name] for name in SAVED_PARAMS}
+
+
+def search_key(params):
+    """The inverted index key of saved search parameters"""
+    for name in ('category', 'location', 'q'):
+        tokens = params[name].split()
+        if tokens:
+            return f'{KEY_PREFIXES[name]}:{max(tokens, key=len)}'
+    return ANY_KEY
+
+
+def current_matches(params):
+    """Ids of the workers a search matches right now"""
+    workers, search_filters, _ = search.filter_workers(
+        Worker.objects.filter(is_available=True), dict(params, date=None, time=None)
+    )
+    return facets.apply_filters(workers, search_filters).values_list('pk', flat=True)
+
+
+def save_search(user, params, name=''):
+    """
+    Save a search for `user`. Workers it matches now are recorded as
+    matched, so only workers that match later are announced.
+    """
+    params = saved_params(params)
+    with transaction.atomic():
+        saved = SavedSearch.objects.create(user=user, name=name[:200], params=params)
+        SavedSearchKey.objects.create(saved_search=saved, key=search_key(params))
+        SavedSearchMatch.objects.bulk_create([
+            SavedSearchMatch(saved_search=saved, worker_id=pk) for pk in current_matches(params).iterator()
+        ], batch_size=1000)
+    return saved
+
+
+# ============ Matching ============
+
+def worker_keys(terms):
+    """Keys of every saved search the indexed terms {field: [term, ...]} can satisfy"""
+    keys = {ANY_KEY}
+    for field, values in terms.items():
+        for term in values:
+            prefixes = {term[:end] for end in range(1, len(term) + 1)}
+            keys.update(f'any:{prefix}' for prefix in prefixes)
+            if field in ('category', 'area'):
+                keys.update(f'{field}:{prefix}' for prefix in prefixes)
+    return keys
+
+
+def matches(params, worker, terms):
+    """Whether a worker, with its indexed terms {field: [term, ...]}, satisfies saved search parameters"""
+    for name, fields in PREDICATE_FIELDS.items():
+        values = [term for field in fields for term in terms.get(field, ())]
+        if not all(any(term.startswith(token) for term in values) for token in params[name].split()):
+            return False
+
+    if params['min_price'] is not None and float(worker.hourly_rate) < params['min_price']:
+        return False
+    if params['max_price'] is not None and float(worker.hourly_rate) > params['max_price']:
+        return False
+    if params['rating'] is not None and worker.rating < params['rating']:
+        return False
+
+    if params['near']:
+        if worker.latitude is None or worker.longitude is None:
+            return False
+        lat, lng = params['near']
+        if geo.haversine_km(lat, lng, worker.latitude, worker.longitude) > params['radius_km']:
+            return False
+    return True
+
+
+def match_workers(worker_ids):
+    """
+    Evaluate the saved searches the given workers can match and notify
+    their owners of new matches. Returns the number of notifications sent.
+    """
+    workers = Worker.objects.filter(pk__in=set(worker_ids), is_available=True).only(
+        'user_id', 'display_name', 'role', 'hourly_rate', 'rating', 'latitude', 'longitude', 'is_available'
+    ).in_bulk()
+    if not workers:
+        return 0
+    documents = dict(WorkerSearchDocument.objects.filter(worker__in=workers).values_list('worker_id', 'terms'))
+
+    # Saved searches looked up by the keys of each worker
+    keys_of = {pk: worker_keys(documents.get(pk) or {}) for pk in workers}
+    candidates = {}
+    rows = SavedSearchKey.objects.filter(
+        key__in=set().union(*keys_of.values()), saved_search__is_active=True
+    ).values_list('key', 'saved_search_id')
+    for key, saved_id in rows:
+        candidates.setdefault(key, set()).add(saved_id)
+
+    pairs = {
+        (saved_id, pk)
+        for pk, keys in keys_of.items()
+        for key in keys & set(candidates)
+        for saved_id in candidates[key]
+    }
+    if not pairs:
+        return 0
+
+    saved = SavedSearch.objects.in_bulk({saved_id for saved_id, _ in pairs})
+    known = set(SavedSearchMatch.objects.filter(
+        saved_search__in=saved, worker__in=workers
+    ).values_list('saved_search_id', 'worker_id'))
+
+    new = sorted(
+        (saved_id, pk) for saved_id, pk in pairs - known
+        if saved[saved_id].user_id != workers[pk].user_id
+        and matches(saved[saved_id].params, workers[pk], documents.get(pk) or {})
+    )
+    if not new:
+        return 0
+
+    with transaction.atomic():
+        SavedSearchMatch.objects.bulk_create([
+            SavedSearchMatch(saved_search_id=saved_id, worker_id=pk) for saved_id, pk in new
+        ], ignore_conflicts=True)
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=saved[saved_id].user_id,
+                notification_type='saved_search',
+                title=f'New match for "{saved[saved_id].name or "your saved search"}"',
+                message=f'{workers[pk].display_name} ({workers[pk].role}) matches your saved search.',
+                link=f'/worker/{pk}/',
+            )
+            for saved_id, pk in new
+        ])
+    return len(new)
+
+
+def workers_changed(worker_ids):
+    """Match the workers against saved searches once the change commits"""
+    worker_ids = set(worker_ids)
+    if worker_ids:
+        transaction.on_commit(lambda: match_workers(worker_ids))
@@ -0,0 +1,212 @@
+"""
+Worker Search Index
+
+Keeps a denormalized search document per worker and a posting list
+(term -> worker) so searches look up matching workers by term instead of
+scanning every worker row with icontains and joining categories.
+
+Facet rows (core.facets) and the fuzzy name trigrams (core.fuzzy) are
+refreshed along with each worker's document. The index is kept up to date by the signals in core.signals. Use
+`python manage.py rebuild_search_index` to backfill existing workers.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import availability, facets, fuzzy, geo
+from .models import Category, Worker, WorkerSearchDocument, SearchPosting, SearchTrigram, WorkerFacet
+
+
+# Latin word characters plus the whole Bengali block (vowel signs are not \w)
+TOKEN_RE = re.compile(r'[\w\u0980-\u09FF]+', re.UNICODE)
+
+MAX_TERM_LENGTH = 64
+
+ALL_FIELDS = ('name', 'role', 'bio', 'category', 'skill', 'area')
+
+
+def tokenize(text):
+    """Split text into lower-cased search terms"""
+    if not text:
+        return []
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(str(text).lower())]
+
+
+def category_terms(category):
+    """Terms a category is indexed under on its workers"""
+    terms = {category.slug.lower()[:MAX_TERM_LENGTH]}
+    terms.update(tokenize(category.slug))
+    terms.update(tokenize(category.name))
+    terms.update(tokenize(category.name_bn))
+    return terms
+
+
+def build_terms(worker):
+    """Collect the indexed terms of a worker, grouped by field"""
+    terms = {field: set() for field in ALL_FIELDS}
+
+    terms['name'].update(tokenize(worker.user.get_full_name() or worker.user.username))
+    terms['role'].update(tokenize(worker.role))
+    terms['bio'].update(tokenize(worker.bio))
+    terms['area'].update(tokenize(worker.location))
+    terms['area'].update(tokenize(worker.service_areas))
+
+    for category in worker.categories.all():
+        terms['category'].update(category_terms(category))
+
+    for skill in worker.skills.all():
+        terms['skill'].update(tokenize(skill.name))
+
+    return {field: values for field, values in terms.items() if values}
+
+
+def index_worker(worker):
+    """
+    Bring the search document and postings of one worker up to date.
+    Only postings that actually changed are written.
+    """
+    new_terms = build_terms(worker)
+
+    with transaction.atomic():
+        document, _ = WorkerSearchDocument.objects.get_or_create(worker=worker)
+        old_terms = {field: set(values) for field, values in (document.terms or {}).items()}
+
+        for field in set(old_terms) | set(new_terms):
+            removed = old_terms.get(field, set()) - new_terms.get(field, set())
+            if removed:
+                SearchPosting.objects.filter(worker=worker, field=field, term__in=removed).delete()
+
+        SearchPosting.objects.bulk_create([
+            SearchPosting(worker=worker, field=field, term=term, field_length=len(values))
+            for field, values in new_terms.items()
+            for term in values - old_terms.get(field, set())
+        ], ignore_conflicts=True)
+
+        # Kept postings carry the field length too (used by core.ranking)
+        for field, values in new_terms.items():
+            if field in old_terms and len(values) != len(old_terms[field]):
+                SearchPosting.objects.filter(worker=worker, field=field).update(field_length=len(values))
+
+        document.terms = {field: sorted(values) for field, values in new_terms.items()}
+        document.save()
+
+        facets.index_worker(worker)
+        fuzzy.add_terms(set().union(*(new_terms.get(field, ()) for field in fuzzy.NAME_FIELDS)))
+
+
+def index_workers(workers):
+    """Reindex a queryset of workers"""
+    workers = workers.select_related('user').prefetch_related('categories', 'skills')
+    for worker in workers:
+        index_worker(worker)
+
+
+def rebuild_index():
+    """Drop and rebuild the whole search index, returns the number of workers indexed"""
+    with transaction.atomic():
+        SearchPosting.objects.all().delete()
+        WorkerFacet.objects.all().delete()
+        SearchTrigram.objects.all().delete()
+        WorkerSearchDocument.objects.all().delete()
+        index_workers(Worker.objects.all())
+    return Worker.objects.count()
+
+
+def _postings(term, fields):
+    """Postings of every term starting with `term` in the given fields"""
+    postings = SearchPosting.objects.filter(term__gte=term, term__lt=term + '\uffff')
+    if tuple(fields) != ALL_FIELDS:
+        postings = postings.filter(field__in=fields)
+    return postings
+
+
+def term_exists(term, fields=ALL_FIELDS):
+    """Whether any indexed term in the given fields starts with `term`"""
+    return _postings(term, fields).exists()
+
+
+def _token_postings(token, fields):
+    """
+    Postings matching one token: terms starting with it or, when there are
+    none, name terms that sound like it
+    """
+    postings = _postings(token, fields)
+    if not set(fields) & set(fuzzy.NAME_FIELDS) or postings.exists():
+        return postings
+    similar = Q()
+    for term in fuzzy.similar_terms(token):
+        similar |= Q(term__gte=term, term__lt=term + '\uffff')
+    if not similar:
+        return postings.none()
+    postings = SearchPosting.objects.filter(similar)
+    if tuple(fields) != ALL_FIELDS:
+        postings = postings.filter(field__in=fields)
+    return postings
+
+
+def category_slugs(text):
+    """
+    Slugs of the categories matching every token of `text`: one of their
+    terms starts with it or, when no category term does, sounds like it
+    """
+    matchers = []
+    for token in set(tokenize(text)):
+        similar = set() if term_exists(token, ('category',)) else set(fuzzy.similar_terms(token))
+        matchers.append((token, similar))
+    slugs = []
+    for category in Category.objects.only('slug', 'name', 'name_bn'):
+        terms = category_terms(category)
+        if all(any(term.startswith(token) or term in similar for term in terms) for token, similar in matchers):
+            slugs.append(category.slug.lower())
+    return slugs
+
+
+def match_workers(text, fields=ALL_FIELDS):
+    """
+    Subquery of the ids of workers whose given fields contain every token
+    of `text` (prefix match per token, or a similar sounding name term when
+    nothing starts with it), or None when the text has no tokens. Use it as
+    `pk__in=`, the database intersects the posting lists.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+
+    result = None
+    for token in sorted(set(tokens), key=len, reverse=True):
+        postings = _token_postings(token, fields)
+        if result is not None:
+            postings = postings.filter(worker_id__in=result)
+        result = postings.values('worker_id')
+    return result
+
+
+def filter_workers(queryset, params):
+    """
+    Apply normalized search parameters (see search_cache.normalize_params).
+    Returns (queryset narrowed by text, availability and distance, facet filters for
+    category/location/price/rating, {pk: distance_km} when searching near a point).
+    """
+    matched = match_workers(params['q'])
+    if matched is not None:
+        queryset = queryset.filter(pk__in=matched)
+
+    queryset = availability.filter_free(
+        queryset, availability.parse_date(params['date']), availability.parse_time(params['time'])
+    )
+
+    distances = {}
+    if params['near']:
+        lat, lng = params['near']
+        distances = geo.nearby_distances(queryset, lat, lng, params['radius_km'])
+        queryset = queryset.filter(pk__in=distances)
+
+    search_filters = facets.search_filters(
+        category_slugs=category_slugs(params['category']) if params['category'] else None,
+        location=params['location'],
+        min_price=params['min_price'],
+        max_price=params['max_price'],
+        rating=params['rating'],
+    )
+    return queryset, search_filters, distances
@@ -0,0 +1,214 @@
+"""
+Search Result Cache
+
+Caches the ordered worker ids of a search (and its facet counts) under
+the normalized search parameters, so repeated searches skip the index
+lookups, filtering and sorting. Card data is always loaded fresh for the
+cached ids.
+
+Entries are tagged with the categories their results can come from
+(or '*' for searches without a category filter), availability searches
+with their day and free text searches with 'text'. Facet counts span
+every category and are cached apart from the results, tagged '*' as
+well. Every tag has a version in the cache and entry keys embed those
+versions. The signals in core.signals call invalidate_workers when a
+worker's RESULT_FIELDS, categories or reviews change, orphaning the
+entries of its categories and the unfiltered ones, and
+invalidate_worker_text when only its TEXT_FIELDS, name or skills do. The
+same tags, plus one per worker, version the anonymous page cache
+(core.page_cache).
+"""
+import hashlib
+import json
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import availability, fuzzy, geo, search
+from .models import Category
+
+
+ANY_CATEGORY = '*'
+
+DATE_TAG_PREFIX = 'date:'
+
+# Tags of a single worker, for pages showing it (see core.page_cache)
+WORKER_TAG_PREFIX = 'worker:'
+
+KEY_PREFIX = 'search'
+
+# Free text searches, bumped when the searchable text of a worker changes
+TEXT_TAG = 'text'
+
+# Worker fields deciding which searches list a worker and in what order
+# (facets, filters, sorts and ranking). updated_at also feeds the ranking's
+# recency signal, it is left to the entry timeout.
+RESULT_FIELDS = (
+    'hourly_rate', 'rating', 'total_reviews', 'total_jobs', 'is_verified', 'is_available',
+    'location', 'service_areas', 'latitude', 'longitude',
+)
+
+# Worker fields only free text searches match
+TEXT_FIELDS = ('role', 'bio')
+
+
+def _tokens(value):
+    # Matching is per token regardless of order, so neither order nor repeats matter
+    return ' '.join(sorted(set(search.tokenize(value))))
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def normalize_params(params):
+    """
+    Canonical search parameters from a QueryDict or dict, so equivalent
+    searches share one cache entry. `sort` is '' when not given.
+    """
+    category = params.get('category', '')
+    if category.strip().lower() == 'choose category':
+        category = ''
+
+    near = geo.parse_near(params.get('near', ''))
+    day = availability.parse_date(params.get('date'))
+    at = availability.parse_time(params.get('time'))
+    return {
+        'q': _tokens(params.get('q', '')),
+        'category': _tokens(category),
+        'location': _tokens(params.get('location', '')),
+        'min_price': _number(params.get('min_price')),
+        'max_price': _number(params.get('max_price')),
+        'rating': _number(params.get('rating')),
+        'near': near,
+        'radius_km': geo.parse_radius(params.get('radius_km')) if near else None,
+        'date': day.isoformat() if day else None,
+        'time': at.strftime('%H:%M') if at else None,
+        'sort': params.get('sort', '').strip().lower(),
+    }
+
+
+def category_tags(category):
+    """Slugs of every category a category filter can match, or ['*'] without one"""
+    if not category:
+        return [ANY_CATEGORY]
+    tokens = category.split()
+    # Tokens can also match through similar sounding terms (see core.fuzzy)
+    similar = {term for token in tokens for term in fuzzy.similar_terms(token)}
+    return sorted(
+        c.slug.lower() for c in Category.objects.only('slug', 'name', 'name_bn')
+        if any(
+            any(term.startswith(token) for token in tokens) or term in similar
+            for term in search.category_terms(c)
+        )
+    )
+
+
+def date_tags(params):
+    """Availability searches are also tagged with their day, bookings on it change them"""
+    if not (params.get('date') or params.get('time')):
+        return []
+    return [f'{DATE_TAG_PREFIX}{params["date"] or timezone.localdate().isoformat()}']
+
+
+def _tag_key(tag):
+    return f'{KEY_PREFIX}:tag:{tag}'
+
+
+def tag_versions(tags):
+    """Current versions of the tags, in order (also used by core.page_cache)"""
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # A fresh version never matches an entry written before the tag was evicted
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key) for key in keys]
+
+
+def search_tags(params):
+    """Tags of everything a search's results depend on"""
+    text = [TEXT_TAG] if params['q'] else []
+    return category_tags(params['category']) + date_tags(params) + text
+
+
+def facet_tags(params):
+    """
+    Tags of a search's facet counts, cached apart from its results. Each
+    facet leaves out its own filter, so the category facet counts workers
+    of every category.
+    """
+    return sorted(set(search_tags(params)) | {ANY_CATEGORY})
+
+
+def entry_key(scope, params, tags=None):
+    """Cache key of a search, bound to the current versions of its tags (search_tags() by default)"""
+    tags = search_tags(params) if tags is None else tags
+    raw = json.dumps([scope, params, tags, tag_versions(tags)], sort_keys=True)
+    return f'{KEY_PREFIX}:result:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def cached_search(scope, params, build, tags=None):
+    """
+    Return the cached result of a search or compute it with build().
+    `scope` separates differently shaped results for the same parameters,
+    `tags` replace search_tags() for results depending on more (facet_tags()).
+    """
+    key = entry_key(scope, params, tags)
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300))
+    return result
+
+
+def worker_tags(worker_ids):
+    return [f'{WORKER_TAG_PREFIX}{pk}' for pk in worker_ids]
+
+
+def invalidate_tags(tags):
+    """Bump the versions of tags once the current transaction commits"""
+    tags = set(tags)
+
+    # After commit, so a concurrent search cannot cache pre-commit rows under the new version
+    def bump():
+        version = time.time_ns()
+        cache.set_many({_tag_key(tag): version for tag in tags}, None)
+
+    if tags:
+        transaction.on_commit(bump)
+
+
+def invalidate_categories(slugs):
+    """Orphan cached searches over these categories and searches without a category filter"""
+    invalidate_tags({ANY_CATEGORY} | {slug.lower() for slug in slugs})
+
+
+def invalidate_dates(days):
+    """Orphan cached availability searches on these days"""
+    invalidate_tags(f'{DATE_TAG_PREFIX}{day}' for day in days)
+
+
+def invalidate_workers(worker_ids, slugs=()):
+    """Orphan cached searches these workers can appear in, plus those over `slugs` and the workers' own pages"""
+    slugs = set(slugs)
+    if worker_ids:
+        slugs.update(
+            Category.objects.filter(workers__in=worker_ids).values_list('slug', flat=True).distinct()
+        )
+    invalidate_tags({ANY_CATEGORY} | {slug.lower() for slug in slugs} | set(worker_tags(worker_ids or ())))
+
+
+def invalidate_worker_text(worker_ids):
+    """Orphan cached free text searches and the workers' own pages, after a change only text searches see"""
+    invalidate_tags({TEXT_TAG} | set(worker_tags(worker_ids)))
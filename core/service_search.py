@@ -0,0 +1,108 @@
+"""
+Service Search Index
+
+Finds the service packages workers offer ("AC servicing", "full house
+deep cleaning") by the terms of their name and description, through a
+posting list (term -> service) like the worker index in core.search,
+instead of scanning descriptions with icontains. Only active services are
+indexed. Price ranges filter on the indexed Service.price.
+
+The index is kept up to date by the signals in core.signals, and
+`python manage.py rebuild_search_index` rebuilds it with the worker index.
+"""
+from django.db import transaction
+
+from .models import Service, ServicePosting
+from .search import tokenize
+
+
+FIELDS = ('name', 'description')
+
+
+def build_terms(service):
+    """Indexed (field, term) pairs of a service, none when it is inactive"""
+    if not service.is_active:
+        return set()
+    return {
+        (field, term)
+        for field in FIELDS
+        for term in tokenize(getattr(service, field))
+    }
+
+
+def index_service(service):
+    """Bring the postings of one service up to date, writing only the changes"""
+    new_terms = build_terms(service)
+    with transaction.atomic():
+        old_terms = set(ServicePosting.objects.filter(service=service).values_list('field', 'term'))
+        for field in FIELDS:
+            removed = {term for posting_field, term in old_terms - new_terms if posting_field == field}
+            if removed:
+                ServicePosting.objects.filter(service=service, field=field, term__in=removed).delete()
+        ServicePosting.objects.bulk_create([
+            ServicePosting(service=service, field=field, term=term)
+            for field, term in new_terms - old_terms
+        ], ignore_conflicts=True)
+
+
+def rebuild_index():
+    """Drop and rebuild the whole service index, returns the number of services indexed"""
+    with transaction.atomic():
+        ServicePosting.objects.all().delete()
+        ServicePosting.objects.bulk_create([
+            ServicePosting(service=service, field=field, term=term)
+            for service in Service.objects.filter(is_active=True).only('name', 'description', 'is_active')
+            for field, term in build_terms(service)
+        ], batch_size=1000, ignore_conflicts=True)
+    return Service.objects.filter(is_active=True).count()
+
+
+# ============ Searching ============
+
+def match_services(text, fields=FIELDS):
+    """
+    Subquery of the ids of active services whose given fields contain every
+    token of `text` (prefix match per token), or None when the text has no
+    tokens. Use it as `pk__in=`, like search.match_workers.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+
+    result = None
+    for token in sorted(set(tokens), key=len, reverse=True):
+        postings = ServicePosting.objects.filter(term__gte=token, term__lt=token + '\uffff', field__in=fields)
+        if result is not None:
+            postings = postings.filter(service_id__in=result)
+        result = postings.values('service_id')
+    return result
+
+
+def search_services(params):
+    """
+    Active services of available workers matching normalized search
+    parameters (see search_cache.normalize_params): `q` against the name and
+    description, `min_price` / `max_price` against the price.
+    """
+    services = Service.objects.filter(is_active=True, worker__is_available=True)
+    matched = match_services(params['q'])
+    if matched is not None:
+        services = services.filter(pk__in=matched)
+    if params['min_price'] is not None:
+        services = services.filter(price__gte=params['min_price'])
+    if params['max_price'] is not None:
+        services = services.filter(price__lte=params['max_price'])
+    return services
+
+
+def group_by_worker(services):
+    """
+    Matching services grouped by worker, as {worker_id: [(price, service_id), ...]}
+    with each worker's services cheapest first.
+    """
+    groups = {}
+    for worker_id, price, pk in services.values_list('worker_id', 'price', 'pk'):
+        groups.setdefault(worker_id, []).append((price, pk))
+    for group in groups.values():
+        group.sort()
+    return groups
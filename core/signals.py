@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from .models import UserProfile, Worker, Category, Skill, Service, WorkPortfolio, Review, Booking, display_name_for
+from . import availability, facets, images, leaderboard, media_queue, page_cache, profiles, saved_searches, search, service_search, search_cache, spelling, storage, suggestions
 
 
 @receiver(post_save, sender=User)
@@ -16,3 +21,507 @@ def save_user_profile(sender, instance, **kwargs):
     """Save UserProfile when User is saved"""
     if hasattr(instance, 'profile'):
         instance.profile.save()
+
+
+# ============ Worker Changes ============
+
+# Worker fields whose changes receivers below react to, see changed_worker_fields()
+TRACKED_WORKER_FIELDS = search_cache.RESULT_FIELDS + search_cache.TEXT_FIELDS
+
+# What each receiver's work is computed from, saves changing none of them skip it
+TERM_WORKER_FIELDS = ('role', 'bio', 'location', 'service_areas')
+FACET_WORKER_FIELDS = ('hourly_rate', 'rating', 'location', 'service_areas')
+SUGGESTION_WORKER_FIELDS = ('role', 'is_available', 'location', 'service_areas')
+LEADERBOARD_WORKER_FIELDS = ('rating', 'total_jobs', 'is_available', 'location')
+SAVED_SEARCH_WORKER_FIELDS = TERM_WORKER_FIELDS + FACET_WORKER_FIELDS + ('is_available', 'latitude', 'longitude')
+
+
+@receiver(pre_save, sender=Worker)
+def remember_worker_fields(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Snapshot the tracked fields a save may change"""
+    if raw or not instance.pk:
+        return
+    fields = [name for name in TRACKED_WORKER_FIELDS if update_fields is None or name in update_fields]
+    instance._fields_before = Worker.objects.filter(pk=instance.pk).values(*fields).first() if fields else {}
+
+
+def changed_worker_fields(instance, created=False):
+    """
+    Tracked fields the save of `instance` changed, all of them for a new
+    worker. Works from pre_save on too, the snapshot is taken first.
+    """
+    before = getattr(instance, '_fields_before', None)
+    if created or before is None:
+        return set(TRACKED_WORKER_FIELDS)
+    # Views assign form strings, compared as the field's type
+    return {
+        name for name, value in before.items()
+        if Worker._meta.get_field(name).to_python(getattr(instance, name)) != value
+    }
+
+
+# ============ Search Index ============
+
+SEARCH_USER_FIELDS = {'first_name', 'last_name', 'username'}
+
+
+@receiver(post_save, sender=Worker)
+def index_worker_on_save(sender, instance, created, raw=False, **kwargs):
+    """Reindex a worker whose indexed text changed, or only its facets"""
+    if raw:
+        return
+    changed = changed_worker_fields(instance, created)
+    if changed & set(TERM_WORKER_FIELDS):
+        search.index_worker(instance)
+    elif changed & set(FACET_WORKER_FIELDS):
+        facets.index_worker(instance)
+
+
+@receiver(post_save, sender=User)
+def index_worker_on_user_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Reindex a worker when the name on its user account changes"""
+    if raw or (update_fields and not SEARCH_USER_FIELDS & set(update_fields)):
+        return
+    if hasattr(instance, 'worker_profile'):
+        search.index_worker(instance.worker_profile)
+
+
+@receiver(m2m_changed, sender=Worker.categories.through)
+@receiver(m2m_changed, sender=Worker.skills.through)
+def index_worker_on_relation_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex workers whose categories or skills were added, removed or cleared"""
+    if reverse and action == 'pre_clear':
+        instance._search_cleared_worker_ids = list(instance.workers.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        search.index_worker(instance)
+        return
+
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_search_cleared_worker_ids', [])
+    search.index_workers(Worker.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Skill)
+def index_workers_on_term_change(sender, instance, created, raw=False, **kwargs):
+    """Reindex the workers of a renamed category or skill"""
+    if not created and not raw:
+        search.index_workers(instance.workers.all())
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Skill)
+def remember_workers_on_term_delete(sender, instance, **kwargs):
+    """Remember affected workers before the category/skill rows disappear"""
+    instance._search_worker_ids = list(instance.workers.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Skill)
+def index_workers_on_term_delete(sender, instance, **kwargs):
+    """Drop the terms of a deleted category or skill from its workers"""
+    worker_ids = getattr(instance, '_search_worker_ids', [])
+    if worker_ids:
+        search.index_workers(Worker.objects.filter(pk__in=worker_ids))
+
+
+
+@receiver(post_save, sender=Service)
+def index_service_on_save(sender, instance, raw=False, **kwargs):
+    """Reindex a service's name and description (deletes cascade to its postings)"""
+    if not raw:
+        service_search.index_service(instance)
+
+
+# ============ Search Result Cache ============
+
+@receiver(post_save, sender=Worker)
+def invalidate_search_cache_on_worker_save(sender, instance, created, raw=False, **kwargs):
+    """Drop cached searches the change can reach, or only the pages showing the worker"""
+    if raw:
+        return
+    changed = changed_worker_fields(instance, created)
+    if changed & set(search_cache.RESULT_FIELDS):
+        search_cache.invalidate_workers([instance.pk])
+    elif changed:
+        search_cache.invalidate_worker_text([instance.pk])
+    else:
+        search_cache.invalidate_tags(search_cache.worker_tags([instance.pk]))
+
+
+@receiver(pre_delete, sender=Worker)
+def invalidate_search_cache_on_worker_delete(sender, instance, **kwargs):
+    """Drop cached searches the worker can appear in"""
+    search_cache.invalidate_workers([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def invalidate_search_cache_on_user_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    """A worker's name is searchable, so renames invalidate text searches"""
+    if raw or (update_fields and not SEARCH_USER_FIELDS & set(update_fields)):
+        return
+    if hasattr(instance, 'worker_profile'):
+        search_cache.invalidate_worker_text([instance.worker_profile.pk])
+
+
+@receiver(m2m_changed, sender=Worker.categories.through)
+@receiver(m2m_changed, sender=Worker.skills.through)
+def invalidate_search_cache_on_relation_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached searches of workers whose categories or skills changed"""
+    if action not in ('pre_clear', 'post_add', 'post_remove'):
+        return
+
+    if reverse:
+        worker_ids = pk_set if action != 'pre_clear' else list(instance.workers.values_list('pk', flat=True))
+    else:
+        worker_ids = [instance.pk]
+    if sender is Worker.skills.through:
+        # Skills are only matched by free text
+        search_cache.invalidate_worker_text(worker_ids)
+        return
+
+    if not reverse:
+        # Categories the worker just left are no longer reachable through it
+        left = pk_set if action == 'post_remove' else ()
+        search_cache.invalidate_workers(
+            worker_ids, Category.objects.filter(pk__in=left or []).values_list('slug', flat=True)
+        )
+        return
+    search_cache.invalidate_workers(worker_ids, [instance.slug])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Skill)
+def invalidate_search_cache_on_term_change(sender, instance, raw=False, **kwargs):
+    """Drop cached searches over a changed category or skill"""
+    if raw:
+        return
+    worker_ids = list(instance.workers.values_list('pk', flat=True))
+    if isinstance(instance, Skill):
+        search_cache.invalidate_worker_text(worker_ids + profiles.fallback_worker_ids(instance))
+    else:
+        search_cache.invalidate_workers(worker_ids, [instance.slug])
+
+
+@receiver(pre_delete, sender=Skill)
+def remember_fallback_workers_on_skill_delete(sender, instance, **kwargs):
+    """Workers without skills show their categories' skills (see profiles.profile_skills)"""
+    instance._fallback_worker_ids = profiles.fallback_worker_ids(instance)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Skill)
+def invalidate_search_cache_on_term_delete(sender, instance, **kwargs):
+    """Drop cached searches over a deleted category or skill"""
+    worker_ids = getattr(instance, '_search_worker_ids', [])
+    if isinstance(instance, Skill):
+        search_cache.invalidate_worker_text(worker_ids + getattr(instance, '_fallback_worker_ids', []))
+    else:
+        search_cache.invalidate_workers(worker_ids, [instance.slug])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_search_cache_on_review_change(sender, instance, raw=False, **kwargs):
+    """Reviews move a worker's rating, which filters and sorts searches"""
+    if not raw:
+        search_cache.invalidate_workers([instance.worker_id])
+
+
+# ============ Search Suggestions ============
+
+@receiver(pre_save, sender=Worker)
+def remember_worker_suggestions(sender, instance, raw=False, **kwargs):
+    """Snapshot the role, availability and areas a save may change"""
+    if not raw and changed_worker_fields(instance) & set(SUGGESTION_WORKER_FIELDS):
+        instance._suggestions_before = suggestions.worker_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=Worker)
+def update_suggestions_on_worker_save(sender, instance, created, raw=False, **kwargs):
+    """Update suggestions whose worker counts the save changed"""
+    if not raw and changed_worker_fields(instance, created) & set(SUGGESTION_WORKER_FIELDS):
+        suggestions.worker_changed(instance, getattr(instance, '_suggestions_before', None))
+
+
+@receiver(pre_delete, sender=Worker)
+def update_suggestions_on_worker_delete(sender, instance, **kwargs):
+    """Update suggestions the deleted worker counted towards"""
+    suggestions.worker_changed(instance, suggestions.worker_snapshot(instance.pk), deleted=True)
+
+
+@receiver(m2m_changed, sender=Worker.categories.through)
+@receiver(m2m_changed, sender=Worker.skills.through)
+def update_suggestions_on_relation_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Update worker counts of categories and skills that gained or lost workers"""
+    if action not in ('pre_clear', 'post_add', 'post_remove'):
+        return
+    kind = 'categories' if sender is Worker.categories.through else 'skills'
+    if reverse:
+        ids = [instance.pk]
+    elif action == 'pre_clear':
+        ids = getattr(instance, kind).values_list('pk', flat=True)
+    else:
+        ids = pk_set
+    suggestions.changed(**{kind: ids})
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def update_suggestions_on_category_change(sender, instance, raw=False, **kwargs):
+    """Category names are suggested, and inactive categories hide their skills"""
+    if not raw:
+        suggestions.changed(
+            categories=[instance.pk], skills=Skill.objects.filter(category=instance.pk).values_list('pk', flat=True)
+        )
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def update_suggestions_on_skill_change(sender, instance, raw=False, **kwargs):
+    """Skill names are suggested"""
+    if not raw:
+        suggestions.changed(skills=[instance.pk])
+
+
+# ============ Spelling Dictionary ============
+
+@receiver(post_save, sender=Worker)
+def update_spelling_on_worker_save(sender, instance, created, raw=False, **kwargs):
+    """New role words become correction targets"""
+    if not raw and 'role' in changed_worker_fields(instance, created):
+        spelling.role_changed(instance.role)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def update_spelling_on_term_change(sender, raw=False, **kwargs):
+    """Category and skill names are correction targets"""
+    if not raw:
+        spelling.changed()
+
+
+# ============ Worker Card Fields ============
+
+def refresh_primary_categories(worker_ids):
+    """Recompute primary_category_slug for many workers in one UPDATE"""
+    first_slug = Category.objects.filter(workers=OuterRef('pk')).order_by('name').values('slug')[:1]
+    Worker.objects.filter(pk__in=worker_ids).update(
+        primary_category_slug=Coalesce(Subquery(first_slug), Value(''))
+    )
+
+
+@receiver(post_save, sender=User)
+def update_display_name_on_user_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Copy a renamed user's name onto its worker profile"""
+    if raw or (update_fields and not SEARCH_USER_FIELDS & set(update_fields)):
+        return
+    Worker.objects.filter(user=instance).update(display_name=display_name_for(instance))
+
+
+@receiver(m2m_changed, sender=Worker.categories.through)
+def update_primary_category_on_relation_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recompute the primary category of workers whose categories changed"""
+    if reverse and action == 'pre_clear':
+        instance._card_cleared_worker_ids = list(instance.workers.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        instance.refresh_primary_category()
+    elif action == 'post_clear':
+        refresh_primary_categories(getattr(instance, '_card_cleared_worker_ids', []))
+    else:
+        refresh_primary_categories(pk_set)
+
+
+@receiver(post_save, sender=Category)
+def update_primary_category_on_category_save(sender, instance, created, raw=False, **kwargs):
+    """A new slug or name can change which category comes first"""
+    if not created and not raw:
+        refresh_primary_categories(instance.workers.values('pk'))
+
+
+@receiver(post_delete, sender=Category)
+def update_primary_category_on_category_delete(sender, instance, **kwargs):
+    """Move workers of a deleted category on to their next category"""
+    worker_ids = getattr(instance, '_search_worker_ids', [])
+    if worker_ids:
+        refresh_primary_categories(worker_ids)
+
+
+# ============ Availability ============
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_day(sender, instance, raw=False, **kwargs):
+    """Snapshot the worker and day a save may move the booking away from"""
+    if not raw and instance.pk:
+        instance._occupancy_before = Booking.objects.filter(pk=instance.pk).values_list(
+            'worker_id', 'scheduled_date'
+        ).first()
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def update_occupancy_on_booking_change(sender, instance, raw=False, **kwargs):
+    """Recompute the occupancy of the days the booking was and is on"""
+    if raw:
+        return
+    days = {(instance.worker_id, str(instance.scheduled_date))}
+    before = getattr(instance, '_occupancy_before', None)
+    if before:
+        days.add((before[0], str(before[1])))
+    for worker_id, day in days:
+        availability.refresh_day(worker_id, day)
+    search_cache.invalidate_dates(day for _, day in days)
+
+
+# ============ Saved Search Alerts ============
+
+@receiver(post_save, sender=Worker)
+def match_saved_searches_on_worker_save(sender, instance, created, raw=False, **kwargs):
+    """A new worker, or a change of availability, price or area, can bring new matches"""
+    if not raw and changed_worker_fields(instance, created) & set(SAVED_SEARCH_WORKER_FIELDS):
+        saved_searches.workers_changed([instance.pk])
+
+
+@receiver(m2m_changed, sender=Worker.categories.through)
+def match_saved_searches_on_category_add(sender, instance, action, reverse, pk_set, **kwargs):
+    """Workers added to a category can match the searches over it"""
+    if action == 'post_add':
+        saved_searches.workers_changed(pk_set if reverse else [instance.pk])
+
+
+# ============ Page Cache ============
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_pages_on_category_change(sender, raw=False, **kwargs):
+    """Search pages list every category in their filter"""
+    if not raw:
+        search_cache.invalidate_tags([page_cache.CATEGORY_LIST_TAG])
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=WorkPortfolio)
+@receiver(post_delete, sender=WorkPortfolio)
+def invalidate_pages_on_profile_content_change(sender, instance, raw=False, **kwargs):
+    """Services and portfolio only show on the worker's own profile"""
+    if not raw:
+        search_cache.invalidate_tags(search_cache.worker_tags([instance.worker_id]))
+
+
+# ============ Leaderboards ============
+
+@receiver(post_save, sender=Worker)
+def update_leaderboards_on_worker_save(sender, instance, created, raw=False, **kwargs):
+    """Rating, jobs, availability and city changes all arrive as worker saves"""
+    if not raw and changed_worker_fields(instance, created) & set(LEADERBOARD_WORKER_FIELDS):
+        leaderboard.worker_changed(instance)
+
+
+@receiver(pre_delete, sender=Worker)
+def remember_leaderboards_on_worker_delete(sender, instance, **kwargs):
+    instance._leaderboards = list(instance.leaderboard_entries.values_list('board', flat=True))
+
+
+@receiver(post_delete, sender=Worker)
+def update_leaderboards_on_worker_delete(sender, instance, **kwargs):
+    """Let the next best workers move up"""
+    for board in getattr(instance, '_leaderboards', []):
+        leaderboard.rebuild_board(board)
+
+
+@receiver(m2m_changed, sender=Worker.categories.through)
+def update_leaderboards_on_category_change(sender, instance, action, reverse, **kwargs):
+    """Workers joining or leaving categories join or leave their boards"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        leaderboard.rebuild_board(leaderboard.board_name('category', instance.slug.lower()))
+    else:
+        leaderboard.worker_changed(instance)
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_board(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk:
+        instance._leaderboard_slug = Category.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def update_leaderboard_on_category_save(sender, instance, raw=False, **kwargs):
+    """A new slug renames the category's board"""
+    old_slug = getattr(instance, '_leaderboard_slug', None)
+    if not raw and old_slug and old_slug.lower() != instance.slug.lower():
+        leaderboard.board_removed(leaderboard.board_name('category', old_slug.lower()))
+        leaderboard.rebuild_board(leaderboard.board_name('category', instance.slug.lower()))
+
+
+@receiver(post_delete, sender=Category)
+def update_leaderboard_on_category_delete(sender, instance, **kwargs):
+    leaderboard.board_removed(leaderboard.board_name('category', instance.slug.lower()))
+
+
+# ============ Stored Files ============
+
+@receiver(pre_save, sender=UserProfile)
+@receiver(pre_save, sender=Worker)
+@receiver(pre_save, sender=WorkPortfolio)
+@receiver(pre_save, sender=Service)
+@receiver(pre_save, sender=Category)
+def remember_file_name(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Snapshot the stored file name, to release it and process the image when it changes"""
+    if raw or not instance.pk:
+        return
+    field = storage.MEDIA_FIELDS[sender._meta.label]
+    if update_fields is not None and field not in update_fields:
+        # The save does not write the file, the stored name stays what it was
+        instance._file_before = getattr(instance, field).name
+    else:
+        instance._file_before = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_save, sender=Worker)
+@receiver(post_save, sender=WorkPortfolio)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Category)
+def release_replaced_file(sender, instance, created, raw=False, **kwargs):
+    before = None if created or raw else getattr(instance, '_file_before', None)
+    if before and before != getattr(instance, storage.MEDIA_FIELDS[sender._meta.label]).name:
+        transaction.on_commit(lambda: default_storage.delete(before))
+
+
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_delete, sender=Worker)
+@receiver(post_delete, sender=WorkPortfolio)
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=Category)
+def release_deleted_file(sender, instance, **kwargs):
+    name = getattr(instance, storage.MEDIA_FIELDS[sender._meta.label]).name
+    if name:
+        transaction.on_commit(lambda: default_storage.delete(name))
+
+
+# ============ Image Processing ============
+
+@receiver(post_save, sender=Worker)
+@receiver(post_save, sender=WorkPortfolio)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Category)
+def queue_image_on_change(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    name = getattr(instance, images.IMAGE_FIELDS[sender._meta.label][0]).name or ''
+    before = '' if created else getattr(instance, '_file_before', None) or ''
+    if name != before:
+        media_queue.enqueue(instance)
@@ -0,0 +1,201 @@
+"""
+Query Spelling Correction
+
+Rewrites misspelled search words to the nearest category, skill or role
+word before the search runs ("plumbr" -> "plumber", "carpentr" ->
+"carpentry") and reports the rewrite as "did you mean". Each corrected
+parameter has a vocabulary of the index fields it is searched in, so a
+category filter is only corrected to category words.
+
+Uses a symmetric delete (SymSpell) dictionary: every vocabulary word is
+stored under each string left after deleting up to MAX_EDIT_DISTANCE of its
+characters. A query word's own deletes then find every word within that
+edit distance with a bounded number of hash lookups, however large the
+vocabulary is.
+
+The dictionaries are built per process on first use. The signals in
+core.signals bump a shared version when the vocabulary changes, and other
+processes rebuild on their next lookup (as core.suggestions does).
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from . import search
+from .models import Category, Skill, Worker
+
+
+MAX_EDIT_DISTANCE = 2
+
+# Shorter words are too ambiguous to correct, and up to this length one edit is the limit
+MIN_WORD_LENGTH = 4
+SHORT_WORD_LENGTH = 5
+
+# Search parameters that are corrected, and the index fields each is matched in
+CORRECTED_PARAMS = {
+    'q': search.ALL_FIELDS,
+    'category': ('category',),
+}
+
+VERSION_KEY = 'spelling:version'
+
+
+def deletes(word, distance):
+    """Every string left after deleting up to `distance` characters of `word`"""
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {part[:i] + part[i + 1:] for part in frontier for i in range(len(part))}
+        found |= frontier
+    return found
+
+
+def edit_distance(first, second):
+    """Damerau-Levenshtein distance (adjacent transpositions count as one edit)"""
+    previous2, previous = None, list(range(len(second) + 1))
+    for i, a in enumerate(first, 1):
+        current = [i] + [0] * len(second)
+        for j, b in enumerate(second, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b))
+            if i > 1 and j > 1 and a == second[j - 2] and first[i - 2] == b:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SpellingDictionary:
+    """Vocabulary words of some index fields with their frequencies, indexed by their deletes"""
+
+    def __init__(self, fields=search.ALL_FIELDS):
+        self.fields = set(fields)
+        self.words = {}
+        self.index = defaultdict(set)
+        self.version = None
+
+    def add(self, word, count=1):
+        if word in self.words:
+            self.words[word] += count
+            return
+        self.words[word] = count
+        for part in deletes(word, MAX_EDIT_DISTANCE):
+            self.index[part].add(word)
+
+    def build(self):
+        """Load the category, skill and role words of its fields, weighted by how many workers use them"""
+        version = current_version()
+        if 'category' in self.fields:
+            for category in Category.objects.filter(is_active=True).annotate(count=Count('workers')):
+                for word in search.category_terms(category):
+                    self.add(word, category.count + 1)
+        if 'skill' in self.fields:
+            for skill in Skill.objects.annotate(count=Count('workers')):
+                for word in search.tokenize(skill.name):
+                    self.add(word, skill.count + 1)
+        if 'role' in self.fields:
+            for row in Worker.objects.exclude(role='').values('role').annotate(count=Count('pk')):
+                for word in search.tokenize(row['role']):
+                    self.add(word, row['count'])
+        self.version = version
+
+    def correct(self, word):
+        """The closest vocabulary word to an unknown word, or None"""
+        if word in self.words or len(word) < MIN_WORD_LENGTH:
+            return None
+        limit = 1 if len(word) <= SHORT_WORD_LENGTH else MAX_EDIT_DISTANCE
+
+        candidates = set()
+        for part in deletes(word, limit):
+            candidates |= self.index.get(part, set())
+
+        best = None
+        for candidate in candidates:
+            distance = edit_distance(word, candidate)
+            if distance <= limit:
+                rank = (distance, -self.words[candidate], candidate)
+                if best is None or rank < best:
+                    best = rank
+        return best[2] if best else None
+
+
+# ============ Process-wide instance ============
+
+# Index fields -> this process's dictionary of them
+_dictionaries = {}
+_build_lock = threading.Lock()
+
+
+def current_version():
+    """Shared version of the vocabulary, started fresh if the cache lost it"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_dictionary(fields=search.ALL_FIELDS):
+    """This process's dictionary of the given fields, rebuilt when the vocabulary changed"""
+    fields = tuple(fields)
+    dictionary = _dictionaries.get(fields)
+    if dictionary is None or dictionary.version != current_version():
+        with _build_lock:
+            if _dictionaries.get(fields) is dictionary:
+                dictionary = SpellingDictionary(fields)
+                dictionary.build()
+                _dictionaries[fields] = dictionary
+            dictionary = _dictionaries[fields]
+    return dictionary
+
+
+def changed():
+    """Have every process rebuild its dictionary after commit"""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, time.time_ns(), None))
+
+
+def role_changed(role):
+    """Rebuild when a worker's role brings words the dictionary does not know"""
+    words = get_dictionary().words
+    if any(word not in words for word in search.tokenize(role)):
+        changed()
+
+
+# ============ Query rewriting ============
+
+def correct_text(text, fields=search.ALL_FIELDS):
+    """
+    Corrections {word: replacement} for the words of `text`, to words of
+    the given fields. Only words that match nothing in those fields are
+    corrected, so names, areas and words being typed (prefixes) are left alone.
+    """
+    dictionary = get_dictionary(fields)
+    corrections = {}
+    for word in set(search.tokenize(text)):
+        replacement = dictionary.correct(word)
+        if replacement and not search.term_exists(word, fields):
+            corrections[word] = replacement
+    return corrections
+
+
+def rewrite_params(params):
+    """
+    Correct the words of normalized search parameters (see
+    search_cache.normalize_params) in place. Returns the corrections made
+    as {param: {word: replacement}}.
+    """
+    corrected = {}
+    for name, fields in CORRECTED_PARAMS.items():
+        corrections = correct_text(params[name], fields)
+        if corrections:
+            words = {corrections.get(word, word) for word in params[name].split()}
+            params[name] = ' '.join(sorted(words))
+            corrected[name] = corrections
+    return corrected
+
+
+def apply(text, corrections):
+    """The user's text with corrected words replaced, for "did you mean" """
+    return ' '.join(corrections.get(word, word) for word in search.tokenize(text))
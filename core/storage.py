@@ -0,0 +1,140 @@
+"""
+Content-Addressed Media Storage
+
+Every media file is stored under the SHA-256 of its content,
+`content/<h[:2]>/<h[2:4]>/<h>.<ext>`, whatever name it was uploaded as.
+Identical uploads share one file, and since a name never gets other
+content its URL can be cached forever.
+
+StoredFile counts the references to each file: saving counts one,
+delete() drops one and the file only goes with its last reference. The
+signals in core.signals release the image of a row when it is replaced or
+the row deleted.
+
+Derivatives (core.images) are recorded on the original they were made
+from and hold a reference of their own, so they are computed once per
+unique image and removed with it. The media worker's processes only
+write(); the references are counted by core.media_queue in the parent.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from . import images
+
+
+CONTENT_DIR = 'content'
+
+CONTENT_NAME = re.compile(rf'^{CONTENT_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.\w+)?$')
+
+# Model label -> file field kept in this storage, released by the signals in core.signals
+MEDIA_FIELDS = {
+    'core.UserProfile': 'profile_image',
+    'core.Worker': 'profile_photo',
+    'core.WorkPortfolio': 'image',
+    'core.Service': 'image',
+    'core.Category': 'image',
+}
+
+
+def content_name(sha256, extension=''):
+    return f'{CONTENT_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def is_content_name(name):
+    """Whether `name` was stored by its content (older uploads kept their own names)"""
+    return bool(CONTENT_NAME.match(name or ''))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage naming files by their content, with reference counting"""
+
+    def _stored_files(self):
+        return apps.get_model('core', 'StoredFile').objects
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, see write()
+        return name
+
+    def write(self, name, content):
+        """
+        Store `content` under its hash, keeping the extension of `name`,
+        without counting a reference. Returns the stored name. Touches no
+        database, so the media worker's processes can call it.
+        """
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        extension = posixpath.splitext(name)[1].lower()
+        stored = content_name(sha256.hexdigest(), extension)
+        if not self.exists(stored):
+            # Written aside and renamed, so a reader never sees half a file
+            # and concurrent writers of the same content just replace each other
+            temporary = super()._save(posixpath.join(CONTENT_DIR, 'tmp', f'{uuid.uuid4().hex}{extension}'), content)
+            os.makedirs(os.path.dirname(self.path(stored)), exist_ok=True)
+            os.replace(self.path(temporary), self.path(stored))
+        return stored
+
+    def _save(self, name, content):
+        name = self.write(name, content)
+        self.retain(name)
+        return name
+
+    def retain(self, name):
+        """Count one more reference to a stored file"""
+        with transaction.atomic():
+            stored, created = self._stored_files().get_or_create(
+                name=name, defaults={'size': self.size(name), 'references': 1}
+            )
+            if not created:
+                self._stored_files().filter(pk=stored.pk).update(references=F('references') + 1)
+
+    def delete(self, name):
+        """Drop one reference to a file, removing it (and its derivatives) with the last one"""
+        if not name:
+            return
+        with transaction.atomic():
+            if self._stored_files().filter(name=name, references__gt=1).update(references=F('references') - 1):
+                return
+            stored = self._stored_files().filter(name=name).first()
+            if stored is not None:
+                stored.delete()
+        # Files stored before reference counting have a single owner
+        super().delete(name)
+        for derivative in images.files(stored.derivatives if stored else {}):
+            self.delete(derivative)
+
+    def discard(self, name):
+        """Remove a file written by write() that nothing references"""
+        if not self._stored_files().filter(name=name).exists():
+            super().delete(name)
+
+    # ============ Derivatives ============
+
+    def derivatives(self, name):
+        """Derivatives recorded for a stored file, {} without any"""
+        return self._stored_files().filter(name=name).values_list('derivatives', flat=True).first() or {}
+
+    def record_derivatives(self, name, derivatives):
+        """
+        Record the derivatives made from a stored file, which then holds a
+        reference to each of them. Returns False when the file is gone.
+        """
+        with transaction.atomic():
+            stored = self._stored_files().select_for_update().filter(name=name).first()
+            if stored is None:
+                return False
+            old, new = images.files(stored.derivatives), images.files(derivatives)
+            for derivative in new - old:
+                self.retain(derivative)
+            stored.derivatives = derivatives
+            stored.save(update_fields=['derivatives'])
+            transaction.on_commit(lambda: [self.delete(derivative) for derivative in old - new])
+        return True
@@ -0,0 +1,283 @@
+"""
+Search Suggestions
+
+Typeahead over category names (English and Bengali), skills, worker roles
+and service areas, served from per-process prefix trees (core.trie).
+Each suggestion is weighted by how many available workers it would find.
+
+The trees are built on first use and patched entry by entry from the
+signals in core.signals. A shared version number in the cache tells other
+processes that their copy is stale, and they rebuild on their next lookup.
+"""
+import threading
+import time
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from .models import Category, Skill, Worker, WorkerFacet
+from .search import tokenize
+from .trie import Trie
+
+
+SUGGESTION_TYPES = ('category', 'skill', 'role', 'area')
+
+# Breaks ties between equally popular suggestions of different types
+TYPE_WEIGHTS = {'category': 3, 'skill': 2, 'role': 1, 'area': 0}
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+VERSION_KEY = 'suggest:version'
+
+AVAILABLE = Q(workers__is_available=True)
+
+
+def normalize(text):
+    """Normalize a name or query for prefix matching"""
+    return ' '.join(tokenize(text))
+
+
+def _keys(*names):
+    """Trie keys of the given names, also under each later word ("control" -> "Pest Control")"""
+    keys = set()
+    for name in filter(None, names):
+        words = normalize(name).split(' ')
+        for i in range(len(words)):
+            keys.add(' '.join(words[i:]))
+    keys.discard('')
+    return keys
+
+
+class Suggester:
+    """Prefix trees of suggestions, one per type, with in-place updates"""
+
+    def __init__(self):
+        self.tries = {kind: Trie() for kind in SUGGESTION_TYPES}
+        self.keys = {kind: {} for kind in SUGGESTION_TYPES}
+        self.lock = threading.Lock()
+        self.version = None
+
+    # ============ Loading entries ============
+
+    def _category_entries(self, ids=None):
+        categories = Category.objects.filter(is_active=True).annotate(count=Count('workers', filter=AVAILABLE))
+        if ids is not None:
+            categories = categories.filter(pk__in=ids)
+        return {
+            category.pk: (_keys(category.name, category.name_bn, category.slug.replace('-', ' ')), {
+                'type': 'category', 'label': category.name, 'label_bn': category.name_bn,
+                'value': category.slug, 'count': category.count,
+            })
+            for category in categories
+        }
+
+    def _skill_entries(self, ids=None):
+        skills = Skill.objects.filter(category__is_active=True).select_related('category').annotate(
+            count=Count('workers', filter=AVAILABLE)
+        )
+        if ids is not None:
+            skills = skills.filter(pk__in=ids)
+        return {
+            skill.pk: (_keys(skill.name), {
+                'type': 'skill', 'label': skill.name, 'value': skill.name,
+                'category': skill.category.slug, 'count': skill.count,
+            })
+            for skill in skills
+        }
+
+    def _role_entries(self, roles=None):
+        rows = Worker.objects.filter(is_available=True).exclude(role='')
+        if roles is not None:
+            rows = rows.filter(reduce(or_, (Q(role__iexact=role.strip()) for role in roles), Q(pk__in=[])))
+        rows = rows.values('role').annotate(count=Count('pk'))
+
+        grouped = {}
+        for row in rows:
+            key = normalize(row['role'])
+            if not key:
+                continue
+            label, count, best = grouped.get(key, (row['role'], 0, 0))
+            # Label with the most common spelling
+            if row['count'] > best:
+                label, best = row['role'], row['count']
+            grouped[key] = (label, count + row['count'], best)
+
+        return {
+            key: (_keys(label), {'type': 'role', 'label': label, 'value': label, 'count': count})
+            for key, (label, count, _) in grouped.items()
+        }
+
+    def _area_entries(self, values=None):
+        rows = WorkerFacet.objects.filter(facet__in=('city', 'area'), worker__is_available=True)
+        if values is not None:
+            rows = rows.filter(value__in=values)
+        rows = rows.values('value').annotate(count=Count('worker', distinct=True), label=Max('label'))
+        return {
+            row['value']: (_keys(row['label']), {
+                'type': 'area', 'label': row['label'], 'value': row['label'], 'count': row['count'],
+            })
+            for row in rows
+        }
+
+    def _loaders(self):
+        return {
+            'category': self._category_entries,
+            'skill': self._skill_entries,
+            'role': self._role_entries,
+            'area': self._area_entries,
+        }
+
+    # ============ Updating the trees ============
+
+    def _put(self, kind, item_id, keys, payload):
+        trie = self.tries[kind]
+        self._drop(kind, item_id)
+        weight = payload['count'] * 10 + TYPE_WEIGHTS[kind]
+        for key in keys:
+            trie.insert(key, item_id, payload, weight)
+        self.keys[kind][item_id] = keys
+
+    def _drop(self, kind, item_id):
+        for key in self.keys[kind].pop(item_id, ()):
+            self.tries[kind].remove(key, item_id)
+
+    def build(self):
+        """Load every suggestion from the database"""
+        version = current_version()
+        with self.lock:
+            for kind, load in self._loaders().items():
+                for item_id, (keys, payload) in load().items():
+                    self._put(kind, item_id, keys, payload)
+            self.version = version
+
+    def refresh(self, kind, item_ids):
+        """
+        Reload the given entries of one type, dropping those that no longer
+        exist. Roles are given by name, the other types by id/value.
+        """
+        item_ids = set(item_ids)
+        if not item_ids:
+            return
+        entries = self._loaders()[kind](item_ids)
+        if kind == 'role':
+            item_ids = {normalize(role) for role in item_ids}
+        with self.lock:
+            for item_id in item_ids:
+                if item_id in entries:
+                    self._put(kind, item_id, *entries[item_id])
+                else:
+                    self._drop(kind, item_id)
+
+    def suggest(self, query, limit=DEFAULT_LIMIT, types=SUGGESTION_TYPES):
+        """Suggestions whose names start with the query, most popular first"""
+        key = normalize(query)
+        if not key:
+            return []
+        with self.lock:
+            ranked = []
+            for kind in types:
+                for rank, payload in enumerate(self.tries[kind].search(key, limit)):
+                    ranked.append((payload['count'] * 10 + TYPE_WEIGHTS[kind], -rank, payload))
+        ranked.sort(key=lambda entry: entry[:2], reverse=True)
+        return [payload for _, _, payload in ranked[:limit]]
+
+
+# ============ Process-wide instance ============
+
+_suggester = None
+_build_lock = threading.Lock()
+
+
+def current_version():
+    """Shared version of the suggestion data, started fresh if the cache lost it"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_suggester():
+    """This process's suggester, rebuilt when another process changed the data"""
+    global _suggester
+    suggester = _suggester
+    if suggester is None or suggester.version != current_version():
+        with _build_lock:
+            if _suggester is suggester:
+                suggester = Suggester()
+                suggester.build()
+                _suggester = suggester
+            suggester = _suggester
+    return suggester
+
+
+def suggest(query, limit=DEFAULT_LIMIT, types=SUGGESTION_TYPES):
+    """Suggestions for a typeahead query, see Suggester.suggest"""
+    return get_suggester().suggest(query, limit, types)
+
+
+def _apply(changes):
+    suggester = _suggester
+    if suggester is not None:
+        for kind, item_ids in changes.items():
+            suggester.refresh(kind, item_ids)
+
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        version = current_version()
+
+    # Another process changed the data too, so this copy may be missing their changes
+    if suggester is not None:
+        in_step = suggester.version is not None and version == suggester.version + 1
+        suggester.version = version if in_step else None
+
+
+def changed(categories=(), skills=(), roles=(), areas=()):
+    """
+    Patch this process's suggestions after commit and tell other processes
+    to rebuild theirs. Roles are given by name, areas by facet value.
+    """
+    changes = {
+        'category': set(categories),
+        'skill': set(skills),
+        'role': {role for role in roles if role.strip()},
+        'area': {value for value in areas if value},
+    }
+    if any(changes.values()):
+        transaction.on_commit(lambda: _apply(changes))
+
+
+def worker_snapshot(worker_id):
+    """What a worker contributes to suggestions, to compare before and after a change"""
+    row = Worker.objects.filter(pk=worker_id).values('role', 'is_available').first() if worker_id else None
+    if row is not None:
+        row['areas'] = set(WorkerFacet.objects.filter(
+            worker=worker_id, facet__in=('city', 'area')
+        ).values_list('value', flat=True))
+    return row
+
+
+def worker_changed(worker, before, deleted=False):
+    """Schedule updates for what changed between a snapshot and the worker's current state"""
+    after = None if deleted else worker_snapshot(worker.pk)
+    if before == after:
+        return
+
+    states = [state for state in (before, after) if state]
+    categories = skills = ()
+    # Joining, leaving or toggling availability moves the counts of its categories and skills
+    if len(states) < 2 or before['is_available'] != after['is_available']:
+        categories = worker.categories.values_list('pk', flat=True)
+        skills = worker.skills.values_list('pk', flat=True)
+
+    changed(
+        categories=categories,
+        skills=skills,
+        roles=[state['role'] for state in states],
+        areas=set().union(*(state['areas'] for state in states)),
+    )
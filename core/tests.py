@@ -0,0 +1,754 @@
+import base64
+import contextlib
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.shortcuts import render
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from api.pagination import WorkerSearchPagination
+
+from . import availability, facets, geo, images, leaderboard, media_files, resize, saved_searches, search, search_cache, service_search, spelling
+from .models import (
+    Booking, Category, LeaderboardEntry, Notification, Review, SavedSearchKey, SavedSearchMatch, Service, Skill, StoredFile, Worker, WorkerFacet,
+    WorkerOccupancy,
+)
+from .storage import is_content_name
+
+
+# Uploads and resized images go to a throwaway directory
+MEDIA_ROOT = tempfile.mkdtemp(prefix='skill-hat-tests-')
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def png(name='photo.png', color='red', size=(400, 300)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def make_worker(username, category, **fields):
+    user = User.objects.create_user(username, password='pass', first_name=fields.pop('first_name', username.title()))
+    fields.setdefault('role', 'Plumber')
+    fields.setdefault('location', 'Dhaka')
+    worker = Worker.objects.create(user=user, **fields)
+    worker.categories.add(category)
+    return worker
+
+
+# Static files are not collected for the tests, so there is no manifest to look names up in
+STORAGES = dict(settings.STORAGES, staticfiles={'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'})
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT, MEDIA_QUEUE_EAGER=True, RESIZE_CACHE_DIR=f'{MEDIA_ROOT}/resize', STORAGES=STORAGES
+)
+class SkillHatTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Plumbing', slug='plumbing')
+
+
+# ============ Profile Update ============
+
+class ProfileUpdateTests(SkillHatTestCase):
+    def test_rename_updates_worker_display_name(self):
+        worker = make_worker('rahim', self.category, first_name='Rahim')
+        self.client.force_login(worker.user)
+
+        response = self.client.post(reverse('update_profile'), {
+            'first_name': 'Karim', 'last_name': 'Uddin', 'email': 'k@example.com', 'address': 'Sylhet',
+        })
+
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        worker.refresh_from_db()
+        self.assertEqual(worker.display_name, 'Karim Uddin')
+        self.assertEqual(worker.location, 'Sylhet')
+
+
+class ProfileSkillsTests(SkillHatTestCase):
+    def test_category_skill_changes_reach_workers_without_skills(self):
+        skill = Skill.objects.create(name='Pipe fitting', category=self.category)
+        worker = make_worker('rahim', self.category)
+        url = reverse('profile', args=[worker.pk])
+        self.assertContains(self.client.get(url), 'Pipe fitting')
+
+        skill.name = 'Leak repair'
+        with self.captureOnCommitCallbacks(execute=True):
+            skill.save()
+        self.assertContains(self.client.get(url), 'Leak repair')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            skill.delete()
+        self.assertNotContains(self.client.get(url), 'Leak repair')
+
+
+# ============ Radius Search ============
+
+class RadiusSearchTests(SkillHatTestCase):
+    def test_worker_registration_stores_coordinates(self):
+        response = self.client.post(reverse('worker_register'), {
+            'full_name': 'Nasir Ahmed', 'email': 'nasir@example.com', 'phone': '01700000000',
+            'password1': 'S3cure-pass-123', 'password2': 'S3cure-pass-123', 'role': 'Plumber',
+            'category': self.category.pk, 'hourly_rate': '500', 'location': 'Mirpur, Dhaka',
+            'latitude': '23.8223', 'longitude': '90.3654', 'agree_terms': 'on',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        worker = Worker.objects.get(user__email='nasir@example.com')
+        self.assertEqual((worker.latitude, worker.longitude), (23.8223, 90.3654))
+        self.assertTrue(worker.geohash.startswith('wh0'))
+
+    def test_near_search_keeps_workers_within_radius(self):
+        make_worker('mirpur', self.category, first_name='Mirpurworker', latitude=23.8223, longitude=90.3654)
+        make_worker('chittagong', self.category, first_name='Ctgworker', latitude=22.3569, longitude=91.7832)
+
+        response = self.client.get(reverse('search_results'), {'near': '23.81,90.41', 'radius_km': '10'})
+
+        self.assertContains(response, 'Mirpurworker')
+        self.assertNotContains(response, 'Ctgworker')
+        self.assertContains(response, 'data-near-clear')
+
+    def test_non_finite_coordinates_and_radius(self):
+        make_worker('mirpur', self.category, first_name='Mirpurworker', latitude=23.8223, longitude=90.3654)
+        self.client.login(username='mirpur', password='pass')
+        for near, radius in [('23.81,90.41', 'nan'), ('23.81,90.41', 'inf'), ('nan,90.41', '5'), ('23.81,inf', '5')]:
+            params = {'near': near, 'radius_km': radius}
+            self.assertEqual(self.client.get(reverse('search_results'), params).status_code, 200)
+            self.assertEqual(self.client.get('/api/v1/workers/search/', params).status_code, 200)
+        self.assertEqual(geo.parse_radius('nan'), geo.DEFAULT_RADIUS_KM)
+        self.assertEqual(geo.parse_radius('-inf'), geo.DEFAULT_RADIUS_KM)
+        self.assertIsNone(geo.parse_near('nan,nan'))
+
+
+# ============ Page Cache ============
+
+class PageCacheTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.electric = Category.objects.create(name='Electrical', slug='electrical')
+        self.plumber = make_worker('plumber', self.category, first_name='Pipefixer')
+        self.electrician = make_worker('electrician', self.electric, first_name='Wireman', role='Electrician')
+        self.url = reverse('search_results')
+
+    def rendered(self, params):
+        """Whether the page had to be rendered, rather than coming from the page cache"""
+        with mock.patch('skill_hat.views.render', wraps=render) as view_render:
+            self.assertEqual(self.client.get(self.url, params).status_code, 200)
+        return view_render.called
+
+    def edit(self, worker, **fields):
+        for name, value in fields.items():
+            setattr(worker, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.save()
+
+    def test_unrelated_bio_edit_keeps_cached_page(self):
+        self.assertTrue(self.rendered({'category': 'plumbing'}))
+        self.assertFalse(self.rendered({'category': 'plumbing'}))
+
+        self.edit(self.electrician, bio='Twenty years of wiring')
+        self.assertFalse(self.rendered({'category': 'plumbing'}))
+
+    def test_shown_worker_changes_drop_cached_page(self):
+        self.rendered({'category': 'plumbing'})
+        self.edit(self.plumber, role='Master plumber')
+        self.assertTrue(self.rendered({'category': 'plumbing'}))
+
+        # Price changes move facet counts of every category
+        self.edit(self.electrician, hourly_rate=900)
+        self.assertTrue(self.rendered({'category': 'plumbing'}))
+
+
+# ============ Worker Search ============
+
+class WorkerSearchTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.electric = Category.objects.create(name='Electrical', slug='electrical')
+        make_worker('karim', self.category, first_name='Karim', location='Mirpur')
+        make_worker('kamal', self.electric, first_name='Kamal', role='Electrician', location='Uttara')
+
+    def names(self, queryset):
+        return sorted(worker.user.first_name for worker in queryset)
+
+    def test_every_token_must_match(self):
+        self.assertEqual(self.names(Worker.objects.filter(pk__in=search.match_workers('kar plumb'))), ['Karim'])
+        self.assertEqual(self.names(Worker.objects.filter(pk__in=search.match_workers('karim electric'))), [])
+        self.assertIsNone(search.match_workers('  '))
+
+    def test_similar_sounding_role(self):
+        self.assertEqual(self.names(Worker.objects.filter(pk__in=search.match_workers('elektrishan'))), ['Kamal'])
+
+    def test_search_page_filters(self):
+        response = self.client.get(reverse('search_results'), {'category': 'electrical', 'location': 'uttara'})
+        self.assertContains(response, 'Kamal')
+        self.assertNotContains(response, 'Karim')
+
+    def test_facet_filters_are_subqueries(self):
+        make_worker('jamal', self.electric, first_name='Jamal', location='Gulshan', service_areas='Banani, Mohakhali')
+        queryset, filters, _ = search.filter_workers(
+            Worker.objects.all(), search_cache.normalize_params({'category': 'elec', 'location': 'bana'})
+        )
+        queryset = facets.apply_filters(queryset, filters)
+        self.assertIn('core_workerfacet', str(queryset.query))
+        self.assertEqual(self.names(queryset), ['Jamal'])
+
+    def test_api_search(self):
+        response = self.client.get('/api/v1/workers/', {'search': 'mirpur'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Karim')
+        self.assertNotContains(response, 'Kamal')
+
+
+# ============ Service Search ============
+
+class ServiceSearchTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        worker = make_worker('rahim', self.category)
+        Service.objects.create(worker=worker, name='AC servicing', description='Gas refill and cleaning', price=1500)
+        Service.objects.create(worker=worker, name='Deep cleaning', description='Full house', price=3000)
+        Service.objects.create(worker=worker, name='AC repair', price=800, is_active=False)
+
+    def names(self, text):
+        return sorted(Service.objects.filter(pk__in=service_search.match_services(text)).values_list('name', flat=True))
+
+    def test_every_token_must_match(self):
+        self.assertEqual(self.names('ac'), ['AC servicing'])
+        self.assertEqual(self.names('clean'), ['AC servicing', 'Deep cleaning'])
+        self.assertEqual(self.names('clean ho'), ['Deep cleaning'])
+        self.assertEqual(self.names('ac house'), [])
+        self.assertIsNone(service_search.match_services(''))
+
+    def test_search_api(self):
+        response = self.client.get('/api/v1/services/search/', {'q': 'cleaning', 'max_price': 2000})
+        self.assertEqual(response.status_code, 200)
+        [worker] = response.data['results']
+        self.assertEqual([service['name'] for service in worker['services']], ['AC servicing'])
+
+
+# ============ Spelling ============
+
+class SpellingTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        worker = make_worker('rahim', self.category, first_name='Rahim')
+        worker.skills.add(Skill.objects.create(name='Pipe fitting', category=self.category))
+
+    def test_correct_text(self):
+        self.assertEqual(spelling.correct_text('plumbr'), {'plumbr': 'plumber'})
+        # Known words and words being typed are left alone
+        self.assertEqual(spelling.correct_text('plumb pipe'), {})
+
+    def test_category_is_corrected_to_category_words(self):
+        self.assertEqual(spelling.correct_text('plambing', ('category',)), {'plambing': 'plumbing'})
+        # "plumber" is a role word, no category would match it
+        self.assertEqual(spelling.correct_text('plamber', ('category',)), {})
+
+    def test_did_you_mean(self):
+        url = reverse('search_results')
+        response = self.client.get(url, {'q': 'plumbr'})
+        self.assertContains(response, 'Showing results for <strong>plumber</strong>', html=False)
+        self.assertContains(response, 'Rahim')
+
+        response = self.client.get(url, {'category': 'plambing'})
+        self.assertContains(response, 'category <strong>plumbing</strong>', html=False)
+        self.assertContains(response, 'Rahim')
+
+        self.assertNotContains(self.client.get(url, {'category': 'plamber'}), 'Showing results for')
+
+
+# ============ API Pagination ============
+
+class SearchPaginationTests(SkillHatTestCase):
+    url = '/api/v1/workers/search/'
+
+    def setUp(self):
+        super().setUp()
+        # Two ties on rating, so pages have to break them by id
+        for username, rating, rate in [('ayan', 4.5, 300), ('bashir', 4.5, 500), ('chandan', 4.0, 500),
+                                       ('dipu', 4.0, 500), ('emon', 3.0, 800)]:
+            make_worker(username, self.category, rating=rating, hourly_rate=rate)
+        self.client.login(username='ayan', password='pass')
+
+    def walk(self, **params):
+        usernames, cursor = [], None
+        while True:
+            query = dict(params, page_size=2, **({'cursor': cursor} if cursor else {}))
+            response = self.client.get(self.url, query)
+            self.assertEqual(response.status_code, 200)
+            usernames += [Worker.objects.get(pk=row['id']).user.username for row in response.data['results']]
+            if not response.data['next']:
+                return usernames
+            cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+
+    def test_cursors_walk_every_worker_once(self):
+        self.assertEqual(self.walk(sort='rating'), ['bashir', 'ayan', 'dipu', 'chandan', 'emon'])
+        self.assertEqual(self.walk(sort='price_low'), ['ayan', 'bashir', 'chandan', 'dipu', 'emon'])
+
+    def test_cursors_without_cached_order(self):
+        # Pages past the cached result order are read with keyset queries
+        with mock.patch.object(search_cache, 'cached_search', return_value={'ids': [], 'complete': False}):
+            self.assertEqual(self.walk(sort='price_high'), ['emon', 'dipu', 'chandan', 'bashir', 'ayan'])
+
+    def test_service_search_cursors_stay_on_the_cached_order(self):
+        for worker in Worker.objects.all():
+            Service.objects.create(worker=worker, name='Pipe repair', price=worker.hourly_rate)
+        # Ranked by the cheapest service, a float, not by the hourly rate field
+        with mock.patch.object(WorkerSearchPagination, 'paginate_ranked', side_effect=AssertionError):
+            usernames, cursor = [], None
+            while True:
+                query = {'q': 'pipe', 'page_size': 2, **({'cursor': cursor} if cursor else {})}
+                response = self.client.get('/api/v1/services/search/', query)
+                usernames += [Worker.objects.get(pk=row['id']).user.username for row in response.data['results']]
+                if not response.data['next']:
+                    break
+                cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        self.assertEqual(usernames, ['ayan', 'bashir', 'chandan', 'dipu', 'emon'])
+
+    def test_malformed_cursors_are_rejected(self):
+        for sort, position in [('rating', {'v': [1], 'id': 1}), ('price_low', {'v': 'abc', 'id': 1}),
+                               ('jobs', {'v': 'NaN', 'id': 1}), ('rating', {'v': 4.5})]:
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+            response = self.client.get(self.url, {'sort': sort, 'cursor': cursor})
+            self.assertEqual(response.status_code, 404, position)
+        self.assertEqual(self.client.get(self.url, {'cursor': '!!'}).status_code, 404)
+
+
+# ============ Search Cache ============
+
+class SearchCacheTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.electric = Category.objects.create(name='Electrical', slug='electrical')
+        make_worker('plumber', self.category, first_name='Pipefixer')
+        make_worker('electrician', self.electric, first_name='Wireman', role='Electrician')
+
+    def test_category_facet_follows_other_categories(self):
+        url = reverse('search_results')
+        self.assertContains(self.client.get(url, {'category': 'plumbing'}), 'Electrical (1)')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_worker('electrician2', self.electric, first_name='Sparky', role='Electrician')
+
+        self.assertContains(self.client.get(url, {'category': 'plumbing'}), 'Electrical (2)')
+
+    def test_bio_edit_keeps_category_searches(self):
+        url = reverse('search_results')
+        self.client.get(url, {'category': 'plumbing'})
+        worker = Worker.objects.get(user__username='electrician')
+        worker.bio = 'Twenty years of wiring'
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.save()
+
+        with mock.patch('core.search.filter_workers', wraps=search.filter_workers) as filter_workers:
+            self.assertContains(self.client.get(url, {'category': 'plumbing'}), 'Pipefixer')
+        self.assertEqual(filter_workers.call_count, 0)
+
+    def test_text_searches_follow_bio_edit(self):
+        url = reverse('search_results')
+        self.assertNotContains(self.client.get(url, {'q': 'wiring'}), 'Wireman')
+        worker = Worker.objects.get(user__username='electrician')
+        worker.bio = 'Twenty years of wiring'
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.save()
+        self.assertContains(self.client.get(url, {'q': 'wiring'}), 'Wireman')
+
+    def test_changed_fields(self):
+        worker = Worker.objects.get(user__username='plumber')
+        self.assertEqual(search_cache.search_tags(search_cache.normalize_params({'category': 'plumbing'})), ['plumbing'])
+        with mock.patch.object(search_cache, 'invalidate_workers') as invalidate_workers, \
+                mock.patch.object(search_cache, 'invalidate_worker_text') as invalidate_worker_text:
+            worker.hourly_rate = str(worker.hourly_rate)
+            worker.save()
+            self.assertFalse(invalidate_workers.called or invalidate_worker_text.called)
+            worker.hourly_rate = 750
+            worker.save()
+        invalidate_workers.assert_called_once_with([worker.pk])
+
+    def test_results_follow_worker_changes(self):
+        url = reverse('search_results')
+        self.assertContains(self.client.get(url, {'q': 'plumber'}), 'Pipefixer')
+
+        worker = Worker.objects.get(user__username='plumber')
+        worker.is_available = False
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.save()
+
+        self.assertNotContains(self.client.get(url, {'q': 'plumber'}), 'Pipefixer')
+
+
+# ============ Worker Saves ============
+
+class WorkerSaveTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.worker = make_worker('plumber', self.category, hourly_rate=500)
+
+    def hooks(self):
+        return {
+            'index': mock.patch.object(search, 'index_worker', wraps=search.index_worker),
+            'facets': mock.patch.object(facets, 'index_worker', wraps=facets.index_worker),
+            'leaderboard': mock.patch.object(leaderboard, 'worker_changed', wraps=leaderboard.worker_changed),
+            'saved_searches': mock.patch.object(saved_searches, 'workers_changed'),
+        }
+
+    def save(self, **kwargs):
+        """Save the worker, returns the hooks that ran"""
+        with contextlib.ExitStack() as stack:
+            hooks = {name: stack.enter_context(patch) for name, patch in self.hooks().items()}
+            self.worker.save(**kwargs)
+        return {name for name, hook in hooks.items() if hook.called}
+
+    def test_unchanged_save_skips_hooks(self):
+        self.assertEqual(self.save(), set())
+        self.worker.bio = 'Fixes leaks'
+        with self.assertNumQueries(1):
+            self.worker.save(update_fields=['profile_photo_status'])
+
+    def test_hooks_follow_changed_fields(self):
+        self.worker.bio = 'Fixes leaks'
+        self.assertEqual(self.save(), {'index', 'facets', 'saved_searches'})
+
+        self.worker.hourly_rate = '1500'
+        self.assertEqual(self.save(), {'facets', 'saved_searches'})
+        self.assertTrue(WorkerFacet.objects.filter(worker=self.worker, facet='price', value='1200+').exists())
+
+        self.worker.total_jobs = 4
+        self.assertEqual(self.save(), {'leaderboard'})
+        self.assertEqual(LeaderboardEntry.objects.filter(worker=self.worker, board='all').get().total_jobs, 4)
+
+    def test_update_fields_limit_hooks(self):
+        self.worker.bio = 'Fixes leaks'
+        self.worker.is_available = False
+        self.assertEqual(self.save(update_fields=['bio']), {'index', 'facets', 'saved_searches'})
+        self.assertEqual(leaderboard.top(), [self.worker.pk])
+
+
+# ============ Availability ============
+
+class AvailabilityTests(SkillHatTestCase):
+    day = datetime.date(2026, 1, 5)
+
+    def setUp(self):
+        super().setUp()
+        self.worker = make_worker('plumber', self.category)
+        self.customer = User.objects.create_user('customer', password='pass')
+
+    def book(self, hour, minute=0, day=None):
+        return Booking.objects.create(
+            client=self.customer, worker=self.worker, title='Leak', description='Kitchen sink', location='Dhaka',
+            scheduled_date=day or self.day, scheduled_time=datetime.time(hour, minute), estimated_price=500
+        )
+
+    def is_free(self, day=None, at=None):
+        return availability.filter_free(Worker.objects.all(), day or self.day, at).filter(pk=self.worker.pk).exists()
+
+    def slots(self, day=None):
+        return WorkerOccupancy.objects.get(worker=self.worker, date=day or self.day).slots
+
+    def test_free_slot(self):
+        self.assertTrue(self.is_free(at=datetime.time(10)))
+        self.book(10)
+        self.assertTrue(self.is_free(at=datetime.time(12)))
+        self.assertTrue(self.is_free(at=datetime.time(8)))
+        self.assertTrue(self.is_free(day=self.day + datetime.timedelta(days=1), at=datetime.time(10)))
+
+    def test_overlapping_booking(self):
+        self.book(10, 30)
+        self.assertEqual(self.slots(), 0b1111 << 21)
+        self.assertFalse(self.is_free(at=datetime.time(9)))
+        self.assertFalse(self.is_free(at=datetime.time(12)))
+        self.assertTrue(self.is_free(at=datetime.time(12, 30)))
+
+    def test_cancelled_booking_frees_the_slot(self):
+        booking = self.book(10)
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertFalse(WorkerOccupancy.objects.exists())
+        self.assertTrue(self.is_free(at=datetime.time(10)))
+
+    def test_booking_is_cut_off_at_midnight(self):
+        self.book(23)
+        self.assertEqual(self.slots(), 0b11 << 46)
+        self.assertFalse(self.is_free(at=datetime.time(22)))
+        self.assertTrue(self.is_free(day=self.day + datetime.timedelta(days=1), at=datetime.time(0)))
+
+    def test_date_without_time_drops_only_workers_booked_solid(self):
+        for hour in (8, 10, 12, 14, 16):
+            self.book(hour)
+        self.assertTrue(self.is_free())
+        self.book(18)
+        self.assertFalse(self.is_free())
+
+    def test_moving_a_booking_frees_the_old_day(self):
+        booking = self.book(10)
+        booking.scheduled_date = self.day + datetime.timedelta(days=1)
+        booking.save()
+        self.assertTrue(self.is_free(at=datetime.time(10)))
+        self.assertFalse(self.is_free(day=booking.scheduled_date, at=datetime.time(10)))
+
+    def test_rebuild(self):
+        self.book(10)
+        self.book(15)
+        cancelled = self.book(10, day=self.day + datetime.timedelta(days=1))
+        Booking.objects.filter(pk=cancelled.pk).update(status='cancelled')
+        WorkerOccupancy.objects.update(slots=0)
+
+        output = io.StringIO()
+        call_command('rebuild_availability', stdout=output)
+        self.assertIn('Stored 1 worker-days.', output.getvalue())
+        self.assertEqual(self.slots(), (0b1111 << 20) | (0b1111 << 30))
+
+
+# ============ Leaderboards ============
+
+class LeaderboardTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ayan = make_worker('ayan', self.category, rating=4.0, total_jobs=10)
+        self.bashir = make_worker('bashir', self.category, rating=4.5, total_jobs=3)
+        self.chandan = make_worker('chandan', self.category, rating=3.0, total_jobs=1)
+        self.customer = User.objects.create_user('customer', password='pass')
+
+    def review(self, worker, rating):
+        booking = Booking.objects.create(
+            client=self.customer, worker=worker, title='Leak', description='Kitchen sink', location='Dhaka',
+            scheduled_date=datetime.date(2026, 1, 5), scheduled_time=datetime.time(10), estimated_price=500
+        )
+        Review.objects.create(booking=booking, worker=worker, client=self.customer, rating=rating)
+
+    def test_boards(self):
+        ranking = [self.bashir.pk, self.ayan.pk, self.chandan.pk]
+        self.assertEqual(leaderboard.top(), ranking)
+        self.assertEqual(leaderboard.top('category:plumbing'), ranking)
+        self.assertEqual(leaderboard.top('city:dhaka'), ranking)
+        self.assertEqual(leaderboard.top(limit=1), [self.bashir.pk])
+
+    def test_review_changes_rank(self):
+        self.review(self.ayan, 5)
+        self.assertEqual(leaderboard.top(), [self.ayan.pk, self.bashir.pk, self.chandan.pk])
+        self.assertEqual(leaderboard.top('category:plumbing')[0], self.ayan.pk)
+
+    def test_unavailable_worker_drops_off(self):
+        self.bashir.is_available = False
+        self.bashir.save()
+        self.assertEqual(leaderboard.top(), [self.ayan.pk, self.chandan.pk])
+        self.assertFalse(LeaderboardEntry.objects.filter(worker=self.bashir).exists())
+
+        self.bashir.is_available = True
+        self.bashir.save()
+        self.assertEqual(leaderboard.top()[0], self.bashir.pk)
+
+    def test_next_best_moves_up_on_full_board(self):
+        with mock.patch.object(leaderboard, 'LEADERBOARD_SIZE', 2):
+            leaderboard.rebuild()
+            self.assertEqual(leaderboard.top(), [self.bashir.pk, self.ayan.pk])
+            self.bashir.is_available = False
+            self.bashir.save()
+            self.assertEqual(leaderboard.top(), [self.ayan.pk, self.chandan.pk])
+
+    def test_rebuild(self):
+        expected = sorted(LeaderboardEntry.objects.values_list('board', 'worker', 'rating', 'total_jobs'))
+        LeaderboardEntry.objects.all().delete()
+
+        output = io.StringIO()
+        call_command('rebuild_leaderboards', stdout=output)
+        self.assertIn('Rebuilt 3 leaderboards.', output.getvalue())
+        self.assertEqual(sorted(LeaderboardEntry.objects.values_list('board', 'worker', 'rating', 'total_jobs')), expected)
+
+
+# ============ Saved Searches ============
+
+class SavedSearchTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.existing = make_worker('plumber', self.category, first_name='Pipefixer', location='Gulshan, Dhaka')
+        self.owner = User.objects.create_user('owner', password='pass')
+        self.saved = saved_searches.save_search(self.owner, {'category': 'plumbing', 'max_price': '800'}, name='Plumbers')
+
+    def notifications(self):
+        return Notification.objects.filter(user=self.owner, notification_type='saved_search')
+
+    def test_saved_search_is_indexed_with_current_matches(self):
+        self.assertEqual(list(SavedSearchKey.objects.values_list('key', flat=True)), ['category:plumbing'])
+        self.assertEqual(
+            list(SavedSearchMatch.objects.values_list('saved_search_id', 'worker_id')), [(self.saved.pk, self.existing.pk)]
+        )
+        terms = search.build_terms(self.existing)
+        self.assertIn('category:plumb', saved_searches.worker_keys(terms))
+        self.assertTrue(saved_searches.matches(self.saved.params, self.existing, terms))
+
+    def test_new_match_is_notified_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            worker = make_worker('newcomer', self.category, first_name='Newton', hourly_rate=600)
+        self.assertFalse(self.notifications().exists())
+
+        for callback in callbacks:
+            callback()
+        notification = self.notifications().get()
+        self.assertEqual(notification.link, f'/worker/{worker.pk}/')
+        self.assertIn('Plumbers', notification.title)
+
+        # A match is announced once
+        worker.bio = 'Fixes leaks'
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.save()
+        self.assertEqual(self.notifications().count(), 1)
+
+    def test_workers_outside_the_search_are_not_notified(self):
+        electric = Category.objects.create(name='Electrical', slug='electrical')
+        with self.captureOnCommitCallbacks(execute=True):
+            make_worker('electrician', electric, role='Electrician', hourly_rate=600)
+            make_worker('pricey', self.category, hourly_rate=1500)
+            self.existing.bio = 'Still fixing pipes'
+            self.existing.save()
+        self.assertFalse(self.notifications().exists())
+
+
+# ============ Media Storage ============
+
+class MediaStorageTests(SkillHatTestCase):
+    def add_category(self, slug, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Category.objects.create(name=slug.title(), slug=slug, image=image)
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.add_category('masonry', png('wall.png'))
+        second = self.add_category('tiling', png('floor.PNG'))
+        name = first.image.name
+        self.assertTrue(is_content_name(name))
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(StoredFile.objects.get(name=name).references, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).references, 1)
+
+        derivatives = default_storage.derivatives(name)
+        self.assertTrue(images.files(derivatives))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        for derivative in images.files(derivatives):
+            self.assertFalse(default_storage.exists(derivative))
+
+    def test_replaced_image_is_released(self):
+        category = self.add_category('painting', png(color='blue'))
+        old = category.image.name
+        category.image = png(color='green')
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        self.assertNotEqual(category.image.name, old)
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(category.image.name))
+
+
+# ============ Media Serving ============
+
+class MediaServingTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.image = png()
+            self.category.save()
+        self.url = reverse('media', args=[self.category.image.name])
+
+    def test_content_named_file_is_immutable(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], media_files.IMMUTABLE)
+        self.assertEqual(response['ETag'], f'"{os.path.splitext(os.path.basename(self.category.image.name))[0]}"')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_byte_ranges(self):
+        content = b''.join(self.client.get(self.url).streaming_content)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(content)}')
+        self.assertEqual(b''.join(response.streaming_content), content[10:20])
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE=f'bytes={len(content)}-').status_code, 416)
+        # A range of a file the client has an older copy of is not sent
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"old"').status_code, 200)
+
+    @override_settings(MEDIA_ACCEL='nginx', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_proxy_handoff(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.category.image.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_booking_files_need_a_participant(self):
+        worker = make_worker('rahim', self.category)
+        client = User.objects.create_user('client', password='pass')
+        booking = Booking.objects.create(
+            client=client, worker=worker, title='Leak', description='Kitchen sink', location='Dhaka',
+            scheduled_date=datetime.date(2026, 1, 5), scheduled_time=datetime.time(10), estimated_price=500,
+        )
+        name = f'bookings/{booking.pk}/invoice.txt'
+        os.makedirs(os.path.join(MEDIA_ROOT, 'bookings', str(booking.pk)), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, name), 'w') as f:
+            f.write('invoice')
+        url = reverse('media', args=[name])
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+        User.objects.create_user('stranger', password='pass')
+        self.client.login(username='stranger', password='pass')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.login(username='client', password='pass')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], media_files.PRIVATE)
+
+    def test_hidden_and_temporary_files_are_not_served(self):
+        for name in ['.env', 'content/tmp/upload.png', '../manage.py']:
+            self.assertEqual(self.client.get(f'/media/{name}').status_code, 404)
+
+
+# ============ Image Resizing ============
+
+class ResizedImageTests(SkillHatTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(MEDIA_ROOT, 'portfolio'), exist_ok=True)
+        Image.new('RGB', (400, 300), 'red').save(os.path.join(MEDIA_ROOT, 'portfolio', 'tap.png'))
+
+    def test_allowed_size_is_resized(self):
+        response = self.client.get(reverse('resized_image', args=[160, 0, 'portfolio/tap.png']))
+        self.assertEqual(response.status_code, 200)
+        image = Image.open(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(image.size, (160, 120))
+
+    def test_other_sizes_are_not_served(self):
+        for width, height in [(161, 0), (2000, 2000), (0, 0)]:
+            response = self.client.get(reverse('resized_image', args=[width, height, 'portfolio/tap.png']))
+            self.assertEqual(response.status_code, 404)
+
+    def test_variant_is_rendered_once(self):
+        url = reverse('resized_image', args=[320, 320, 'portfolio/tap.png'])
+        with mock.patch('core.resize.render', wraps=resize.render) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
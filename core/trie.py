@@ -0,0 +1,99 @@
+"""
+In-memory prefix tree
+
+Maps string keys to weighted items so prefix lookups (autocomplete,
+typeahead) cost O(len(prefix) + matches) instead of scanning every key.
+Each node remembers its best matches after the first lookup, so repeated
+short prefixes cost O(len(prefix)) until a key below them changes.
+"""
+
+
+# Best matches remembered per node, larger limits are computed every time
+CACHED_RESULTS = 20
+
+
+class _Node:
+    __slots__ = ('children', 'items', 'best')
+
+    def __init__(self):
+        self.children = {}
+        self.items = {}
+        self.best = None
+
+
+class Trie:
+    """Prefix tree of keys -> {item_id: (weight, payload)}"""
+
+    def __init__(self):
+        self.root = _Node()
+        self.size = 0
+
+    def insert(self, key, item_id, payload, weight=0):
+        """Attach an item to a key, replacing any previous weight/payload"""
+        node = self.root
+        node.best = None
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            node.best = None
+        if item_id not in node.items:
+            self.size += 1
+        node.items[item_id] = (weight, payload)
+
+    def remove(self, key, item_id):
+        """Detach an item from a key, pruning empty branches"""
+        path = [self.root]
+        for char in key:
+            node = path[-1].children.get(char)
+            if node is None:
+                return False
+            path.append(node)
+
+        if path[-1].items.pop(item_id, None) is None:
+            return False
+        self.size -= 1
+        for node in path:
+            node.best = None
+
+        for depth in range(len(key), 0, -1):
+            node = path[depth]
+            if node.items or node.children:
+                break
+            del path[depth - 1].children[key[depth - 1]]
+        return True
+
+    def _find(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def search(self, prefix, limit=10):
+        """
+        Return up to `limit` payloads whose keys start with `prefix`,
+        highest weight first. Items reachable through several keys are
+        returned once, with their best weight.
+        """
+        start = self._find(prefix)
+        if start is None:
+            return []
+        if start.best is not None and limit <= CACHED_RESULTS:
+            return start.best[:limit]
+
+        best = {}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for item_id, (weight, payload) in node.items.items():
+                if item_id not in best or weight > best[item_id][0]:
+                    best[item_id] = (weight, payload)
+            stack.extend(node.children.values())
+
+        ranked = sorted(best.values(), key=lambda entry: entry[0], reverse=True)
+        results = [payload for _, payload in ranked[:max(limit, CACHED_RESULTS)]]
+        start.best = results
+        return results[:limit]
+
+    def __len__(self):
+        return self.size
@@ -184,6 +184,8 @@ class WorkerRegisterForm(UserCreationForm):
             'placeholder': 'Your Location (e.g., Dhaka, Mirpur)'
         })
     )
+    latitude = forms.FloatField(required=False, min_value=-90, max_value=90, widget=forms.HiddenInput())
+    longitude = forms.FloatField(required=False, min_value=-180, max_value=180, widget=forms.HiddenInput())
     experience_years = forms.IntegerField(
         required=False,
         widget=forms.NumberInput(attrs={
@@ -218,7 +220,8 @@ class WorkerRegisterForm(UserCreationForm):
     class Meta:
         model = User
         fields = ('full_name', 'email', 'phone', 'password1', 'password2', 
-                  'role', 'category', 'hourly_rate', 'location', 'experience_years', 'bio', 'photo')
+                  'role', 'category', 'hourly_rate', 'location', 'latitude', 'longitude',
+                  'experience_years', 'bio', 'photo')
 
     def clean_email(self):
         email = self.cleaned_data.get('email')
@@ -261,7 +264,7 @@ class BookingForm(forms.ModelForm):
     
     class Meta:
         model = Booking
-        fields = ['title', 'description', 'location', 'phone', 'scheduled_date', 'scheduled_time', 'service']
+        fields = ['title', 'description', 'location', 'latitude', 'longitude', 'phone', 'scheduled_date', 'scheduled_time', 'service']
         widgets = {
             'title': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -276,6 +279,8 @@ class BookingForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Full address where service is needed'
             }),
+            'latitude': forms.HiddenInput(),
+            'longitude': forms.HiddenInput(),
             'phone': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Contact phone number',
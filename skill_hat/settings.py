@@ -83,6 +83,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.page_cache.PageCacheMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -207,6 +208,72 @@ CORS_ALLOW_CREDENTIALS = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per content and reference counted (see core.storage)
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# Front proxy serving media files for skill_hat.views.media_view: 'nginx'
+# (X-Accel-Redirect to an `internal` location at MEDIA_ACCEL_PREFIX aliasing
+# MEDIA_ROOT), 'apache' (X-Sendfile) or '' to send them from Django
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+# Disk cache of the images resized by /img/<w>x<h>/<path> (see core.resize),
+# least recently used variants are dropped above RESIZE_CACHE_MAX_BYTES
+RESIZE_CACHE_DIR = os.environ.get('RESIZE_CACHE_DIR', str(BASE_DIR / 'resize_cache'))
+RESIZE_CACHE_MAX_BYTES = int(os.environ.get('RESIZE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# The only w x h boxes served, any other size is a 404 so clients cannot
+# fill the cache or the CPU with variants (0 keeps the aspect ratio)
+RESIZE_SIZES = {
+    (80, 0),
+    (160, 0),
+    (320, 320),
+    (640, 0),
+    (1280, 0),
+}
+
+# Process uploaded images right after the request commits instead of in
+# `python manage.py media_worker` (see core.media_queue)
+MEDIA_QUEUE_EAGER = os.environ.get('MEDIA_QUEUE_EAGER', str(DEBUG)) == 'True'
+
+
+# ============ Cache Configuration ============
+
+# Local memory is per process. Deployments running several processes should
+# use a shared backend (Redis, Memcached) so search cache invalidation
+# reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'skill-hat',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Seconds a worker search result stays cached (see core.search_cache)
+SEARCH_CACHE_TIMEOUT = int(os.environ.get('SEARCH_CACHE_TIMEOUT', 300))
+
+# Seconds an anonymous page stays cached (see core.page_cache)
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 300))
+
+
+# ============ Search Ranking Configuration ============
+
+# Weights of the relevance signals, merged over core.ranking.DEFAULT_WEIGHTS
+# (text, rating, jobs, verified, recency, distance), e.g. {'distance': 3.0}.
+# Compare weightings with `python manage.py evaluate_ranking`.
+SEARCH_RANKING_WEIGHTS = {}
+
+
+# ============ Geocoding Configuration ============
+
+# Upstream used when the bundled gazetteer has no match (see core.geocoding)
+GEOCODER_UPSTREAM = os.environ.get('GEOCODER_UPSTREAM', 'core.geocoding.NominatimUpstream')
+GEOCODER_CACHE_SIZE = int(os.environ.get('GEOCODER_CACHE_SIZE', 10000))
+GEOCODER_USER_AGENT = 'SkillHat/1.0 (https://github.com/kawser25350/Skill-hat)'
+
 
 # ============ Authentication Settings ============
 
@@ -231,7 +298,6 @@ MESSAGE_TAGS = {
 # ============ Static Files for Production ============
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 
 # ============ Security Settings (Production) ============
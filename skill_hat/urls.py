@@ -17,7 +17,6 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from . import views
 
 urlpatterns = [
@@ -29,6 +28,7 @@ urlpatterns = [
     # Frontend views
     path('', views.home, name='home'),
     path('search/', views.search_results, name='search_results'),
+    path('search/save/', views.save_search_view, name='save_search'),
     
     # Authentication
     path('login/', views.login_view, name='login'),
@@ -56,8 +56,10 @@ urlpatterns = [
     path('payment/fail/', views.payment_fail_view, name='payment_fail'),
     path('payment/cancel/', views.payment_cancel_view, name='payment_cancel'),
     path('payment/ipn/', views.payment_ipn_view, name='payment_ipn'),
-]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Images resized on request
+    path('img/<int:width>x<int:height>/<path:name>', views.resized_image_view, name='resized_image'),
+
+    # Uploaded media, handed to the front proxy when MEDIA_ACCEL is set
+    path(f'{settings.MEDIA_URL.strip("/")}/<path:name>', views.media_view, name='media'),
+]
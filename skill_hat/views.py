@@ -1,19 +1,63 @@
-from django.http import HttpResponse, JsonResponse
+import os
+
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, QueryDict
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q, Avg
 from django.db import transaction
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST, require_safe
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from .forms import LoginForm, CustomerRegisterForm, WorkerRegisterForm, BookingForm
 from core.models import Category, Worker, Service, Skill, Booking, UserProfile, Payment
+from core import search, search_cache, saved_searches, spelling, geo, facets, ranking, page_cache, leaderboard, profiles, etags, media_queue, media_files, resize
+
+
+# Worker columns a card needs, all on the worker row itself
+CARD_FIELDS = (
+    'id', 'display_name', 'role', 'primary_category_slug', 'hourly_rate',
+    'rating', 'total_reviews', 'location', 'profile_photo', 'profile_photo_derivatives', 'profile_photo_status',
+)
+
+
+def worker_card(worker, version=None):
+    """Template-friendly card data for a worker loaded with CARD_FIELDS"""
+    return {
+        'id': worker.id,
+        'version': version,
+        'name': worker.display_name,
+        'role': worker.role,
+        'category': worker.primary_category_slug,
+        'price': float(worker.hourly_rate),
+        'rating': worker.rating,
+        'reviews': worker.total_reviews,
+        'location': worker.location,
+        'photo': worker.photo_url,
+        'photo_srcset': worker.photo_srcset,
+        'photo_webp_srcset': worker.photo_webp_srcset,
+    }
+
+
+def card_versions(worker_ids):
+    """
+    Worker id -> cache tag version, which keys the cached card fragments
+    (components/usercard.html, components/resultcard.html) and is bumped on
+    any change to the worker, its photo or its rating. Read before loading
+    the cards, so a change committed meanwhile outdates the fragment.
+    """
+    return dict(zip(worker_ids, search_cache.tag_versions(search_cache.worker_tags(worker_ids))))
 
 
 def home(request):
     """Homepage with categories and featured workers"""
     from django.db.models import Count
     
+    # Category counts and the featured workers change with the unfiltered search tag
+    page_cache.tag(request, [search_cache.ANY_CATEGORY, page_cache.CATEGORY_LIST_TAG])
+    
     # Get categories with worker count
     categories = list(Category.objects.filter(is_active=True).annotate(
         workers_count=Count('workers', filter=Q(workers__is_available=True))
@@ -23,22 +67,14 @@ def home(request):
     batch_size = 4
     category_batches = [categories[i:i+batch_size] for i in range(0, len(categories), batch_size)] if categories else []
     
-    default_workers = Worker.objects.filter(is_available=True).order_by('-rating', '-total_jobs')[:8]
+    # Featured workers come from the maintained leaderboard instead of sorting the table
+    top_ids = leaderboard.top(leaderboard.ALL_BOARD, 8)
+    page_cache.tag(request, search_cache.worker_tags(top_ids))
+    versions = card_versions(top_ids)
+    default_workers = Worker.objects.only(*CARD_FIELDS).in_bulk(top_ids)
     
     # Convert workers to template-friendly format
-    workers_data = []
-    for worker in default_workers:
-        workers_data.append({
-            'id': worker.id,
-            'name': worker.user.get_full_name() or worker.user.username,
-            'role': worker.role,
-            'category': worker.categories.first().slug if worker.categories.exists() else '',
-            'price': float(worker.hourly_rate),
-            'rating': worker.rating,
-            'reviews': worker.total_reviews,
-            'location': worker.location,
-            'photo': worker.photo_url
-        })
+    workers_data = [worker_card(default_workers[pk], versions[pk]) for pk in top_ids if pk in default_workers]
     
     data = {
         'user': request.user if request.user.is_authenticated else None,
@@ -58,68 +94,86 @@ def search_results(request):
     rating = request.GET.get('rating', '')
     sort_by = request.GET.get('sort', 'relevance')
     
-    # Start with all available workers
-    workers_qs = Worker.objects.filter(is_available=True)
+    query = request.GET.get('q', '').strip()
     
-    # Filter by category
-    if category and category != 'choose category':
-        workers_qs = workers_qs.filter(
-            Q(categories__slug__iexact=category) | Q(categories__name__icontains=category)
-        )
-    
-    # Filter by location
-    if location:
-        workers_qs = workers_qs.filter(
-            Q(location__icontains=location) | Q(service_areas__icontains=location)
-        )
-    
-    # Filter by price range
-    if min_price:
-        try:
-            workers_qs = workers_qs.filter(hourly_rate__gte=int(min_price))
-        except ValueError:
-            pass
+    # Normalized parameters key the search result cache
+    params = search_cache.normalize_params(request.GET)
+    if params['sort'] not in ('price_low', 'price_high', 'rating', 'distance'):
+        params['sort'] = 'relevance'
     
-    if max_price:
-        try:
-            workers_qs = workers_qs.filter(hourly_rate__lte=int(max_price))
-        except ValueError:
-            pass
-    
-    # Filter by rating
-    if rating:
-        try:
-            workers_qs = workers_qs.filter(rating__gte=float(rating))
-        except ValueError:
-            pass
-    
-    # Sort results
-    if sort_by == 'price_low':
-        workers_qs = workers_qs.order_by('hourly_rate')
-    elif sort_by == 'price_high':
-        workers_qs = workers_qs.order_by('-hourly_rate')
-    elif sort_by == 'rating':
-        workers_qs = workers_qs.order_by('-rating')
-    else:
-        workers_qs = workers_qs.order_by('-rating', '-total_jobs')
+    # Misspelled words are searched as the nearest known word
+    did_you_mean = {
+        name: spelling.apply(request.GET.get(name, ''), corrections)
+        for name, corrections in spelling.rewrite_params(params).items()
+    }
+    near = params['near']
+    radius_km = params['radius_km']
+    # The page shows facet counts, see search_cache.facet_tags()
+    page_cache.tag(request, search_cache.facet_tags(params) + [page_cache.CATEGORY_LIST_TAG])
+    
+    def filtered():
+        # Available workers narrowed by free text, distance and the facet filters
+        return search.filter_workers(Worker.objects.filter(is_available=True), params)
+    
+    def run_search():
+        workers_qs, search_filters, distances = filtered()
+        workers_qs = facets.apply_filters(workers_qs, search_filters)
+        
+        # Sort results
+        if params['sort'] == 'price_low':
+            workers_qs = workers_qs.order_by('hourly_rate')
+        elif params['sort'] == 'price_high':
+            workers_qs = workers_qs.order_by('-hourly_rate')
+        elif params['sort'] == 'rating':
+            workers_qs = workers_qs.order_by('-rating')
+        elif params['sort'] == 'relevance':
+            # Text match, rating, jobs, verification, recency and distance in one score
+            return ranking.rank(workers_qs, params['q'], distances)
+        else:
+            workers_qs = workers_qs.order_by('-rating', '-total_jobs')
+        ids = list(workers_qs.values_list('pk', flat=True))
+        
+        # Nearest first when searching around a point
+        if near and params['sort'] == 'distance':
+            ids.sort(key=distances.get)
+        return ids
+    
+    # Results and facet counts are cached apart, facet counts change with more
+    # workers (see search_cache.facet_tags) and are shared with the search API
+    ids = search_cache.cached_search('results', params, run_search)
+    facet_counts = search_cache.cached_search(
+        'facets', dict(params, sort=''), lambda: facets.facet_counts(*filtered()[:2]),
+        tags=search_cache.facet_tags(params),
+    )
     
-    # Convert to template-friendly format
+    # Load card data for the cached ids, the page also changes with the cards
+    page_cache.tag(request, search_cache.worker_tags(ids))
+    versions = card_versions(ids)
+    workers = Worker.objects.only(*CARD_FIELDS, 'latitude', 'longitude').in_bulk(ids)
     workers_data = []
-    for worker in workers_qs.distinct():
-        workers_data.append({
-            'id': worker.id,
-            'name': worker.user.get_full_name() or worker.user.username,
-            'role': worker.role,
-            'category': worker.categories.first().slug if worker.categories.exists() else '',
-            'price': float(worker.hourly_rate),
-            'rating': worker.rating,
-            'reviews': worker.total_reviews,
-            'location': worker.location,
-            'photo': worker.photo_url
-        })
-    
-    # Get all active categories for filter dropdown
-    all_categories = Category.objects.filter(is_active=True)
+    for pk in ids:
+        worker = workers.get(pk)
+        if worker is None:
+            continue
+        card = worker_card(worker, versions[pk])
+        card['distance'] = None
+        if near and worker.latitude is not None and worker.longitude is not None:
+            card['distance'] = round(geo.haversine_km(near[0], near[1], worker.latitude, worker.longitude), 2)
+        workers_data.append(card)
+    
+    # Get all active categories for filter dropdown, with their facet counts
+    category_counts = {f['value']: f['count'] for f in facet_counts['category']}
+    all_categories = list(Category.objects.filter(is_active=True))
+    for cat in all_categories:
+        cat.result_count = category_counts.get(cat.slug.lower(), 0)
+    
+    # Links that apply one facet value on top of the current search
+    for bucket in facet_counts['price']:
+        bucket['query'] = _search_query(
+            request, min_price=bucket['min_price'], max_price=bucket['max_price']
+        )
+    for place in facet_counts['city'] + facet_counts['area']:
+        place['query'] = _search_query(request, location=place['label'])
     
     data = {
         'user': request.user if request.user.is_authenticated else None,
@@ -128,14 +182,41 @@ def search_results(request):
         'categories': all_categories,
         'category': category if category else '',
         'location': location if location else '',
+        'q': query,
+        'near': request.GET.get('near', '') if near else '',
+        'radius_km': radius_km if near else '',
         'min_price': min_price if min_price else '',
         'max_price': max_price if max_price else '',
         'rating': rating if rating else '',
+        'date': params['date'] or '',
+        'time': params['time'] or '',
         'sort_by': sort_by,
+        'facets': facet_counts,
+        'did_you_mean': did_you_mean,
     }
     return render(request, 'pages/search_results.html', data)
 
 
+def _search_query(request, **params):
+    """Current search query string with `params` replaced (None drops a param)"""
+    query = request.GET.copy()
+    for key, value in params.items():
+        query.pop(key, None)
+        if value is not None:
+            query[key] = value
+    return query.urlencode()
+
+
+@login_required
+@require_POST
+def save_search_view(request):
+    """Save the current search, new matching workers are announced as notifications"""
+    query = QueryDict(request.POST.get('query', ''))
+    saved = saved_searches.save_search(request.user, query, request.POST.get('name', '').strip())
+    messages.success(request, f'Search saved. We will notify you when new workers match "{saved.name or "this search"}".')
+    return redirect(f"{reverse('search_results')}?{query.urlencode()}")
+
+
 
 def login_view(request):
     """User login view - works for both customers and workers"""
@@ -230,6 +311,8 @@ def worker_register_view(request):
     if request.method == 'POST':
         form = WorkerRegisterForm(request.POST, request.FILES)
         if form.is_valid():
+            # Photo is written before the transaction and processed in the background (see core.media_queue)
+            photo = media_queue.store_upload(Worker, 'profile_photo', request.FILES['photo']) if 'photo' in request.FILES else None
             with transaction.atomic():
                 user = form.save()
                 
@@ -246,19 +329,17 @@ def worker_register_view(request):
                     bio=form.cleaned_data.get('bio', ''),
                     hourly_rate=form.cleaned_data['hourly_rate'],
                     location=form.cleaned_data['location'],
+                    latitude=form.cleaned_data.get('latitude'),
+                    longitude=form.cleaned_data.get('longitude'),
                     experience_years=form.cleaned_data.get('experience_years') or 0,
                     is_available=True,
+                    profile_photo=photo,
                 )
                 
                 # Add category
                 category = form.cleaned_data['category']
                 worker.categories.add(category)
                 
-                # Handle photo - save to Worker.profile_photo only
-                if 'photo' in request.FILES:
-                    worker.profile_photo = request.FILES['photo']
-                    worker.save()
-                
                 login(request, user)
                 messages.success(request, 'Registration successful! Your worker profile is now active!')
                 return redirect('dashboard')
@@ -288,19 +369,19 @@ def logout_view(request):
     return redirect('home')
 
 
+@condition(etag_func=etags.profile_page_etag)
 def profile_view(request, worker_id):
     """Worker profile view using real database"""
-    worker = get_object_or_404(Worker, id=worker_id)
-    services = worker.services.filter(is_active=True)
-    portfolio = worker.portfolio.all()[:6]
-    reviews = worker.reviews.all()[:10]
+    page_cache.tag(request, search_cache.worker_tags([worker_id]))
     
-    # Get skills
-    skills = list(worker.skills.values_list('name', flat=True))
-    if not skills:
-        # Get skills from category if worker hasn't added specific skills
-        for category in worker.categories.all():
-            skills.extend(list(category.skills.values_list('name', flat=True)[:5]))
+    # Everything the page shows comes prefetched in the cached profile snapshot
+    worker = profiles.get_profile(worker_id)
+    if worker is None:
+        raise Http404('No Worker matches the given query.')
+    services = [service for service in worker.services.all() if service.is_active]
+    portfolio = worker.portfolio.all()[:6]
+    reviews = worker.recent_reviews
+    skills = profiles.profile_skills(worker)
     
     worker_data = {
         'id': worker.id,
@@ -310,25 +391,29 @@ def profile_view(request, worker_id):
         'rating': str(worker.rating),
         'location': worker.location,
         'photo': worker.photo_url,
+        'photo_srcset': worker.photo_srcset,
+        'photo_webp_srcset': worker.photo_webp_srcset,
         'experience': worker.experience_years,
         'jobs_completed': worker.total_jobs,
         'review_count': worker.total_reviews,
         'response_time': worker.response_time,
         'description': worker.bio,
         'is_verified': worker.is_verified,
-        'skills': skills[:7],
+        'skills': skills,
         'featured_services': [
             {
                 'name': service.name,
                 'price': str(int(service.price)),
-                'image': service.image.url if service.image else worker.photo_url
-            } for service in services.filter(is_featured=True)[:2]
+                'image': service.image_url or worker.photo_url
+            } for service in [service for service in services if service.is_featured][:2]
         ],
         'recent_works': [
             {
                 'title': work.title,
                 'description': work.description[:50] if work.description else '',
-                'image': work.image.url if work.image else worker.photo_url
+                'image': work.image_url or worker.photo_url,
+                'srcset': work.image_srcset if work.image_url else worker.photo_srcset,
+                'webp_srcset': work.image_webp_srcset if work.image_url else worker.photo_webp_srcset,
             } for work in portfolio
         ],
         'reviews': [
@@ -443,6 +528,17 @@ def update_profile_view(request):
     """Update user profile"""
     user = request.user
     
+    # Check if user is a worker
+    is_worker = Worker.objects.filter(user=user).exists()
+    
+    # Uploads are written before the transaction, worker photos are processed in the background
+    photo = request.FILES.get('profile_image')
+    if photo:
+        if is_worker:
+            photo = media_queue.store_upload(Worker, 'profile_photo', photo)
+        else:
+            photo = media_queue.store_upload(UserProfile, 'profile_image', photo)
+    
     with transaction.atomic():
         # Update user info
         user.first_name = request.POST.get('first_name', user.first_name)
@@ -456,20 +552,15 @@ def update_profile_view(request):
         profile.address = request.POST.get('address', profile.address)
         profile.city = request.POST.get('city', profile.city)
         
-        # Check if user is a worker
-        try:
-            worker = Worker.objects.get(user=user)
-            is_worker = True
-        except Worker.DoesNotExist:
-            worker = None
-            is_worker = False
+        # Loaded after user.save(), which writes the worker's display name
+        worker = Worker.objects.get(user=user) if is_worker else None
         
         # Handle profile photo upload - save to Worker.profile_photo for workers, UserProfile.profile_image for customers
-        if 'profile_image' in request.FILES:
+        if photo:
             if is_worker:
-                worker.profile_photo = request.FILES['profile_image']
+                worker.profile_photo = photo
             else:
-                profile.profile_image = request.FILES['profile_image']
+                profile.profile_image = photo
         
         profile.save()
         
@@ -508,6 +599,9 @@ def become_worker_view(request):
     
     skill_ids = request.POST.getlist('skills')
     
+    # Photo upload, processed in the background (see core.media_queue)
+    photo = media_queue.store_upload(Worker, 'profile_photo', request.FILES['photo']) if 'photo' in request.FILES else None
+    
     # Create worker profile
     worker = Worker.objects.create(
         user=user,
@@ -517,13 +611,9 @@ def become_worker_view(request):
         location=location,
         experience_years=experience_years or 0,
         is_available=True,
+        profile_photo=photo,
     )
     
-    # Handle photo upload
-    if 'photo' in request.FILES:
-        worker.profile_photo = request.FILES['photo']
-        worker.save()
-    
     # Add categories
     if category_ids:
         categories = Category.objects.filter(id__in=category_ids)
@@ -569,12 +659,15 @@ def update_worker_profile_view(request):
     worker.bio = request.POST.get('bio', worker.bio)
     worker.hourly_rate = request.POST.get('hourly_rate', worker.hourly_rate)
     worker.location = request.POST.get('location', worker.location)
+    coordinates = geo.parse_near(f"{request.POST.get('latitude', '')},{request.POST.get('longitude', '')}")
+    if coordinates:
+        worker.latitude, worker.longitude = coordinates
     worker.experience_years = request.POST.get('experience_years', worker.experience_years)
     worker.is_available = request.POST.get('is_available') == 'on'
     
-    # Handle photo upload
+    # Handle photo upload, processed in the background (see core.media_queue)
     if 'photo' in request.FILES:
-        worker.profile_photo = request.FILES['photo']
+        worker.profile_photo = media_queue.store_upload(Worker, 'profile_photo', request.FILES['photo'])
     
     worker.save()
     
@@ -864,3 +957,48 @@ def payment_ipn_view(request):
     else:
         return JsonResponse({'status': 'error', 'message': result.get('error', 'Unknown error')})
 
+
+# ============================================
+# MEDIA FILES
+# ============================================
+
+@require_safe
+def media_view(request, name):
+    """Serve an uploaded file after its access rule, through the front proxy when there is one"""
+    path = media_files.resolve(name)
+    # Files a user may not read look missing rather than forbidden
+    if path is None or not media_files.allowed(request, name):
+        raise Http404('Media file not found')
+
+    stat = os.stat(path)
+    etag = media_files.etag(name, stat)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = media_files.response(request, name, path, stat, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = media_files.cache_control(name)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def resized_image_view(request, width, height, name):
+    """A media or static image resized to width x height, cached on disk (see core.resize)"""
+    source = resize.source(request, name)
+    if source is None or not resize.valid_size(width, height):
+        raise Http404('Image not found')
+
+    path, cache_control = source
+    stat = os.stat(path)
+    etag = f'"{resize.variant_key(path, stat, width, height)}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            variant, fmt = resize.variant(path, stat, width, height)
+        except resize.NotAnImage:
+            raise Http404('Image not found')
+        response = FileResponse(open(variant, 'rb'), content_type=resize.CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response